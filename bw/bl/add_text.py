@@ -1,5 +1,7 @@
 import os
 import bpy
+import bw.bl.material_registry as bwmr
+import bw.bl.batch_build as bwbb
 
 
 def hex_to_rgb(hex_color: str):
@@ -26,11 +28,18 @@ def add_text(
     opacity: float = 1.0,
     extrude: float = 0.1,
     bevel_depth: float = 0.05,
+    use_ops: bool = False,
 ):
     """
     add_text
 
-    add a text string at x, y, z with opacity
+    add a text string at x, y, z with opacity.
+    by default the text curve and object are
+    created with the data api (no operators or
+    scene updates) and tagged with a "bw_label"
+    custom property for bw.bl.merge_labels
+
+    returns the text object
 
     :param text: message to show in blender
     :param position: (x, y, z) integer location
@@ -45,7 +54,44 @@ def add_text(
     :param extrude: amount to extend the text
     :param bevel_depth: amount to curve the text
         edges
+    :param use_ops: flag to use the slower
+        bpy.ops text_add and convert to mesh
+        operators instead of the data api
     """
+    rgb_tuple = hex_to_rgb(color)
+    rgba_color = (
+        rgb_tuple[0],
+        rgb_tuple[1],
+        rgb_tuple[2],
+        opacity,
+    )
+    if not use_ops:
+        curve = bpy.data.curves.new(
+            name="Text", type="FONT"
+        )
+        curve.body = text
+        curve.size = font_size
+        curve.extrude = extrude
+        if font_family_path and os.path.exists(
+            font_family_path
+        ):
+            curve.font = bpy.data.fonts.load(
+                font_family_path, check_existing=True
+            )
+        if font_style:
+            curve.style = font_style
+        curve.materials.append(
+            bwmr.get_material(
+                rgba=rgba_color, prefix="TextMaterial"
+            )
+        )
+        text_obj = bpy.data.objects.new(curve.name, curve)
+        text_obj.location = position
+        text_obj.color = rgba_color
+        text_obj["bw_label"] = True
+        bwbb.link_object(text_obj)
+        return text_obj
+
     bpy.ops.object.text_add(
         enter_editmode=False,
         align="WORLD",
@@ -64,13 +110,6 @@ def add_text(
         # font_sytyle = 'BOLD'
         text_obj.data.style = font_style
 
-    rgb_tuple = hex_to_rgb(color)
-    rgba_color = (
-        rgb_tuple[0],
-        rgb_tuple[1],
-        rgb_tuple[2],
-        opacity,
-    )
     """
     # for debugging
     print(rgba_color)
@@ -88,9 +127,13 @@ def add_text(
         bpy.context.scene.objects[text_obj.data.name]
     )
 
-    # Set material properties
-    mat = bpy.data.materials.new(name="TextMaterial")
-    mat.use_nodes = False
-    mat.diffuse_color = rgba_color
+    # Set material properties with a shared material
+    mat = bwmr.get_material(
+        rgba=rgba_color, prefix="TextMaterial"
+    )
 
     text_obj.data.materials.append(mat)
+    text_obj["bw_label"] = True
+    text_obj["bw"] = True
+    text_obj.data["bw"] = True
+    return text_obj
@@ -0,0 +1,140 @@
+import logging
+import numpy as np
+import bpy
+import bw.np.apply_colormap as bwcm
+
+
+log = logging.getLogger(__name__)
+
+
+supported_domains = [
+    "vertex",
+    "face",
+]
+
+
+def get_color_attribute_material(
+    attribute_name: str = "bw_color",
+):
+    """
+    get_color_attribute_material
+
+    get or create the shared material that reads
+    the mesh color attribute through an attribute
+    node so every colored mesh uses one material
+
+    :param attribute_name: color attribute name
+    """
+    material_name = f"{attribute_name}_material"
+    material = bpy.data.materials.get(material_name)
+    if material is not None:
+        return material
+    material = bpy.data.materials.new(name=material_name)
+    material["bw"] = True
+    material.use_nodes = True
+    nodes = material.node_tree.nodes
+    links = material.node_tree.links
+    bsdf = nodes.get("Principled BSDF")
+    attribute = nodes.new("ShaderNodeAttribute")
+    attribute.attribute_type = "GEOMETRY"
+    attribute.attribute_name = attribute_name
+    links.new(
+        attribute.outputs["Color"],
+        bsdf.inputs["Base Color"],
+    )
+    return material
+
+
+def assign_color_attribute(
+    mesh,
+    faces: np.ndarray,
+    vertices: np.ndarray,
+    domain: str = "vertex",
+    colormap: str = "diverging",
+    color_percentile: float = 50,
+    axis: int = 2,
+    attribute_name: str = "bw_color",
+):
+    """
+    assign_color_attribute
+
+    color a mesh with a float color attribute
+    written by one foreach_set from a vectorized
+    colormap lut and a single shared material
+    (continuous gradients with no per-face python
+    work or material slots)
+
+    returns the color attribute
+
+    :param mesh: bpy.types.Mesh built from faces
+    :param faces: (num_faces, N) array of vertex
+        indices in the same order as mesh.polygons
+    :param vertices: (num_vertices, 3) array
+    :param domain: vertex for a per-vertex color
+        (POINT domain) or face for one flat color
+        per face (CORNER domain)
+    :param colormap: lut name (for more refer to
+        bw.np.apply_colormap.build_colormap_lut)
+    :param color_percentile: percentile of each
+        face's vertex values used for face colors
+    :param axis: vertex axis holding the value
+    :param attribute_name: color attribute name
+    """
+    if domain not in supported_domains:
+        raise ValueError(
+            f"unsupported color domain={domain} "
+            f"only {supported_domains} are supported"
+        )
+    faces = np.asarray(faces, dtype=np.int64)
+    vertex_values = vertices[:, axis]
+    min_value = float(np.min(vertex_values))
+    max_value = float(np.max(vertex_values))
+    lut = bwcm.build_colormap_lut(colormap=colormap)
+    if domain == "vertex":
+        colors = bwcm.apply_colormap(
+            vertex_values,
+            lut=lut,
+            min_value=min_value,
+            max_value=max_value,
+        )
+        attribute = mesh.color_attributes.new(
+            name=attribute_name,
+            type="FLOAT_COLOR",
+            domain="POINT",
+        )
+    else:
+        face_values = vertex_values[faces]
+        face_percentiles = np.percentile(
+            face_values, color_percentile, axis=1
+        )
+        face_colors = bwcm.apply_colormap(
+            face_percentiles,
+            lut=lut,
+            min_value=min_value,
+            max_value=max_value,
+        )
+        # every corner (loop) of a face gets its color
+        colors = np.repeat(
+            face_colors, faces.shape[1], axis=0
+        )
+        attribute = mesh.color_attributes.new(
+            name=attribute_name,
+            type="FLOAT_COLOR",
+            domain="CORNER",
+        )
+    attribute.data.foreach_set(
+        "color", np.ascontiguousarray(colors).reshape(-1)
+    )
+    mesh.color_attributes.active_color = attribute
+    mesh.materials.append(
+        get_color_attribute_material(
+            attribute_name=attribute_name
+        )
+    )
+    log.debug(
+        f"colored mesh={mesh.name} "
+        f"domain={domain} "
+        f"colormap={colormap} "
+        f"colors={len(colors)}"
+    )
+    return attribute
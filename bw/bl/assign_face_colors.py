@@ -0,0 +1,125 @@
+import logging
+import numpy as np
+import bw.bl.material_registry as bwmr
+
+
+log = logging.getLogger(__name__)
+
+
+def get_palette_material(
+    color_node: dict,
+):
+    """
+    get_palette_material
+
+    get the shared registry material for one
+    color_dictionary entry so every mesh reuses
+    the same num_colors materials
+
+    :param color_node: color_dictionary value
+        (for more refer to
+        bw.np.calculate_weighted_quantile_ranges_2d)
+    """
+    # same (r, b, g, a) ordering as bw.bl.assign_color
+    color = (
+        color_node["r"],
+        color_node["b"],
+        color_node["g"],
+        color_node["a"],
+    )
+    return bwmr.get_material(
+        rgba=color, prefix="bw_palette"
+    )
+
+
+def get_color_bins(
+    values: np.ndarray,
+    color_dictionary: dict,
+):
+    """
+    get_color_bins
+
+    vectorized bw.bl.assign_color that maps every
+    value to the index of its color_dictionary
+    range with np.searchsorted on the upper bounds
+
+    returns a (num_values,) int array of indices
+    into color_dictionary.values()
+
+    :param values: array of percentiles
+    :param color_dictionary: color ranges from
+        bw.bl.get_quantile_colors
+    """
+    max_values = np.array(
+        [
+            color_node["max"]
+            for color_node in color_dictionary.values()
+        ],
+        dtype=np.float64,
+    )
+    bins = np.searchsorted(max_values, values, side="left")
+    return np.clip(bins, 0, len(max_values) - 1)
+
+
+def assign_face_colors(
+    mesh,
+    faces: np.ndarray,
+    vertices: np.ndarray,
+    color_dictionary: dict,
+    color_percentile: float = 50,
+    axis: int = 2,
+):
+    """
+    assign_face_colors
+
+    color every face of a mesh from its vertex
+    values without any per-face python work.
+    per-face percentiles come from one np.percentile
+    call, bins come from np.searchsorted, only the
+    used palette materials are added to the mesh
+    and material_index is written with one
+    foreach_set
+
+    returns the number of materials added to the
+    mesh
+
+    :param mesh: bpy.types.Mesh built from faces
+    :param faces: (num_faces, N) array of vertex
+        indices in the same order as mesh.polygons
+    :param vertices: (num_vertices, 3) array
+    :param color_dictionary: color ranges from
+        bw.bl.get_quantile_colors
+    :param color_percentile: percentile of each
+        face's vertex values used for the color
+    :param axis: vertex axis holding the value
+    """
+    num_faces = len(faces)
+    if not num_faces:
+        return 0
+    face_values = vertices[:, axis][
+        np.asarray(faces, dtype=np.int64)
+    ]
+    face_percentiles = np.percentile(
+        face_values, color_percentile, axis=1
+    )
+    bins = get_color_bins(
+        face_percentiles, color_dictionary
+    )
+    used_bins, material_index = np.unique(
+        bins, return_inverse=True
+    )
+    color_nodes = list(color_dictionary.values())
+    for bin_idx in used_bins:
+        mesh.materials.append(
+            get_palette_material(color_nodes[bin_idx])
+        )
+    mesh.polygons.foreach_set(
+        "material_index",
+        material_index.astype(np.int32).reshape(-1),
+    )
+    log.debug(
+        f"colored mesh={mesh.name} "
+        f"faces={num_faces} "
+        f"materials={len(used_bins)}"
+    )
+    return len(used_bins)
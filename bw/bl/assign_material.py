@@ -1,4 +1,4 @@
-import bpy
+import bw.bl.material_registry as bwmr
 
 
 def assign_material(
@@ -10,16 +10,13 @@ def assign_material(
 
     assign a color tuple to a material in blender
 
-    returns int for the new number of materials in the mesh
+    returns int for the material index in the mesh
     """
-    # Create a new material with the specified color
-    mat = bpy.data.materials.new(
-        name=f"Material_{len(bpy.data.materials)}"
-    )
-    mat.use_nodes = (
-        False  # Disable node-based materials for simplicity
-    )
-    mat.diffuse_color = color
+    # Get the shared material with the specified color
+    mat = bwmr.get_material(rgba=color, prefix="Material")
+    material_index = mesh.materials.find(mat.name)
+    if material_index >= 0:
+        return material_index
     mesh.materials.append(mat)
 
     # Return the material index
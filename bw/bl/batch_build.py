@@ -0,0 +1,124 @@
+import logging
+import contextlib
+import bpy
+
+
+log = logging.getLogger(__name__)
+
+
+# active staging collection, nesting depth and the
+# layer index to tag new objects with
+staging = {
+    "collection": None,
+    "depth": 0,
+    "layer": None,
+}
+
+
+def is_batch_active():
+    """
+    is_batch_active
+
+    returns True if objects are being staged by
+    bw.bl.batch_build.batch_build
+    """
+    return staging["collection"] is not None
+
+
+def set_batch_layer(
+    layer_idx: int = None,
+):
+    """
+    set_batch_layer
+
+    tag every object linked with link_object from
+    now on with a "bw_layer" custom property
+    holding layer_idx (used by bw.bl.teardown_scene
+    to keep unchanged layers)
+
+    :param layer_idx: layer index or None to stop
+        tagging
+    """
+    staging["layer"] = layer_idx
+
+
+def link_object(
+    obj,
+    select: bool = False,
+):
+    """
+    link_object
+
+    link a new object into the scene and tag it
+    (and its data) with a "bw" custom property for
+    bw.bl.teardown_scene. inside a
+    batch_build the object is linked into the
+    excluded staging collection instead and is
+    never activated or selected so blender does
+    not re-evaluate the scene for every object
+
+    :param obj: bpy.types.Object
+    :param select: flag to make the object
+        active and selected (ignored inside a
+        batch_build)
+    """
+    # tag for bw.bl.teardown_scene
+    obj["bw"] = True
+    if obj.data is not None:
+        obj.data["bw"] = True
+    if staging["layer"] is not None:
+        obj["bw_layer"] = staging["layer"]
+    if is_batch_active():
+        staging["collection"].objects.link(obj)
+        return
+    bpy.context.scene.collection.objects.link(obj)
+    if select:
+        bpy.context.view_layer.objects.active = obj
+        obj.select_set(True)
+
+
+@contextlib.contextmanager
+def batch_build(
+    name: str = "bw_layers",
+):
+    """
+    batch_build
+
+    context manager that stages every object
+    linked with link_object in a new collection
+    that is excluded from the view layer. on exit
+    the collection is included in one step and
+    the view layer is updated once. nested
+    batch_build calls share the outer collection.
+
+    yields the staging collection
+
+    :param name: name for the staging collection
+    """
+    staging["depth"] += 1
+    if staging["depth"] == 1:
+        collection = bpy.data.collections.new(name=name)
+        collection["bw"] = True
+        bpy.context.scene.collection.children.link(
+            collection
+        )
+        bpy.context.view_layer.layer_collection.children[
+            collection.name
+        ].exclude = True
+        staging["collection"] = collection
+    try:
+        yield staging["collection"]
+    finally:
+        staging["depth"] -= 1
+        if staging["depth"] == 0:
+            collection = staging["collection"]
+            staging["collection"] = None
+            staging["layer"] = None
+            bpy.context.view_layer.layer_collection.children[
+                collection.name
+            ].exclude = False
+            bpy.context.view_layer.update()
+            log.info(
+                f"linked collection={collection.name} "
+                f"objects={len(collection.objects)}"
+            )
@@ -0,0 +1,122 @@
+import logging
+import numpy as np
+
+
+log = logging.getLogger(__name__)
+
+
+def build_mesh_from_arrays(
+    mesh,
+    vertices: np.ndarray,
+    faces: np.ndarray,
+    vertex_scale_size: float = 1.0,
+):
+    """
+    build_mesh_from_arrays
+
+    fill an empty blender mesh from numpy arrays with
+    the bulk data api (vertices.add, loops.add and
+    polygons.add with foreach_set) instead of
+    from_pydata or per-vertex bmesh calls
+
+    returns the scaled (num_vertices, 3) float32
+    vertices written to the mesh
+
+    :param mesh: empty bpy.types.Mesh
+    :param vertices: (num_vertices, 3) array
+    :param faces: (num_faces, N) array of vertex
+        indices (all faces have N sides)
+    :param vertex_scale_size: apply a scaler to
+        each vertex
+    """
+    vertices = np.asarray(vertices, dtype=np.float32)
+    if vertex_scale_size != 1.0:
+        vertices = vertices * np.float32(vertex_scale_size)
+    vertices = np.ascontiguousarray(vertices)
+    faces = np.asarray(faces)
+    num_faces = len(faces)
+    num_sides = faces.shape[1] if num_faces else 3
+    num_loops = num_faces * num_sides
+
+    mesh.vertices.add(len(vertices))
+    mesh.vertices.foreach_set("co", vertices.reshape(-1))
+    mesh.loops.add(num_loops)
+    mesh.loops.foreach_set(
+        "vertex_index",
+        np.ascontiguousarray(faces, dtype=np.int32).reshape(
+            -1
+        ),
+    )
+    mesh.polygons.add(num_faces)
+    mesh.polygons.foreach_set(
+        "loop_start",
+        np.arange(0, num_loops, num_sides, dtype=np.int32),
+    )
+    try:
+        # blender 4.0+ derives loop_total from loop_start
+        mesh.polygons.foreach_set(
+            "loop_total",
+            np.full(num_faces, num_sides, dtype=np.int32),
+        )
+    except (AttributeError, TypeError, RuntimeError):
+        pass
+    mesh.update(calc_edges=True)
+    log.debug(
+        f"built mesh={mesh.name} "
+        f"vertices={len(vertices)} "
+        f"faces={num_faces} "
+        f"sides={num_sides}"
+    )
+    return vertices
+
+
+def build_mesh_from_loops(
+    mesh,
+    vertices: np.ndarray,
+    loop_vertices: np.ndarray,
+    loop_totals: np.ndarray,
+):
+    """
+    build_mesh_from_loops
+
+    fill an empty blender mesh with polygons of
+    any size from flat loop arrays with the bulk
+    data api (for merging meshes read back with
+    foreach_get)
+
+    :param mesh: empty bpy.types.Mesh
+    :param vertices: (num_vertices, 3) array
+    :param loop_vertices: (num_loops,) vertex index
+        for every face corner
+    :param loop_totals: (num_faces,) number of
+        corners in each face
+    """
+    vertices = np.ascontiguousarray(
+        vertices, dtype=np.float32
+    )
+    loop_totals = np.ascontiguousarray(
+        loop_totals, dtype=np.int32
+    )
+    loop_starts = np.zeros(len(loop_totals), dtype=np.int32)
+    loop_starts[1:] = np.cumsum(loop_totals)[:-1]
+
+    mesh.vertices.add(len(vertices))
+    mesh.vertices.foreach_set("co", vertices.reshape(-1))
+    mesh.loops.add(len(loop_vertices))
+    mesh.loops.foreach_set(
+        "vertex_index",
+        np.ascontiguousarray(loop_vertices, dtype=np.int32),
+    )
+    mesh.polygons.add(len(loop_totals))
+    mesh.polygons.foreach_set("loop_start", loop_starts)
+    try:
+        # blender 4.0+ derives loop_total from loop_start
+        mesh.polygons.foreach_set("loop_total", loop_totals)
+    except (AttributeError, TypeError, RuntimeError):
+        pass
+    mesh.update(calc_edges=True)
+    log.debug(
+        f"built mesh={mesh.name} "
+        f"vertices={len(vertices)} "
+        f"faces={len(loop_totals)}"
+    )
@@ -1,5 +1,9 @@
 import bpy
 import logging
+import numpy as np
+import bw.bl.material_registry as bwmr
+import bw.bl.build_mesh_from_arrays as bwmfa
+import bw.bl.batch_build as bwbb
 
 
 log = logging.getLogger(__name__)
@@ -14,12 +18,17 @@ def create_rectangle(
     x_position: int,
     y_position: int,
     z_position: int,
+    use_ops: bool = False,
 ):
     """
     create_rectangle
 
     create a 3d rectangle by x, y, z with
-    rgba support
+    rgba support. by default the box mesh is
+    built with the data api (no operators or
+    scene updates)
+
+    returns the rectangle object
 
     :param height: height of the object
     :param width: width of the object
@@ -29,6 +38,9 @@ def create_rectangle(
     :param x_position: x location
     :param y_position: y location
     :param z_position: z location
+    :param use_ops: flag to use the slower
+        bpy.ops.mesh.primitive_cube_add operator
+        instead of the data api
     """
     color = tuple(
         int(hex_color[i : i + 2], 16) / 255.0
@@ -42,19 +54,59 @@ def create_rectangle(
         f"dep={depth}"
     )
 
-    bpy.ops.mesh.primitive_cube_add(
-        size=1,
-        location=(x_position, y_position, z_position),
-    )
-    rectangle = bpy.context.active_object
-    rectangle.dimensions = (width, height, depth)
+    if use_ops:
+        bpy.ops.mesh.primitive_cube_add(
+            size=1,
+            location=(x_position, y_position, z_position),
+        )
+        rectangle = bpy.context.active_object
+        rectangle.dimensions = (width, height, depth)
+        rectangle["bw"] = True
+        rectangle.data["bw"] = True
+    else:
+        # unit cube centered on the origin
+        corners = np.array(
+            [
+                [-0.5, -0.5, -0.5],
+                [-0.5, 0.5, -0.5],
+                [0.5, 0.5, -0.5],
+                [0.5, -0.5, -0.5],
+                [-0.5, -0.5, 0.5],
+                [-0.5, 0.5, 0.5],
+                [0.5, 0.5, 0.5],
+                [0.5, -0.5, 0.5],
+            ],
+            dtype=np.float32,
+        )
+        faces = np.array(
+            [
+                [0, 1, 2, 3],
+                [4, 7, 6, 5],
+                [0, 4, 5, 1],
+                [1, 5, 6, 2],
+                [2, 6, 7, 3],
+                [3, 7, 4, 0],
+            ]
+        )
+        mesh = bpy.data.meshes.new(name="Rectangle")
+        bwmfa.build_mesh_from_arrays(
+            mesh=mesh,
+            vertices=corners * (width, height, depth),
+            faces=faces,
+        )
+        rectangle = bpy.data.objects.new(mesh.name, mesh)
+        rectangle.location = (
+            x_position,
+            y_position,
+            z_position,
+        )
+        bwbb.link_object(rectangle)
 
-    material = bpy.data.materials.new(
-        name="Rectangle_Material"
+    material = bwmr.get_material(
+        rgba=color + (opacity,),
+        prefix="Rectangle_Material",
     )
     rectangle.data.materials.append(material)
-    material.use_nodes = False
-
-    material.diffuse_color = color + (opacity,)
 
     log.debug("done")
+    return rectangle
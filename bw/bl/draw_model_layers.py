@@ -1,16 +1,138 @@
 import os
 import logging
 import bw.np.extract_weights as extract_weights
+import bw.np.allocate_face_budget as bwfb
+import bw.np.build_salience_mask as bwsm
+import bw.np.group_layers_by_role as bwgr
+import bw.np.get_array_hash as bwah
+import bw.np.get_layer_stats as bwls
 import bw.bl.generate_3d_from_3d as mesh_gen
 import bw.bl.create_rectangle as bwcr
+import bw.bl.add_text as add_text
+import bw.bl.draw_point_cloud as bwpc
+import bw.bl.draw_texture_plane as bwtp
 import bw.bl.save_animation as bwan
-import bw.bl.clear_all_objects as bwclear
+import bw.bl.teardown_scene as bwts
 import bw.bl.save_as_stl as export_stl
 import bw.bl.save_as_gltf as export_gltf
+import bw.bl.material_registry as bwmr
+import bw.bl.merge_labels as bwml
+import bw.bl.join_layers as bwjl
+import bw.bl.batch_build as bwbb
+import bw.sk.mesh_artifact as bwma
+import bw.sk.profile_stacked_layers as bwps
 
 log = logging.getLogger(__name__)
 
 
+def add_layer_labels(
+    name: str,
+    desc: str,
+    x: float,
+    y: float,
+    z: float,
+):
+    """
+    add_layer_labels
+
+    add the name and desc labels to the left of a
+    layer drawn without bw.bl.generate_3d_from_3d
+    (same placement as the mesh labels)
+
+    :param name: name label
+    :param desc: description label
+    :param x: x position for the layer
+    :param y: y position for the layer
+    :param z: z position for the layer
+    """
+    add_text.add_text(
+        text=name,
+        position=(x, y, z),
+        extrude=1.7,
+    )
+    add_text.add_text(
+        text=desc,
+        position=(x, y - 10, z),
+        color="#555555",
+        extrude=1.5,
+    )
+
+
+def get_unchanged_layers(
+    all_data_3d: list,
+    previous_report: dict = None,
+    change_threshold: float = 0.0,
+):
+    """
+    get_unchanged_layers
+
+    hash and summarize every fitted layer (stored
+    in data_3d["layer_hash"] and
+    data_3d["layer_stats"] for the next
+    generation) and find the layers that did not
+    change since the previous draw_model_layers
+    report. kept layers carry the hash and stats
+    of the data that was last rendered in the
+    report so small changes add up until the
+    layer is rebuilt. a layer is unchanged if it has the
+    same name, index and target_faces as before
+    and either the same content hash or a
+    bw.np.get_layer_stats.get_layer_change at or
+    below change_threshold.
+
+    returns a dictionary of layer index to the
+    previous report entry
+
+    :param all_data_3d: fitted layers
+    :param previous_report: optional - report
+        returned by the previous draw_model_layers
+    :param change_threshold: relative stats change
+        allowed before a layer is rebuilt (0.0
+        only keeps layers with identical data)
+    """
+    previous_layers = {}
+    if previous_report:
+        previous_layers = {
+            entry["layer_name"]: entry
+            for entry in previous_report.get("mc", [])
+        }
+    unchanged = {}
+    for idx, data_3d in enumerate(all_data_3d):
+        if data_3d.get("data") is None:
+            continue
+        data_3d["layer_hash"] = bwah.get_array_hash(
+            data_3d["data"]
+        )
+        data_3d["layer_stats"] = bwls.get_layer_stats(
+            data_3d["data"]
+        )
+        entry = previous_layers.get(data_3d["name"])
+        if entry is None:
+            continue
+        previous_data_3d = entry["data_3d"]
+        if (
+            entry["idx"] != idx
+            or entry["target_faces"]
+            != data_3d["target_faces"]
+            or previous_data_3d.get("layer_hash") is None
+        ):
+            continue
+        if (
+            previous_data_3d["layer_hash"]
+            != data_3d["layer_hash"]
+        ):
+            if change_threshold <= 0.0:
+                continue
+            layer_change = bwls.get_layer_change(
+                data_3d["layer_stats"],
+                previous_data_3d["layer_stats"],
+            )
+            if layer_change > change_threshold:
+                continue
+        unchanged[idx] = entry
+    return unchanged
+
+
 def draw_model_layers(
     input_file: str,
     layer_names: list = [],
@@ -38,6 +160,31 @@ def draw_model_layers(
     color_mode: str = "RGBA",
     center_camera: bool = True,
     animation_y_move_speed: int = -200,
+    brick_size: int = None,
+    mesh_index_file: str = None,
+    min_island_faces: int = None,
+    min_island_size: float = None,
+    max_islands: int = None,
+    mask_method: str = None,
+    shell_quantiles: list = None,
+    engine: str = None,
+    total_faces: int = None,
+    total_mb: float = None,
+    budget_score: str = "variance",
+    stack_layers: bool = False,
+    mode: str = None,
+    top_k: int = 100000,
+    point_instance: str = "sphere",
+    point_size: float = 0.5,
+    texture_displacement: float = None,
+    coloring: str = None,
+    colormap: str = "diverging",
+    merge_labels: bool = False,
+    instance_duplicates: bool = True,
+    duplicate_decimals: int = None,
+    join_layers: bool = False,
+    previous_report: dict = None,
+    change_threshold: float = 0.0,
 ):
     """
     draw_model_layers
@@ -110,11 +257,109 @@ def draw_model_layers(
         the target dimensions
     :param animation_y_move_speed: how fast
         does the camera fly during the animation
+    :param brick_size: optional - run marching cubes
+        in overlapping bricks of this many cells
+        to bound peak memory for very large
+        target_rows/target_cols
+    :param mesh_index_file: optional - path to a
+        model-level index from
+        bw.sk.build_mesh_artifacts to draw the
+        saved layer meshes without extracting
+        or recomputing anything
+    :param min_island_faces: optional - drop
+        disconnected surface components with fewer
+        faces than this
+    :param min_island_size: optional - drop
+        disconnected surface components with a
+        smaller bounding box extent (in voxels)
+    :param max_islands: optional - keep only this
+        many of the largest surface components
+    :param mask_method: optional - only run marching
+        cubes on the salient regions found with
+        bw.np.build_salience_mask using quantile,
+        top_k_blocks or outliers
+    :param shell_quantiles: optional - draw nested
+        isosurfaces at these data quantiles (for
+        example [0.05, 0.5, 0.95]) for each layer
+    :param engine: optional - isosurface engine
+        marching_cubes (default) or surface_nets
+        for quad meshes with roughly half the faces
+    :param total_faces: optional - scene-level face
+        budget split across the layers by
+        bw.np.allocate_face_budget (replaces
+        target_faces for each layer and caps each
+        layer at its share)
+    :param total_mb: optional - scene-level mesh
+        size budget in megabytes (ignored if
+        total_faces is set)
+    :param budget_score: information score for
+        splitting the budget with variance,
+        entropy or sign_crossings
+    :param stack_layers: flag to stack the
+        same-role layers (for example
+        h.{0..11}.mlp.c_fc.weight) into one volume
+        and profile each group once with
+        bw.sk.profile_stacked_layers (not
+        supported with shell_quantiles)
+    :param mode: optional - isosurface (default),
+        heightmap to build a displaced grid mesh
+        directly from each fitted layer or contours
+        to extrude 2d contours at the
+        shell_quantiles levels or points to draw the
+        top_k largest |w| weights of each tensor as
+        an instanced point cloud (no meshing) or
+        texture to draw each fitted layer as a
+        float image on a plane (no meshing)
+    :param top_k: number of points per layer for
+        mode points
+    :param point_instance: sphere or cube instance
+        for mode points
+    :param point_size: radius (sphere) or size
+        (cube) for mode points
+    :param texture_displacement: optional -
+        displacement strength along the depth axis
+        for mode texture
+    :param coloring: optional - color the layer
+        meshes with materials (a shared palette),
+        vertex (per-vertex color attribute) or face
+        (per-face color attribute)
+    :param colormap: colormap for the vertex and
+        face color attributes
+    :param merge_labels: flag to merge all the
+        layer labels into one mesh object after
+        drawing
+    :param instance_duplicates: flag to reuse one
+        mesh datablock for layers with identical
+        fitted data (by content hash) and the
+        same target_faces
+    :param duplicate_decimals: optional - round
+        the fitted data to this many decimals
+        before hashing so trivially different
+        layers share a mesh
+    :param join_layers: flag to join all the
+        layer meshes into one mesh object with a
+        layer_id face attribute after drawing
+    :param previous_report: optional - report
+        returned by the previous draw_model_layers
+        call to keep the objects for unchanged
+        layers in the scene and only rebuild the
+        layers that changed
+    :param change_threshold: relative stats change
+        allowed before a layer is rebuilt (0.0
+        only keeps layers with identical data)
     """
+    if stack_layers and shell_quantiles:
+        raise ValueError(
+            "unsupported stack_layers with "
+            f"shell_quantiles={shell_quantiles} "
+            "only one of them is supported"
+        )
     obj_x = None
     obj_y = None
     obj_z = None
     mesh_cube_report = []
+    # layer index => previous report entry
+    unchanged_layers = {}
 
     log.info(
         f"start - model={input_file} "
@@ -129,85 +374,367 @@ def draw_model_layers(
         f"gif={save_gif} "
         ""
     )
-    # extract the data using safetensors rust mmap
-    all_data_3d = (
-        extract_weights.extract_3d_shapes_from_model_file(
-            input_file=input_file,
-            layer_names=layer_names,
-            max_layers=max_layers,
-            device=device,
-            target_faces=target_faces,
-            target_rows=target_rows,
-            target_cols=target_cols,
-            start_x=x,
-            start_y=y,
-            start_z=z,
-            max_depth=max_depth,
-            pad_per=pad_per,
+    if mesh_index_file:
+        # load the precomputed layer meshes
+        mesh_index = bwma.load_mesh_artifact_index(
+            mesh_index_file
         )
-    )
+        all_data_3d = [
+            {
+                "name": layer["name"],
+                "desc": layer["desc"],
+                "data": None,
+                "mesh_file": layer["file"],
+                "target_faces": layer["target_faces"],
+                "target_rows": layer["target_rows"],
+                "target_cols": layer["target_cols"],
+                "x": layer["x"],
+                "y": layer["y"],
+                "z": layer["z"],
+            }
+            for layer in mesh_index["layers"]
+            if layer["file"]
+        ]
+        if max_layers:
+            all_data_3d = all_data_3d[:max_layers]
+    elif mode == "points":
+        # select the top |w| points using safetensors rust mmap
+        all_data_3d = (
+            extract_weights.extract_top_k_points_from_model_file(
+                input_file=input_file,
+                layer_names=layer_names,
+                max_layers=max_layers,
+                device=device,
+                top_k=top_k,
+                target_rows=target_rows,
+                target_cols=target_cols,
+                start_x=x,
+                start_y=y,
+                start_z=z,
+                pad_per=pad_per,
+            )
+        )
+    else:
+        # extract the data using safetensors rust mmap
+        all_data_3d = (
+            extract_weights.extract_3d_shapes_from_model_file(
+                input_file=input_file,
+                layer_names=layer_names,
+                max_layers=max_layers,
+                device=device,
+                target_faces=target_faces,
+                target_rows=target_rows,
+                target_cols=target_cols,
+                start_x=x,
+                start_y=y,
+                start_z=z,
+                max_depth=max_depth,
+                pad_per=pad_per,
+            )
+        )
+        if total_faces or total_mb:
+            # split the scene budget by layer information
+            layer_budgets = bwfb.allocate_face_budget(
+                all_data=[
+                    data_3d["data"]
+                    for data_3d in all_data_3d
+                ],
+                total_faces=total_faces,
+                total_mb=total_mb,
+                score=budget_score,
+            )
+            for data_3d, layer_budget in zip(
+                all_data_3d, layer_budgets
+            ):
+                data_3d["target_faces"] = layer_budget
+        unchanged_layers = get_unchanged_layers(
+            all_data_3d=all_data_3d,
+            previous_report=previous_report,
+            change_threshold=change_threshold,
+        )
+        # only keep layers that are still drawn
+        scene_layers = bwts.get_scene_layers()
+        unchanged_layers = {
+            layer_idx: entry
+            for layer_idx, entry in unchanged_layers.items()
+            if layer_idx in scene_layers
+        }
+        if unchanged_layers and (join_layers or merge_labels):
+            log.info(
+                "rebuilding all layers because join_layers "
+                "and merge_labels replace the layer objects"
+            )
+            unchanged_layers = {}
+        log.info(
+            f"keeping {len(unchanged_layers)}/"
+            f"{len(all_data_3d)} unchanged layers"
+        )
+        if mask_method:
+            # cache the mask stats once per layer
+            for idx, data_3d in enumerate(all_data_3d):
+                if (idx in unchanged_layers) or (
+                    data_3d.get("data") is None
+                ):
+                    continue
+                data_3d["salience_stats"] = (
+                    bwsm.get_salience_stats(data_3d["data"])
+                )
+        if stack_layers and (mode in [None, "isosurface"]):
+            for group in bwgr.group_layers_by_role(
+                all_data_3d
+            ):
+                if len(group) < 2:
+                    continue
+                if all(
+                    group_idx in unchanged_layers
+                    for group_idx in group
+                ):
+                    continue
+                group_data_3d = [
+                    all_data_3d[group_idx]
+                    for group_idx in group
+                ]
+                group_target_faces = None
+                if all(
+                    data_3d["target_faces"]
+                    for data_3d in group_data_3d
+                ):
+                    group_target_faces = sum(
+                        data_3d["target_faces"]
+                        for data_3d in group_data_3d
+                    )
+                group_masks = None
+                if mask_method:
+                    group_masks = [
+                        bwsm.build_salience_mask(
+                            data=data_3d["data"],
+                            method=mask_method,
+                            stats=data_3d.get(
+                                "salience_stats"
+                            ),
+                        )
+                        for data_3d in group_data_3d
+                    ]
+                layer_reports = bwps.profile_stacked_layers(
+                    all_data=[
+                        data_3d["data"]
+                        for data_3d in group_data_3d
+                    ],
+                    names=[
+                        data_3d["name"]
+                        for data_3d in group_data_3d
+                    ],
+                    target_faces=group_target_faces,
+                    brick_size=brick_size,
+                    min_island_faces=min_island_faces,
+                    min_island_size=min_island_size,
+                    max_islands=max_islands,
+                    masks=group_masks,
+                    engine=engine,
+                )
+                if layer_reports is None:
+                    continue
+                for data_3d, layer_report in zip(
+                    group_data_3d, layer_reports
+                ):
+                    data_3d["closest_report"] = layer_report
 
-    # Clear existing mesh objects
-    bwclear.clear_all_objects()
+    # Remove the previous generation and its orphans
+    bwts.teardown_scene(
+        include_untagged_meshes=True,
+        keep_layers=list(unchanged_layers),
+    )
 
     x_max_text_len = 0
     num_datas = len(all_data_3d)
+    # (data hash, target_faces) => (mesh name, report)
+    mesh_cache = {}
     log.info(f"rendering {num_datas} object shapes")
-    for idx, data_3d in enumerate(all_data_3d):
-        name = data_3d["name"]
-        desc = data_3d["desc"]
-        x_max_text_len = len(desc)
-        data_to_render = data_3d["data"]
-        target_faces = data_3d["target_faces"]
-        obj_x = data_3d["x"]
-        obj_y = data_3d["y"]
-        obj_z = data_3d["z"]
-        # shutdown blender for debugging issues
-        # raise SystemExit
-        log.info(
-            f"rendering {idx + 1}/{num_datas} "
-            f"{name} "
-            f"pos=({obj_x}, {obj_y}, {obj_z})"
-        )
-        (
-            mesh_name,
-            mc_report,
-        ) = mesh_gen.generate_3d_from_3d(
-            name=f"Layer {idx + 1}: {name}",
-            desc=desc,
-            data=data_to_render,
-            x=obj_x,
-            y=obj_y,
-            z=obj_z,
-            target_faces=target_faces,
-            mesh_idx=idx,
-            decimation_ratio=decimation_ratio,
-        )
-        # active status
-        status = 0
-        if mc_report is None:
-            log.info(
-                f"ignoring {idx + 1}/{num_datas} " f"{name}"
-            )
-            # inactive status
-            status = 1
-        else:
+    # stage the layers and link them in one step
+    with bwbb.batch_build(name="bw_layers"):
+        for idx, data_3d in enumerate(all_data_3d):
+            name = data_3d["name"]
+            desc = data_3d["desc"]
+            x_max_text_len = len(desc)
+            data_to_render = data_3d["data"]
+            target_faces = data_3d["target_faces"]
+            obj_x = data_3d["x"]
+            obj_y = data_3d["y"]
+            obj_z = data_3d["z"]
+            # shutdown blender for debugging issues
+            # raise SystemExit
             log.info(
-                f"adding {idx + 1}/{num_datas} "
+                f"rendering {idx + 1}/{num_datas} "
                 f"{name} "
-                f"pos=({obj_x}, {obj_y}, {obj_z}) "
+                f"pos=({obj_x}, {obj_y}, {obj_z})"
+            )
+            if idx in unchanged_layers:
+                # the objects are still in the scene so the
+                # next generation is compared with the data
+                # that was rendered (not the data skipped
+                # now) to catch slow drift
+                rendered_data_3d = unchanged_layers[idx][
+                    "data_3d"
+                ]
+                mesh_cube_report.append(
+                    {
+                        **unchanged_layers[idx],
+                        "data_3d": {
+                            **data_3d,
+                            "layer_hash": rendered_data_3d[
+                                "layer_hash"
+                            ],
+                            "layer_stats": rendered_data_3d[
+                                "layer_stats"
+                            ],
+                        },
+                        "rebuilt": False,
+                    }
+                )
+                continue
+            # tag the layer objects for incremental rebuilds
+            bwbb.set_batch_layer(idx)
+            if (data_3d.get("points") is not None) or (
+                mode == "texture"
+                and data_to_render is not None
+            ):
+                # drawn without meshing or a mesh report
+                add_layer_labels(
+                    name=f"Layer {idx + 1}: {name}",
+                    desc=desc,
+                    x=obj_x,
+                    y=obj_y,
+                    z=obj_z,
+                )
+                if mode == "texture":
+                    layer_obj = bwtp.draw_texture_plane(
+                        name=f"Plane_{idx + 1}",
+                        data=data_to_render,
+                        x=obj_x + 20,
+                        y=obj_y,
+                        z=obj_z + 5,
+                        displacement=texture_displacement,
+                    )
+                else:
+                    layer_obj = bwpc.draw_point_cloud(
+                        name=f"Points_{idx + 1}",
+                        points=data_3d["points"],
+                        values=data_3d["values"],
+                        x=obj_x + 20,
+                        y=obj_y,
+                        z=obj_z + 5,
+                        instance=point_instance,
+                        point_size=point_size,
+                    )
+                mesh_cube_report.append(
+                    {
+                        "name": layer_obj.name,
+                        "status": 0,
+                        "idx": idx,
+                        "layer_name": name,
+                        "target_faces": None,
+                        "closest": None,
+                        "num_points": len(
+                            data_3d.get("points", [])
+                        ),
+                        "data_3d": data_3d,
+                        "rebuilt": True,
+                    }
+                )
+                continue
+            mesh_key = None
+            reuse_mesh = None
+            closest_report = data_3d.get("closest_report")
+            if instance_duplicates and (
+                data_to_render is not None
+            ):
+                mesh_key = (
+                    bwah.get_array_hash(
+                        data_to_render,
+                        decimals=duplicate_decimals,
+                    ),
+                    target_faces,
+                )
+                if mesh_key in mesh_cache:
+                    (
+                        reuse_mesh,
+                        closest_report,
+                    ) = mesh_cache[mesh_key]
+                    log.info(
+                        f"instancing {idx + 1}/{num_datas} "
+                        f"{name} with mesh={reuse_mesh}"
+                    )
+            (
+                mesh_name,
+                mc_report,
+            ) = mesh_gen.generate_3d_from_3d(
+                name=f"Layer {idx + 1}: {name}",
+                desc=desc,
+                data=data_to_render,
+                x=obj_x,
+                y=obj_y,
+                z=obj_z,
+                target_faces=target_faces,
+                mesh_idx=idx,
+                decimation_ratio=decimation_ratio,
+                max_faces=(
+                    target_faces
+                    if (total_faces or total_mb)
+                    else None
+                ),
+                brick_size=brick_size,
+                min_island_faces=min_island_faces,
+                min_island_size=min_island_size,
+                max_islands=max_islands,
+                closest_report=closest_report,
+                mesh_file=data_3d.get("mesh_file"),
+                mask_method=mask_method,
+                salience_stats=data_3d.get("salience_stats"),
+                shell_quantiles=shell_quantiles,
+                engine=engine,
+                mode=mode,
+                safe_for_colors_in_ram=coloring is not None,
+                coloring=coloring or "materials",
+                colormap=colormap,
+                reuse_mesh=reuse_mesh,
+            )
+            if (
+                mesh_key
+                and (reuse_mesh is None)
+                and (mc_report is not None)
+            ):
+                mesh_cache[mesh_key] = (
+                    mesh_name,
+                    mc_report,
+                )
+            # active status
+            status = 0
+            if mc_report is None:
+                log.info(
+                    f"ignoring {idx + 1}/{num_datas} "
+                    f"{name}"
+                )
+                # inactive status
+                status = 1
+            else:
+                log.info(
+                    f"adding {idx + 1}/{num_datas} "
+                    f"{name} "
+                    f"pos=({obj_x}, {obj_y}, {obj_z}) "
+                )
+            mesh_cube_report.append(
+                {
+                    "name": mesh_name,
+                    "status": status,
+                    "idx": idx,
+                    "layer_name": name,
+                    "target_faces": target_faces,
+                    "closest": mc_report,
+                    "instance_of": reuse_mesh,
+                    "data_3d": data_3d,
+                    "rebuilt": True,
+                }
             )
-        mesh_cube_report.append(
-            {
-                "name": mesh_name,
-                "status": status,
-                "idx": idx,
-                "layer_name": name,
-                "target_faces": target_faces,
-                "closest": mc_report,
-                "data_3d": data_3d,
-            }
-        )
     # end of drawing 3d objects
 
     # calculate the center for the rectangle
@@ -247,6 +774,12 @@ def draw_model_layers(
         z_position=z,
     )
 
+    if join_layers:
+        bwjl.join_layers()
+    if merge_labels:
+        bwml.merge_labels()
+    log.info(f"materials={bwmr.get_material_stats()}")
+
     # save the data to various locations
     if save_stl:
         export_stl.save_as_stl(output_path=save_stl)
@@ -0,0 +1,218 @@
+import logging
+import numpy as np
+import bpy
+import bw.bl.batch_build as bwbb
+
+
+log = logging.getLogger(__name__)
+
+
+def new_geometry_socket(
+    node_group,
+    name: str,
+    in_out: str,
+):
+    """
+    new_geometry_socket
+
+    add a geometry input or output socket to a
+    geometry nodes group with the blender 4
+    interface api or the blender 3 inputs/outputs
+    api
+
+    :param node_group: geometry nodes group
+    :param name: socket name
+    :param in_out: INPUT or OUTPUT
+    """
+    if hasattr(node_group, "interface"):
+        node_group.interface.new_socket(
+            name=name,
+            in_out=in_out,
+            socket_type="NodeSocketGeometry",
+        )
+    elif in_out == "INPUT":
+        node_group.inputs.new("NodeSocketGeometry", name)
+    else:
+        node_group.outputs.new("NodeSocketGeometry", name)
+
+
+def get_point_material():
+    """
+    get_point_material
+
+    get or create the shared material that colors
+    each instance by the instancer "value_norm"
+    attribute (0.0 for the most negative and 1.0
+    for the most positive value)
+    """
+    material_name = "bw_points_material"
+    material = bpy.data.materials.get(material_name)
+    if material is not None:
+        return material
+    material = bpy.data.materials.new(name=material_name)
+    material["bw"] = True
+    material.use_nodes = True
+    nodes = material.node_tree.nodes
+    links = material.node_tree.links
+    bsdf = nodes.get("Principled BSDF")
+    attribute = nodes.new("ShaderNodeAttribute")
+    attribute.attribute_type = "INSTANCER"
+    attribute.attribute_name = "value_norm"
+    ramp = nodes.new("ShaderNodeValToRGB")
+    ramp.color_ramp.elements[0].color = (0.0, 0.2, 1.0, 1.0)
+    ramp.color_ramp.elements[1].color = (1.0, 0.1, 0.0, 1.0)
+    links.new(attribute.outputs["Fac"], ramp.inputs["Fac"])
+    links.new(
+        ramp.outputs["Color"], bsdf.inputs["Base Color"]
+    )
+    return material
+
+
+def get_instancer_node_group(
+    instance: str = "sphere",
+    point_size: float = 0.5,
+):
+    """
+    get_instancer_node_group
+
+    get or create the geometry nodes group that
+    instances a sphere or cube on every point so
+    all point clouds share one instancer and
+    material
+
+    :param instance: sphere or cube
+    :param point_size: radius (sphere) or size
+        (cube) for each instance
+    """
+    group_name = f"bw_points_{instance}_{point_size}"
+    node_group = bpy.data.node_groups.get(group_name)
+    if node_group is not None:
+        return node_group
+    node_group = bpy.data.node_groups.new(
+        group_name, "GeometryNodeTree"
+    )
+    node_group["bw"] = True
+    new_geometry_socket(node_group, "Geometry", "INPUT")
+    new_geometry_socket(node_group, "Geometry", "OUTPUT")
+    nodes = node_group.nodes
+    links = node_group.links
+    group_input = nodes.new("NodeGroupInput")
+    group_output = nodes.new("NodeGroupOutput")
+    if instance == "cube":
+        shape = nodes.new("GeometryNodeMeshCube")
+        shape.inputs["Size"].default_value = (
+            point_size,
+            point_size,
+            point_size,
+        )
+    elif instance == "sphere":
+        shape = nodes.new("GeometryNodeMeshIcoSphere")
+        shape.inputs["Radius"].default_value = point_size
+        shape.inputs["Subdivisions"].default_value = 1
+    else:
+        raise ValueError(
+            f"unsupported point instance={instance} "
+            "only sphere and cube are supported"
+        )
+    set_material = nodes.new("GeometryNodeSetMaterial")
+    set_material.inputs["Material"].default_value = (
+        get_point_material()
+    )
+    links.new(
+        shape.outputs["Mesh"],
+        set_material.inputs["Geometry"],
+    )
+    instance_on_points = nodes.new(
+        "GeometryNodeInstanceOnPoints"
+    )
+    links.new(
+        group_input.outputs[0],
+        instance_on_points.inputs["Points"],
+    )
+    links.new(
+        set_material.outputs["Geometry"],
+        instance_on_points.inputs["Instance"],
+    )
+    links.new(
+        instance_on_points.outputs["Instances"],
+        group_output.inputs[0],
+    )
+    return node_group
+
+
+def draw_point_cloud(
+    name: str,
+    points: np.ndarray,
+    values: np.ndarray,
+    x: float = 0.0,
+    y: float = 0.0,
+    z: float = 0.0,
+    instance: str = "sphere",
+    point_size: float = 0.5,
+):
+    """
+    draw_point_cloud
+
+    draw a point cloud as one mesh with only
+    vertices (written with one bulk foreach_set)
+    plus per-point "value" and "value_norm"
+    attributes and render each point as an
+    instanced sphere or cube with a shared
+    geometry nodes instancer
+
+    returns the point cloud object
+
+    :param name: name for the mesh and object
+    :param points: (num_points, 3) array
+    :param values: (num_points,) array stored in
+        the "value" point attribute (and scaled by
+        the max |value| into "value_norm" for
+        coloring)
+    :param x: x position for the object
+    :param y: y position for the object
+    :param z: z position for the object
+    :param instance: sphere or cube
+    :param point_size: radius (sphere) or size
+        (cube) for each instance
+    """
+    points = np.ascontiguousarray(points, dtype=np.float32)
+    values = np.ascontiguousarray(values, dtype=np.float32)
+    num_points = len(points)
+    mesh = bpy.data.meshes.new(name=name)
+    mesh.vertices.add(num_points)
+    mesh.vertices.foreach_set("co", points.reshape(-1))
+    value_attribute = mesh.attributes.new(
+        name="value", type="FLOAT", domain="POINT"
+    )
+    value_attribute.data.foreach_set("value", values)
+    abs_max = (
+        float(np.max(np.abs(values))) if num_points else 0.0
+    )
+    if abs_max <= 0.0:
+        abs_max = 1.0
+    norm_attribute = mesh.attributes.new(
+        name="value_norm", type="FLOAT", domain="POINT"
+    )
+    norm_attribute.data.foreach_set(
+        "value", 0.5 + 0.5 * values / abs_max
+    )
+    mesh.update()
+
+    point_obj = bpy.data.objects.new(name, mesh)
+    bwbb.link_object(point_obj)
+    point_obj.location = (x, y, z)
+
+    modifier = point_obj.modifiers.new(
+        name="bw_points", type="NODES"
+    )
+    modifier.node_group = get_instancer_node_group(
+        instance=instance,
+        point_size=point_size,
+    )
+    log.debug(
+        f"drew point cloud name={name} "
+        f"points={num_points} "
+        f"instance={instance} "
+        f"pos=({x}, {y}, {z})"
+    )
+    return point_obj
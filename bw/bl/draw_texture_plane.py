@@ -0,0 +1,190 @@
+import logging
+import numpy as np
+import bpy
+import bw.bl.batch_build as bwbb
+
+
+log = logging.getLogger(__name__)
+
+
+def build_layer_image(
+    name: str,
+    data: np.ndarray,
+):
+    """
+    build_layer_image
+
+    write a 2d layer into a float bpy.data.images
+    buffer with one bulk pixels.foreach_set. each
+    pixel holds 0.5 + 0.5 * value / max(|value|)
+    so 0.0 is the most negative, 0.5 is zero and
+    1.0 is the most positive weight.
+
+    returns the image
+
+    :param name: image name
+    :param data: 2d array (rows, cols)
+    """
+    num_rows, num_cols = data.shape
+    abs_max = float(np.max(np.abs(data)))
+    if abs_max <= 0.0:
+        abs_max = 1.0
+    normalized = (0.5 + 0.5 * data / abs_max).astype(
+        np.float32
+    )
+    pixels = np.ones(
+        (num_rows, num_cols, 4), dtype=np.float32
+    )
+    pixels[:, :, 0] = normalized
+    pixels[:, :, 1] = normalized
+    pixels[:, :, 2] = normalized
+    image = bpy.data.images.new(
+        name=name,
+        width=num_cols,
+        height=num_rows,
+        alpha=False,
+        float_buffer=True,
+    )
+    image["bw"] = True
+    image.colorspace_settings.name = "Non-Color"
+    image.pixels.foreach_set(pixels.reshape(-1))
+    image.update()
+    return image
+
+
+def build_colormap_material(
+    name: str,
+    image,
+):
+    """
+    build_colormap_material
+
+    build a material that maps the layer image
+    through a blue, white and red color ramp
+
+    returns the material
+
+    :param name: material name
+    :param image: layer image from build_layer_image
+    """
+    material = bpy.data.materials.new(name=name)
+    material["bw"] = True
+    material.use_nodes = True
+    nodes = material.node_tree.nodes
+    links = material.node_tree.links
+    bsdf = nodes.get("Principled BSDF")
+    texture = nodes.new("ShaderNodeTexImage")
+    texture.image = image
+    texture.interpolation = "Closest"
+    ramp = nodes.new("ShaderNodeValToRGB")
+    elements = ramp.color_ramp.elements
+    elements[0].color = (0.0, 0.2, 1.0, 1.0)
+    elements[1].color = (1.0, 0.1, 0.0, 1.0)
+    elements.new(0.5).color = (1.0, 1.0, 1.0, 1.0)
+    links.new(texture.outputs["Color"], ramp.inputs["Fac"])
+    links.new(
+        ramp.outputs["Color"], bsdf.inputs["Base Color"]
+    )
+    return material
+
+
+def draw_texture_plane(
+    name: str,
+    data: np.ndarray,
+    x: float = 0.0,
+    y: float = 0.0,
+    z: float = 0.0,
+    displacement: float = None,
+    displacement_levels: int = 6,
+):
+    """
+    draw_texture_plane
+
+    draw a fitted layer as a float image on a
+    single plane with a colormap material so no
+    cpu meshing is needed. the plane uses the same
+    (row, depth, col) orientation as the layer
+    meshes.
+
+    returns the plane object
+
+    :param name: name for the image, mesh and
+        object
+    :param data: 2d array (or a fitted 3d array
+        where the first depth slice is used)
+    :param x: x position for the object
+    :param y: y position for the object
+    :param z: z position for the object
+    :param displacement: optional - displace the
+        plane along the depth axis by the layer
+        values with this strength (adds a simple
+        subdivision and a displace modifier)
+    :param displacement_levels: subdivision levels
+        for the displacement
+    """
+    if data.ndim == 3:
+        data = data[:, :, 0]
+    data = np.asarray(data, dtype=np.float32)
+    num_rows, num_cols = data.shape
+    image = build_layer_image(
+        name=f"{name}_Image", data=data
+    )
+
+    mesh = bpy.data.meshes.new(name=name)
+    mesh.from_pydata(
+        [
+            (0.0, 0.0, 0.0),
+            (0.0, 0.0, float(num_cols)),
+            (float(num_rows), 0.0, float(num_cols)),
+            (float(num_rows), 0.0, 0.0),
+        ],
+        [],
+        [(0, 1, 2, 3)],
+    )
+    # u follows the cols and v follows the rows
+    uv_layer = mesh.uv_layers.new(name="UVMap")
+    uv_layer.data.foreach_set(
+        "uv",
+        np.array(
+            [0.0, 0.0, 1.0, 0.0, 1.0, 1.0, 0.0, 1.0],
+            dtype=np.float32,
+        ),
+    )
+    mesh.materials.append(
+        build_colormap_material(
+            name=f"{name}_Material", image=image
+        )
+    )
+    mesh.update()
+
+    plane_obj = bpy.data.objects.new(name, mesh)
+    bwbb.link_object(plane_obj)
+    plane_obj.location = (x, y, z)
+
+    if displacement:
+        subdivision = plane_obj.modifiers.new(
+            name="bw_subdivision", type="SUBSURF"
+        )
+        subdivision.subdivision_type = "SIMPLE"
+        subdivision.levels = displacement_levels
+        subdivision.render_levels = displacement_levels
+        texture = bpy.data.textures.new(
+            name=f"{name}_Texture", type="IMAGE"
+        )
+        texture.image = image
+        texture["bw"] = True
+        displace = plane_obj.modifiers.new(
+            name="bw_displace", type="DISPLACE"
+        )
+        displace.texture = texture
+        displace.texture_coords = "UV"
+        displace.direction = "Y"
+        displace.mid_level = 0.5
+        displace.strength = displacement
+    log.debug(
+        f"drew texture plane name={name} "
+        f"data={data.shape} "
+        f"displacement={displacement} "
+        f"pos=({x}, {y}, {z})"
+    )
+    return plane_obj
@@ -1,20 +1,31 @@
 import numpy as np
 import logging
 import bpy
-import bmesh
 import bw.bl.get_quantile_colors as bwqc
 import bw.bl.add_text as add_text
 import bw.bl.create_rectangle as cr
 import bw.bl.clear_all_objects as bwclear
-import bw.bl.assign_color as assign_color
-import bw.bl.assign_material as assign_material
-import bw.bl.decimator_on_object as decimator
-import bw.sk.profile_data_with_cubes as bwmc
+import bw.bl.assign_face_colors as bwafc
+import bw.bl.assign_color_attribute as bwca
+import bw.bl.build_mesh_from_arrays as bwmfa
+import bw.bl.batch_build as bwbb
+import bw.np.build_salience_mask as bwsm
+import bw.sk.build_layer_mesh as bwlm
+import bw.sk.mesh_artifact as bwma
+import bw.sk.build_compact_mesh as bwcm
+import bw.sk.decimate_mesh as bwdm
 
 
 log = logging.getLogger(__name__)
 
 
+supported_colorings = [
+    "materials",
+    "vertex",
+    "face",
+]
+
+
 def generate_3d_from_3d(
     data: np.ndarray,
     target_faces: int = None,
@@ -49,7 +60,22 @@ def generate_3d_from_3d(
     mesh_idx: int = None,
     num_colors: int = 5,
     decimation_ratio: float = None,
+    max_faces: int = None,
     safe_for_colors_in_ram: bool = False,
+    brick_size: int = None,
+    closest_report: dict = None,
+    mesh_file: str = None,
+    min_island_faces: int = None,
+    min_island_size: float = None,
+    max_islands: int = None,
+    mask_method: str = None,
+    salience_stats: dict = None,
+    shell_quantiles: list = None,
+    engine: str = None,
+    mode: str = None,
+    coloring: str = "materials",
+    colormap: str = "diverging",
+    reuse_mesh: str = None,
 ):
     """
     generate_3d_from_3d
@@ -67,11 +93,14 @@ def generate_3d_from_3d(
         closest_report,
     )
 
-    :param data: 3d array data
+    :param data: 3d array data (optional if
+        closest_report or mesh_file is set)
     :param target_faces: optional - find the nearest
         marching cubes configuration by resulting
         number of faces in the volume
-    :param mask: 3d array for mask
+    :param mask: optional - 3d boolean array with
+        the same shape as the data to limit marching
+        cubes to salient regions
     :param name: optional - name for labeling the
         mesh to the left
     :param name_color: hex color string for the name text
@@ -119,239 +148,279 @@ def generate_3d_from_3d(
         cause the mesh to fail drawing)
     :param decimation_ratio: reduce each
         layer this percentage with supported values between
-        0.0 and 1.0
+        0.0 and 1.0 (fraction of the faces to keep
+        using bw.sk.decimate_mesh before the mesh
+        is loaded into blender)
+    :param max_faces: optional - hard cap on the
+        number of faces for the layer. meshes over
+        the cap are reduced with
+        bw.sk.decimate_mesh (used for the
+        scene-level face budget)
     :param safe_for_colors_in_ram: flag to
-        force-enable colors. coloring this much
-        data is very expensive so it is off
-        by default
+        enable colors (for more refer to the
+        coloring argument)
+    :param brick_size: optional - run marching cubes
+        in overlapping bricks of this many cells
+        to bound peak memory for very large volumes
+    :param closest_report: optional - precomputed
+        closest report dictionary to draw instead
+        of running marching cubes
+    :param mesh_file: optional - path to a layer
+        npz artifact from bw.sk.mesh_artifact to
+        draw instead of running marching cubes
+    :param min_island_faces: optional - drop
+        disconnected surface components with fewer
+        faces than this
+    :param min_island_size: optional - drop
+        disconnected surface components with a
+        smaller bounding box extent (in voxels)
+    :param max_islands: optional - keep only this
+        many of the largest surface components
+    :param mask_method: optional - build the mask
+        with bw.np.build_salience_mask using
+        quantile, top_k_blocks or outliers
+    :param salience_stats: optional - cached
+        bw.np.build_salience_mask.get_salience_stats
+        for the data so the mask does not
+        recompute them
+    :param shell_quantiles: optional - draw nested
+        isosurfaces at these data quantiles (for
+        example [0.05, 0.5, 0.95]) instead of
+        profiling for one level
+    :param engine: optional - isosurface engine
+        marching_cubes (default) or surface_nets
+        for quad meshes with roughly half the faces
+    :param mode: optional - isosurface (default),
+        heightmap to build a displaced grid mesh
+        directly from each fitted layer or contours
+        to extrude 2d contours at the
+        shell_quantiles levels
+    :param coloring: materials (default) to color
+        faces with a shared palette of num_colors
+        materials, vertex for a continuous per-vertex
+        color attribute or face for a flat per-face
+        color attribute
+    :param colormap: colormap for the vertex and
+        face color attributes (for more refer to
+        bw.np.apply_colormap)
+    :param reuse_mesh: optional - name of an
+        existing mesh datablock to link to a new
+        object instead of building a mesh (for
+        duplicate layers)
     """
+    if coloring not in supported_colorings:
+        raise ValueError(
+            f"unsupported coloring={coloring} "
+            f"only {supported_colorings} are supported"
+        )
 
     # for debugging
     if clean_workspace:
         bwclear.clear_all_objects()
-    if not mesh_idx:
+    if mesh_idx is None:
         mesh_idx = 1
 
     mesh_name = f"Mesh_{mesh_idx}"
     mesh_obj_name = f"MeshObj_{mesh_idx}"
 
-    # Create a new mesh
-    mesh = bpy.data.meshes.new(name=mesh_name)
+    # Create a new mesh or link an existing one
+    if reuse_mesh:
+        mesh = bpy.data.meshes[reuse_mesh]
+        log.debug(f"reusing mesh={mesh.name}")
+    else:
+        mesh = bpy.data.meshes.new(name=mesh_name)
+    # blender renames duplicate datablock names
+    mesh_name = mesh.name
     mesh_obj = bpy.data.objects.new(mesh_obj_name, mesh)
 
-    # Link the mesh to the scene
-    bpy.context.scene.collection.objects.link(mesh_obj)
-    bpy.context.view_layer.objects.active = mesh_obj
-
-    mesh_obj.select_set(True)
-
-    # Flip the array to have the desired orientation (x, z, y)
-    data = np.transpose(data, (0, 2, 1))
+    # Link the mesh to the scene (or the batch staging)
+    bwbb.link_object(mesh_obj, select=True)
+    # tag the layer for bw.bl.join_layers
+    mesh_obj["bw_layer"] = mesh_idx
+    mesh_obj["bw_mesh"] = True
 
-    # Apply marching cubes algorithm and build a report
-    mc_report = bwmc.profile_data_with_cubes(
-        data=data,
-        data_name=name,
-        target_mb=target_mb,
-        target_faces=target_faces,
-        save_to_file=mc_report_file,
-        include_vertices=True,
-        include_normals=True,
-        include_faces=True,
-        include_masks=True,
-    )
-    if mc_report is None:
-        mc_report = bwmc.profile_data_with_cubes(
-            data=data,
-            data_name=name,
-            target_mb=target_mb,
-            target_faces=1000,
-            save_to_file=mc_report_file,
-            include_vertices=True,
-            include_normals=True,
-            include_faces=True,
-            include_masks=True,
-        )
-        if mc_report is None:
-            log.debug(
-                "failed to find a marching cube profile for "
-                f"name={name}"
+    if not reuse_mesh:
+        if mesh_file:
+            closest_report = bwma.load_mesh_artifact(
+                mesh_file
             )
-            return (
-                mesh_name,
-                None,
+        if closest_report is None:
+            if (mask is None) and mask_method:
+                mask = bwsm.build_salience_mask(
+                    data=data,
+                    method=mask_method,
+                    stats=salience_stats,
+                )
+            closest_report = bwlm.build_layer_mesh(
+                data=data,
+                name=name,
+                target_faces=target_faces,
+                target_mb=target_mb,
+                mc_report_file=mc_report_file,
+                brick_size=brick_size,
+                min_island_faces=min_island_faces,
+                min_island_size=min_island_size,
+                max_islands=max_islands,
+                mask=mask,
+                shell_quantiles=shell_quantiles,
+                engine=engine,
+                mode=mode,
             )
-
-    # Find the closest report based off the target
-    closest_report = mc_report["closest"]
-    if len(closest_report) == 0:
-        log.error(
-            "failed to find a marching cube configuration "
-            f"name={name} "
-            f"that targets faces={target_faces} "
-            f"size_mb={target_mb} "
-            "stopping"
+            if closest_report is None:
+                return (
+                    mesh_name,
+                    None,
+                )
+        # weld and shrink the mesh before handing it to blender
+        compact_mesh = bwcm.build_compact_mesh(
+            vertices=closest_report["vertices"],
+            faces=closest_report["faces"],
+            values=closest_report["z_values"],
         )
-        # raise SystemExit
-        return (
-            mesh_name,
-            None,
+        vertices = compact_mesh["vertices"]
+        faces = compact_mesh["faces"]
+        # normals = closest_report['normals']
+        mc_z_values = compact_mesh["values"]
+        closest_level = closest_report["level"]
+        closest_step_size = closest_report["step_size"]
+        closest_desc = closest_report["desc"]
+        data_shape = None
+        if data is not None:
+            data_shape = data.shape
+        num_vertices = len(vertices)
+        num_faces = len(faces)
+        log.debug(
+            f"mc {closest_desc} target_faces={target_faces} "
+            f"level={closest_level} "
+            f"step_size{closest_step_size} "
+            f"from src data.shape={data_shape} "
+            f"cubes z_values.shape={mc_z_values.shape} "
+            f"vertices={num_vertices} "
+            f"faces={num_faces} "
+            f"level={level} step_size={step_size} "
+            f"decimation={decimation_ratio} "
+            f"mesh_size={compact_mesh['size']} "
+            "calculated "
+            ""
         )
-    vertices = closest_report["vertices"]
-    faces = closest_report["faces"]
-    # normals = closest_report['normals']
-    mc_z_values = closest_report["z_values"]
-    closest_level = closest_report["level"]
-    closest_step_size = closest_report["step_size"]
-    closest_desc = closest_report["desc"]
-    num_vertices = len(vertices)
-    num_faces = len(faces)
-    log.debug(
-        f"mc {closest_desc} target_faces={target_faces} "
-        f"level={closest_level} "
-        f"step_size{closest_step_size} "
-        f"from src data.shape={data.shape} "
-        f"cubes z_values.shape={mc_z_values.shape} "
-        f"vertices={num_vertices} "
-        f"faces={num_faces} "
-        f"level={level} step_size={step_size} "
-        f"decimation={decimation_ratio} "
-        "calculated "
-        ""
-    )
-    z_values = mc_z_values
-
-    mesh.from_pydata(vertices, [], faces)
-    mesh.update()
-
-    # reduce the mesh marching cube complexity
-    if decimation_ratio:
-        if 0.0 < decimation_ratio < 1.0:
-            if False:
-                decimator.apply_decimator(
-                    name=mesh_obj_name,
+        # reduce the mesh marching cube complexity
+        # before blender has to ingest it
+        if decimation_ratio:
+            if 0.0 < decimation_ratio < 1.0:
+                (
+                    vertices,
+                    faces,
+                    mc_z_values,
+                ) = bwdm.decimate_mesh(
+                    vertices=vertices,
+                    faces=faces,
+                    values=mc_z_values,
                     decimation_ratio=decimation_ratio,
                 )
-        else:
-            log.error(
-                f"invalid decimation_ratio={decimation_ratio} "
-                "only values between 0.0 and 1.0 "
-                "are supported"
-            )
-
-    # Create a BMesh
-    bm = bmesh.new()
-
-    # Create vertices
-    log.debug(
-        "rendering mesh "
-        f"vertices={len(vertices)} "
-        f"faces={len(faces)}"
-    )
-
-    # scale the vertices
-    for v in vertices:
-        bm.verts.new(
+            else:
+                log.error(
+                    f"invalid decimation_ratio={decimation_ratio} "
+                    "only values between 0.0 and 1.0 "
+                    "are supported"
+                )
+        # profiling picks the closest configuration
+        # at or above target_faces so enforce the cap
+        if max_faces and (len(faces) > max_faces):
             (
-                v[0] * vertex_scale_size,
-                v[1] * vertex_scale_size,
-                v[2] * vertex_scale_size,
-            )
-        )
-
-    # Ensure lookup table for vertices
-    bm.verts.ensure_lookup_table()
-
-    # Create faces
-    for f in faces[:-3]:
-        bm.faces.new([bm.verts[i] for i in f])
-
-    # Ensure lookup table for faces
-    bm.faces.ensure_lookup_table()
-
-    # determine colors based off the min/max values
-    # in the z-axis
-
-    # use the face's z weights to
-    min_values = []
-    max_values = []
-    z_values = []
-    z_min = None
-    z_max = None
-    num_faces = len(faces)
-    if num_faces > 5000:
-        if safe_for_colors_in_ram:
-            log.critical(
-                "warning consider disabling colors to save on ram "
-                f"for num_faces={num_faces}"
+                vertices,
+                faces,
+                mc_z_values,
+            ) = bwdm.decimate_mesh(
+                vertices=vertices,
+                faces=faces,
+                values=mc_z_values,
+                target_faces=max_faces,
             )
-    if safe_for_colors_in_ram:
-        log.debug(f"colorizing num_faces={num_faces}")
-        for face in bm.faces:
-            z_values_face = np.array(
-                [v.co.z for v in face.verts]
-            )
-            z_min = np.min(z_values_face)
-            z_max = np.max(z_values_face)
-            break
-
-        for face in bm.faces:
-            z_values_face = np.array(
-                [v.co.z for v in face.verts]
-            )
-            if z_values_face.size > 0:
-                cur_min = np.min(z_values_face)
-                cur_max = np.max(z_values_face)
-                if z_min > cur_min:
-                    z_min = cur_min
-                    # add the min to the front
-                    min_values.insert(0, cur_min)
-                else:
-                    min_values.append(cur_min)
-                if z_max < cur_max:
-                    z_max = cur_max
-                    # add the max to the end
-                    max_values.append(cur_max)
-                else:
-                    max_values.insert(0, cur_max)
-        # partially-sorted z_values
-        z_values = np.array(min_values + max_values)
+            if len(faces) > max_faces:
+                log.warning(
+                    f"{name} faces={len(faces)} "
+                    f"over max_faces={max_faces} "
+                    "after decimating"
+                )
+        z_values = mc_z_values
 
-        if z_min:
-            z_min -= 1.0
-        if z_max:
-            z_max += 1.0
+        # Create the mesh with the bulk data api
         log.debug(
-            f"using face z_values: {z_values} "
-            f"[{z_min},{z_max}]"
+            "rendering mesh "
+            f"vertices={len(vertices)} "
+            f"faces={len(faces)}"
         )
-        # get build the colors based off the max/min
-        color_dict = bwqc.get_quantile_colors(
-            min_value=z_min,
-            max_value=z_max,
-            num=num_colors,
-            opacity=0.5,
-            z_values=z_values,
+        vertices = bwmfa.build_mesh_from_arrays(
+            mesh=mesh,
+            vertices=vertices,
+            faces=faces,
+            vertex_scale_size=vertex_scale_size,
         )
 
-        # total_weight = np.sum(z_values)
-
-        # Colorize faces based on weighted percentile
-        for face in bm.faces:
-            z_values_face = np.array(
-                [v.co.z for v in face.verts]
+        # determine colors based off the min/max values
+        # in the z-axis
+
+        # use the face's z weights to
+        z_values = []
+        z_min = None
+        z_max = None
+        num_faces = len(faces)
+        if (
+            safe_for_colors_in_ram
+            and num_faces
+            and coloring != "materials"
+        ):
+            log.debug(
+                f"colorizing num_faces={num_faces} "
+                f"coloring={coloring}"
             )
-            # Change to desired percentile
-            weighted_percentile = np.percentile(
-                z_values_face, color_percentile
+            bwca.assign_color_attribute(
+                mesh=mesh,
+                faces=faces,
+                vertices=vertices,
+                domain=coloring,
+                colormap=colormap,
+                color_percentile=color_percentile,
             )
-            color = assign_color.assign_color(
-                weighted_percentile, color_dict
+        elif safe_for_colors_in_ram and num_faces:
+            log.debug(f"colorizing num_faces={num_faces}")
+            # (num_faces, N) z for every face corner
+            face_z = vertices[:, 2][
+                np.asarray(faces, dtype=np.int64)
+            ]
+            face_min = np.min(face_z, axis=1)
+            face_max = np.max(face_z, axis=1)
+            z_min = np.min(face_min)
+            z_max = np.max(face_max)
+            z_values = np.concatenate([face_min, face_max])
+
+            if z_min:
+                z_min -= 1.0
+            if z_max:
+                z_max += 1.0
+            log.debug(
+                f"using face z_values: {z_values} "
+                f"[{z_min},{z_max}]"
             )
-            # if you hit this, you cannot draw anymore faces/colors
-            # try/ex will just run out of ram
-            face.material_index = (
-                assign_material.assign_material(color, mesh)
+            # get build the colors based off the max/min
+            color_dict = bwqc.get_quantile_colors(
+                min_value=z_min,
+                max_value=z_max,
+                num=num_colors,
+                opacity=0.5,
+                z_values=z_values,
+            )
+
+            # total_weight = np.sum(z_values)
+
+            # Colorize faces based on weighted percentile
+            # with one shared material per color range
+            bwafc.assign_face_colors(
+                mesh=mesh,
+                faces=faces,
+                vertices=vertices,
+                color_dictionary=color_dict,
+                color_percentile=color_percentile,
             )
     # if able to support coloring with ram
 
@@ -387,10 +456,6 @@ def generate_3d_from_3d(
 
     mesh_obj.location = (mesh_x, mesh_y, mesh_z)
 
-    # Update the BMesh and free it
-    bm.to_mesh(mesh)
-    bm.free()
-
     # Create the background if enabled
     if background_enabled:
         if not background_x:
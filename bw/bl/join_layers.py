@@ -0,0 +1,191 @@
+import logging
+import numpy as np
+import bpy
+import bw.bl.build_mesh_from_arrays as bwmfa
+import bw.bl.merge_labels as bwml
+import bw.bl.batch_build as bwbb
+
+
+log = logging.getLogger(__name__)
+
+
+def get_color_attribute_arrays(
+    mesh,
+    attribute_name: str = "bw_color",
+):
+    """
+    get_color_attribute_arrays
+
+    read a float color attribute with one
+    foreach_get
+
+    returns a tuple (
+        domain,
+        colors,
+    ) or None if the mesh does not have the
+    attribute
+
+    :param mesh: bpy.types.Mesh
+    :param attribute_name: color attribute name
+    """
+    attribute = mesh.color_attributes.get(attribute_name)
+    if attribute is None:
+        return None
+    colors = np.empty(
+        len(attribute.data) * 4, dtype=np.float32
+    )
+    attribute.data.foreach_get("color", colors)
+    return (
+        attribute.domain,
+        colors.reshape(-1, 4),
+    )
+
+
+def join_layers(
+    name: str = "bw_model",
+    objects: list = None,
+    remove_sources: bool = True,
+    attribute_name: str = "layer_id",
+    color_attribute_name: str = "bw_color",
+):
+    """
+    join_layers
+
+    concatenate every layer mesh object into one
+    mesh object with the object offsets applied and
+    one bulk write. the layer index is stored in an
+    integer face attribute for selection and
+    coloring. material slots and the color
+    attribute (from bw.bl.assign_color_attribute)
+    are kept.
+
+    returns the joined object or None if there
+    are no layer objects
+
+    :param name: name for the joined mesh and
+        object
+    :param objects: optional - layer objects to
+        join with default every scene object tagged
+        with a "bw_mesh" custom property (for more
+        refer to bw.bl.generate_3d_from_3d)
+    :param remove_sources: flag to remove the
+        source layer objects (and their meshes once
+        unused) after joining
+    :param attribute_name: name for the integer
+        face attribute holding the layer index
+    :param color_attribute_name: color attribute
+        to carry over when every layer has it in
+        the same domain
+    """
+    if objects is None:
+        objects = [
+            obj
+            for obj in bpy.context.scene.objects
+            if (obj.type == "MESH") and obj.get("bw_mesh")
+        ]
+    if not objects:
+        return None
+    materials = []
+    blocks_vertices = []
+    blocks_loops = []
+    blocks_totals = []
+    blocks_materials = []
+    blocks_layer_ids = []
+    blocks_colors = []
+    color_domains = set()
+    num_vertices = 0
+    for obj in objects:
+        (
+            vertices,
+            loop_vertices,
+            loop_totals,
+            material_indices,
+        ) = bwml.get_mesh_arrays(obj.data)
+        # matrix_basis does not need a depsgraph update
+        matrix = np.array(
+            obj.matrix_basis, dtype=np.float32
+        )
+        vertices = (
+            vertices @ matrix[:3, :3].T + matrix[:3, 3]
+        )
+        slot_map = np.zeros(
+            max(len(obj.data.materials), 1), dtype=np.int32
+        )
+        for slot_idx, material in enumerate(
+            obj.data.materials
+        ):
+            if material is None:
+                continue
+            if material not in materials:
+                materials.append(material)
+            slot_map[slot_idx] = materials.index(material)
+        color_arrays = get_color_attribute_arrays(
+            obj.data, attribute_name=color_attribute_name
+        )
+        if color_arrays is None:
+            color_domains.add(None)
+        else:
+            color_domains.add(color_arrays[0])
+            blocks_colors.append(color_arrays[1])
+        blocks_vertices.append(vertices)
+        blocks_loops.append(loop_vertices + num_vertices)
+        blocks_totals.append(loop_totals)
+        blocks_materials.append(slot_map[material_indices])
+        blocks_layer_ids.append(
+            np.full(
+                len(loop_totals),
+                int(obj.get("bw_layer", 0)),
+                dtype=np.int32,
+            )
+        )
+        num_vertices += len(vertices)
+
+    loop_totals = np.concatenate(blocks_totals)
+    mesh = bpy.data.meshes.new(name=name)
+    bwmfa.build_mesh_from_loops(
+        mesh=mesh,
+        vertices=np.concatenate(blocks_vertices),
+        loop_vertices=np.concatenate(blocks_loops),
+        loop_totals=loop_totals,
+    )
+    for material in materials:
+        mesh.materials.append(material)
+    mesh.polygons.foreach_set(
+        "material_index", np.concatenate(blocks_materials)
+    )
+    layer_attribute = mesh.attributes.new(
+        name=attribute_name, type="INT", domain="FACE"
+    )
+    layer_attribute.data.foreach_set(
+        "value", np.concatenate(blocks_layer_ids)
+    )
+    if (
+        len(color_domains) == 1
+        and None not in color_domains
+    ):
+        color_attribute = mesh.color_attributes.new(
+            name=color_attribute_name,
+            type="FLOAT_COLOR",
+            domain=color_domains.pop(),
+        )
+        color_attribute.data.foreach_set(
+            "color",
+            np.concatenate(blocks_colors).reshape(-1),
+        )
+        mesh.color_attributes.active_color = color_attribute
+    joined_obj = bpy.data.objects.new(name, mesh)
+    bwbb.link_object(joined_obj)
+
+    if remove_sources:
+        for obj in objects:
+            layer_mesh = obj.data
+            bpy.data.objects.remove(obj, do_unlink=True)
+            if layer_mesh.users == 0:
+                bpy.data.meshes.remove(layer_mesh)
+    log.info(
+        f"joined layers={len(objects)} "
+        f"vertices={num_vertices} "
+        f"faces={len(loop_totals)} "
+        f"materials={len(materials)}"
+    )
+    return joined_obj
@@ -0,0 +1,119 @@
+import logging
+import bpy
+
+
+log = logging.getLogger(__name__)
+
+
+# (rgba, use_nodes, settings) => material name
+registry = {}
+counters = {
+    "created": 0,
+    "reused": 0,
+}
+
+
+def get_material_key(
+    rgba: tuple,
+    use_nodes: bool = False,
+    settings: dict = None,
+):
+    """
+    get_material_key
+
+    build the hashable registry key for a color
+    and its shader settings (colors are rounded
+    so float noise does not create duplicates)
+
+    :param rgba: (r, g, b, a) color tuple
+    :param use_nodes: node-based material flag
+    :param settings: optional - material
+        attributes to set on creation
+    """
+    return (
+        tuple(round(float(channel), 4) for channel in rgba),
+        bool(use_nodes),
+        tuple(sorted((settings or {}).items())),
+    )
+
+
+def get_material(
+    rgba: tuple,
+    use_nodes: bool = False,
+    prefix: str = "bw_material",
+    settings: dict = None,
+):
+    """
+    get_material
+
+    get a shared material for a color and shader
+    settings or create and register it the first
+    time it is needed. every drawing helper uses
+    this so a scene only holds one material per
+    unique (rgba, settings)
+
+    returns the bpy.types.Material
+
+    :param rgba: (r, g, b, a) color tuple
+    :param use_nodes: node-based material flag
+    :param prefix: name prefix for new materials
+    :param settings: optional - material
+        attributes to set on creation (for
+        example {"blend_method": "BLEND"})
+    """
+    key = get_material_key(
+        rgba=rgba, use_nodes=use_nodes, settings=settings
+    )
+    material_name = registry.get(key)
+    if material_name is not None:
+        material = bpy.data.materials.get(material_name)
+        if material is not None:
+            counters["reused"] += 1
+            return material
+    material = bpy.data.materials.new(
+        name=f"{prefix}_{len(registry)}"
+    )
+    material.use_nodes = use_nodes
+    material["bw"] = True
+    material.diffuse_color = key[0]
+    for setting_name, setting_value in key[2]:
+        setattr(material, setting_name, setting_value)
+    registry[key] = material.name
+    counters["created"] += 1
+    return material
+
+
+def get_material_stats():
+    """
+    get_material_stats
+
+    returns a dictionary with the number of
+    registered materials and how many were
+    created vs reused
+
+        ```
+        stats = {
+            "materials": 3,
+            "created": 3,
+            "reused": 597,
+        }
+        ```
+    """
+    return {
+        "materials": len(registry),
+        "created": counters["created"],
+        "reused": counters["reused"],
+    }
+
+
+def reset_material_registry():
+    """
+    reset_material_registry
+
+    forget every registered material and reset
+    the counters (the materials stay in
+    bpy.data.materials)
+    """
+    registry.clear()
+    counters["created"] = 0
+    counters["reused"] = 0
@@ -0,0 +1,163 @@
+import logging
+import numpy as np
+import bpy
+import bw.bl.build_mesh_from_arrays as bwmfa
+import bw.bl.batch_build as bwbb
+
+
+log = logging.getLogger(__name__)
+
+
+def get_mesh_arrays(
+    mesh,
+):
+    """
+    get_mesh_arrays
+
+    read a mesh into numpy arrays with bulk
+    foreach_get calls
+
+    returns a tuple (
+        vertices,
+        loop_vertices,
+        loop_totals,
+        material_indices,
+    )
+
+    :param mesh: bpy.types.Mesh
+    """
+    num_vertices = len(mesh.vertices)
+    num_loops = len(mesh.loops)
+    num_faces = len(mesh.polygons)
+    vertices = np.empty(num_vertices * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", vertices)
+    loop_vertices = np.empty(num_loops, dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loop_vertices)
+    loop_totals = np.empty(num_faces, dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
+    material_indices = np.empty(num_faces, dtype=np.int32)
+    mesh.polygons.foreach_get(
+        "material_index", material_indices
+    )
+    return (
+        vertices.reshape(-1, 3),
+        loop_vertices,
+        loop_totals,
+        material_indices,
+    )
+
+
+def merge_labels(
+    name: str = "bw_labels",
+    objects: list = None,
+    remove_sources: bool = True,
+):
+    """
+    merge_labels
+
+    merge every text label into one mesh object
+    with a single depsgraph evaluation so large
+    scenes hold one label object instead of two
+    per layer. label materials are kept as
+    material slots on the merged mesh.
+
+    returns the merged object or None if there
+    are no labels
+
+    :param name: name for the merged mesh and
+        object
+    :param objects: optional - label objects to
+        merge with default every scene object
+        tagged with a "bw_label" custom property
+        (for more refer to bw.bl.add_text)
+    :param remove_sources: flag to remove the
+        source label objects after merging
+    """
+    if objects is None:
+        objects = [
+            obj
+            for obj in bpy.context.scene.objects
+            if obj.get("bw_label")
+        ]
+    if not objects:
+        return None
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    materials = []
+    blocks_vertices = []
+    blocks_loops = []
+    blocks_totals = []
+    blocks_materials = []
+    num_vertices = 0
+    for obj in objects:
+        label_mesh = bpy.data.meshes.new_from_object(
+            obj.evaluated_get(depsgraph)
+        )
+        (
+            vertices,
+            loop_vertices,
+            loop_totals,
+            material_indices,
+        ) = get_mesh_arrays(label_mesh)
+        # move the label vertices into world space
+        matrix = np.array(
+            obj.matrix_world, dtype=np.float32
+        )
+        vertices = (
+            vertices @ matrix[:3, :3].T + matrix[:3, 3]
+        )
+        # map the label material slots to merged slots
+        slot_map = np.zeros(
+            max(len(label_mesh.materials), 1),
+            dtype=np.int32,
+        )
+        for slot_idx, material in enumerate(
+            label_mesh.materials
+        ):
+            if material is None:
+                continue
+            if material not in materials:
+                materials.append(material)
+            slot_map[slot_idx] = materials.index(material)
+        blocks_vertices.append(vertices)
+        blocks_loops.append(loop_vertices + num_vertices)
+        blocks_totals.append(loop_totals)
+        blocks_materials.append(slot_map[material_indices])
+        num_vertices += len(vertices)
+        bpy.data.meshes.remove(label_mesh)
+
+    vertices = np.concatenate(blocks_vertices)
+    loop_vertices = np.concatenate(blocks_loops)
+    loop_totals = np.concatenate(blocks_totals)
+    material_indices = np.concatenate(blocks_materials)
+
+    mesh = bpy.data.meshes.new(name=name)
+    bwmfa.build_mesh_from_loops(
+        mesh=mesh,
+        vertices=vertices,
+        loop_vertices=loop_vertices,
+        loop_totals=loop_totals,
+    )
+    for material in materials:
+        mesh.materials.append(material)
+    mesh.polygons.foreach_set(
+        "material_index", material_indices
+    )
+    merged_obj = bpy.data.objects.new(name, mesh)
+    bwbb.link_object(merged_obj)
+
+    if remove_sources:
+        for obj in objects:
+            data = obj.data
+            bpy.data.objects.remove(obj, do_unlink=True)
+            if data is not None and data.users == 0:
+                if isinstance(data, bpy.types.Mesh):
+                    bpy.data.meshes.remove(data)
+                else:
+                    bpy.data.curves.remove(data)
+    log.debug(
+        f"merged labels={len(objects)} "
+        f"vertices={len(vertices)} "
+        f"faces={len(loop_totals)} "
+        f"materials={len(materials)}"
+    )
+    return merged_obj
@@ -2,6 +2,7 @@ import os
 import datetime
 import logging
 import bw.bl.draw_model_layers as draw_layers
+import bw.bl.watch_checkpoints as bwwc
 import bpy
 
 
@@ -23,6 +24,9 @@ def run_ai_training_visualizer(
     output_dir: str = None,
     decimation_ratio: float = None,
     shutdown: bool = None,
+    change_threshold: float = None,
+    watch_dir: str = None,
+    max_history: int = None,
 ):
     """
     run_ai_training_visualizer
@@ -101,6 +105,27 @@ def run_ai_training_visualizer(
         and uses the SHUTDOWN_ENABLED
         environment variable
         (e.g. export SHUTDOWN_ENABLED="1")
+    :param change_threshold: relative stats change
+        allowed before a layer is rebuilt in the
+        next generation (0.0 only keeps layers
+        with identical data)
+        and uses the CHANGE_THRESHOLD
+        environment variable
+        (e.g. export CHANGE_THRESHOLD=0.01)
+    :param watch_dir: optional - checkpoint
+        directory to watch for new safetensors
+        files (each one is rendered as the next
+        generation instead of re-reading
+        model_file and num_gen=0 watches forever)
+        and uses the WATCH_DIR
+        environment variable
+        (e.g. export WATCH_DIR="./checkpoints")
+    :param max_history: number of generation
+        reports to keep (older reports are
+        evicted to bound memory)
+        and uses the MAX_HISTORY
+        environment variable
+        (e.g. export MAX_HISTORY=2)
     :raises SystemExit: thrown to shutdown blender
         without using the mouse
     """
@@ -109,7 +134,9 @@ def run_ai_training_visualizer(
     timeseries_training_data = []
     use_layer_names = []
     total_gens = "inf"
-    if model_file is None:
+    if watch_dir is None:
+        watch_dir = os.getenv("WATCH_DIR", None)
+    if model_file is None and not watch_dir:
         model_file = os.getenv(
             "MODEL", "./model.safetensors"
         )
@@ -117,7 +144,13 @@ def run_ai_training_visualizer(
             log.error(
                 f"missing required model_file={model_file}"
             )
-    if not os.path.exists(model_file):
+    if watch_dir:
+        if not os.path.isdir(watch_dir):
+            log.error(
+                f"failed to find watch_dir={watch_dir}"
+            )
+            return None
+    elif not os.path.exists(model_file):
         log.error(f"failed to find model_file={model_file}")
         return None
     if num_gen is None:
@@ -169,15 +202,44 @@ def run_ai_training_visualizer(
         ):
             decimation_ratio = float(decimation_ratio_val)
 
+    if max_history is None:
+        max_history = int(os.getenv("MAX_HISTORY", "2"))
+    if change_threshold is None:
+        # only rebuild layers that changed more than this
+        change_threshold = float(
+            os.getenv("CHANGE_THRESHOLD", "0.0")
+        )
+
     # shutdown the blender ui if set to 1 (for automating gifs)
     if shutdown is None:
         if os.getenv("SHUTDOWN_ENABLED", "0") == "1":
             shutdown = True
 
     cur_idx = 0
+    # rebuild only the layers that changed since this report
+    previous_report = None
+    checkpoint_queue = None
+    stop_event = None
+    if watch_dir:
+        # poll in a thread and render on this thread
+        (
+            _,
+            checkpoint_queue,
+            stop_event,
+        ) = bwwc.start_checkpoint_watcher(
+            watch_dir=watch_dir,
+            max_queue=2,
+            poll_interval=float(
+                os.getenv("WATCH_INTERVAL", "2.0")
+            ),
+            include_existing=True,
+        )
     raise_ex = False
     not_done = True
     while not_done:
+        if checkpoint_queue is not None:
+            # wait for the next stable checkpoint
+            model_file = checkpoint_queue.get()
         # python 3.12 utc dates
         utc_now = datetime.datetime.now(
             datetime.timezone.utc
@@ -240,13 +302,23 @@ def run_ai_training_visualizer(
                 save_gltf=use_gltf,
                 decimation_ratio=decimation_ratio,
                 shutdown_after_animation=False,
+                previous_report=previous_report,
+                change_threshold=change_threshold,
             )
+            previous_report = training_report
             data_row = {
                 "date": utc_str,
                 "report": training_report,
             }
             timeseries_training_data.append(data_row)
-            if cur_idx >= num_gen:
+            if max_history and (
+                len(timeseries_training_data) > max_history
+            ):
+                # evict the oldest generation reports
+                timeseries_training_data = (
+                    timeseries_training_data[-max_history:]
+                )
+            if num_gen and (cur_idx >= num_gen):
                 log.info(
                     f"hit iteration {cur_idx}/{num_gen}"
                 )
@@ -276,11 +348,16 @@ def run_ai_training_visualizer(
             log.error(
                 f"draw_model_shapes not handling ex={e}"
             )
+            if stop_event is not None:
+                stop_event.set()
             raise e
-        # coming soon - visualize model in a training/learning loop
-        # train ai
-        # export to gltf/stl
-        not_done = False
+        cur_idx += 1
+        if not watch_dir:
+            not_done = False
+        elif num_gen and (cur_idx >= num_gen):
+            not_done = False
+    if stop_event is not None:
+        stop_event.set()
     # end of while loop
 
     # review detected shapes through training generations
@@ -33,6 +33,8 @@ def set_animation_parameters(
 
     # Create a new animation data block
     animation = bpy.data.actions.new(name="CameraAnimation")
+    # tag for bw.bl.teardown_scene
+    animation["bw"] = True
     bpy.data.objects[name].animation_data_create()
     bpy.data.objects[name].animation_data.action = animation
 
@@ -49,10 +49,15 @@ def set_camera_location_orientation(
         y_start,
         z_start,
     )
-    look_at_target = bpy.data.objects.new(
-        "LookAtTarget", None
-    )
-    bpy.context.collection.objects.link(look_at_target)
+    # reuse the look at target between generations
+    look_at_target = bpy.data.objects.get("LookAtTarget")
+    if look_at_target is None:
+        look_at_target = bpy.data.objects.new(
+            "LookAtTarget", None
+        )
+        # tag for bw.bl.teardown_scene
+        look_at_target["bw"] = True
+        bpy.context.collection.objects.link(look_at_target)
     look_at_target.location = (x_end, y_end, z_end)
 
     # Set up the camera constraints
@@ -64,9 +69,13 @@ def set_camera_location_orientation(
         f"angle=({x_rotation}, {y_rotation}, {z_rotation})"
     )
     bpy.context.scene.camera = bpy.data.objects[name]
-    track_constraint = bpy.data.objects[
-        name
-    ].constraints.new("TRACK_TO")
+    # replace the previous constraint instead of
+    # stacking a new one for every animation
+    constraints = bpy.data.objects[name].constraints
+    track_constraint = constraints.get("bw_track_to")
+    if track_constraint is None:
+        track_constraint = constraints.new("TRACK_TO")
+        track_constraint.name = "bw_track_to"
     track_constraint.target = look_at_target
     track_constraint.track_axis = "TRACK_NEGATIVE_Z"
     track_constraint.up_axis = "UP_Y"
@@ -0,0 +1,197 @@
+import logging
+import bpy
+import bw.bl.material_registry as bwmr
+
+
+log = logging.getLogger(__name__)
+
+
+# bpy.data collections that can hold datablocks
+# tagged with a "bw" custom property
+tagged_data_types = [
+    "objects",
+    "meshes",
+    "curves",
+    "materials",
+    "images",
+    "textures",
+    "node_groups",
+    "collections",
+    "actions",
+]
+
+
+def get_tagged_datablocks():
+    """
+    get_tagged_datablocks
+
+    returns a list of every datablock created by
+    bw.bl (tagged with a "bw" custom property)
+    """
+    tagged = []
+    for data_type in tagged_data_types:
+        for datablock in getattr(bpy.data, data_type):
+            if datablock.get("bw"):
+                tagged.append(datablock)
+    return tagged
+
+
+def remove_camera_constraints(
+    constraint_name: str = "bw_track_to",
+):
+    """
+    remove_camera_constraints
+
+    remove the look at constraints added by
+    bw.bl.set_camera_location_orientation so
+    they do not pile up across generations
+
+    returns the number of removed constraints
+
+    :param constraint_name: constraint name
+    """
+    num_removed = 0
+    for obj in bpy.data.objects:
+        constraint = obj.constraints.get(constraint_name)
+        if constraint is not None:
+            obj.constraints.remove(constraint)
+            num_removed += 1
+    return num_removed
+
+
+def get_scene_layers():
+    """
+    get_scene_layers
+
+    returns the set of "bw_layer" indices for the
+    objects in the scene
+    """
+    return set(
+        obj.get("bw_layer")
+        for obj in bpy.context.scene.objects
+        if obj.get("bw_layer") is not None
+    )
+
+
+def skip_kept_layers(
+    tagged: list,
+    keep_layers: set,
+):
+    """
+    skip_kept_layers
+
+    filter the tagged datablocks so objects with
+    a "bw_layer" in keep_layers, their data and
+    the collections holding them stay in the
+    scene. shared materials, images, textures and
+    node groups are left for the orphan purge.
+
+    returns the list of datablocks to remove
+
+    :param tagged: datablocks from
+        get_tagged_datablocks
+    :param keep_layers: set of layer indices to
+        keep
+    """
+    kept_pointers = set()
+    for obj in bpy.data.objects:
+        if obj.get("bw_layer") in keep_layers:
+            kept_pointers.add(obj.as_pointer())
+            if obj.data is not None:
+                kept_pointers.add(obj.data.as_pointer())
+    shared_types = (
+        bpy.types.Material,
+        bpy.types.Image,
+        bpy.types.Texture,
+        bpy.types.NodeTree,
+    )
+    removable = []
+    for datablock in tagged:
+        if datablock.as_pointer() in kept_pointers:
+            continue
+        if isinstance(datablock, shared_types):
+            continue
+        if isinstance(
+            datablock, bpy.types.Collection
+        ) and any(
+            obj.as_pointer() in kept_pointers
+            for obj in datablock.all_objects
+        ):
+            continue
+        removable.append(datablock)
+    return removable
+
+
+def teardown_scene(
+    include_untagged_meshes: bool = False,
+    purge_orphans: bool = True,
+    keep_layers: list = None,
+):
+    """
+    teardown_scene
+
+    remove everything bw.bl created (objects,
+    meshes, text curves, materials, images,
+    node groups, staging collections, camera
+    actions and look at targets) with one
+    bpy.data.batch_remove call and then purge
+    the orphan datablocks so memory stays flat
+    across generations
+
+    returns a dictionary with the removal counts
+
+        ```
+        teardown = {
+            "removed": 1200,
+            "constraints": 1,
+            "purged": 15,
+        }
+        ```
+
+    :param include_untagged_meshes: flag to also
+        remove every other mesh object in the
+        scene (same as bw.bl.clear_all_objects)
+    :param purge_orphans: flag to purge orphan
+        datablocks after removing
+    :param keep_layers: optional - list of layer
+        indices (the "bw_layer" custom property)
+        to keep in the scene for incremental
+        rebuilds
+    """
+    num_constraints = remove_camera_constraints()
+    tagged = get_tagged_datablocks()
+    if keep_layers:
+        tagged = skip_kept_layers(
+            tagged=tagged, keep_layers=set(keep_layers)
+        )
+    if include_untagged_meshes:
+        for obj in bpy.context.scene.objects:
+            if obj.type == "MESH" and not obj.get("bw"):
+                tagged.append(obj)
+    num_removed = len(tagged)
+    if tagged:
+        bpy.data.batch_remove(tagged)
+    if not keep_layers:
+        # kept layers still use registry materials
+        bwmr.reset_material_registry()
+    num_purged = 0
+    if purge_orphans:
+        try:
+            num_purged = bpy.data.orphans_purge(
+                do_local_ids=True,
+                do_linked_ids=True,
+                do_recursive=True,
+            )
+        except TypeError:
+            # blender < 3.2
+            num_purged = bpy.data.orphans_purge()
+    log.info(
+        f"teardown removed={num_removed} "
+        f"constraints={num_constraints} "
+        f"purged={num_purged}"
+    )
+    return {
+        "removed": num_removed,
+        "constraints": num_constraints,
+        "purged": num_purged,
+    }
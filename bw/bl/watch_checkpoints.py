@@ -0,0 +1,184 @@
+import os
+import glob
+import queue
+import logging
+import threading
+
+
+log = logging.getLogger(__name__)
+
+
+def find_checkpoints(
+    watch_dir: str,
+    pattern: str = "*.safetensors",
+):
+    """
+    find_checkpoints
+
+    returns a dictionary of checkpoint path to
+    (size, mtime) for every file in watch_dir
+    matching pattern
+
+    :param watch_dir: checkpoint directory
+    :param pattern: glob pattern for checkpoints
+    """
+    checkpoints = {}
+    for path in glob.glob(os.path.join(watch_dir, pattern)):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            # removed between the glob and the stat
+            continue
+        checkpoints[path] = (stat.st_size, stat.st_mtime)
+    return checkpoints
+
+
+def put_latest(
+    checkpoint_queue: queue.Queue,
+    path: str,
+):
+    """
+    put_latest
+
+    add a checkpoint to a bounded queue and drop
+    the oldest queued checkpoint when the queue is
+    full so a fast trainer cannot outrun the
+    renderer
+
+    returns the dropped checkpoint path or None
+
+    :param checkpoint_queue: bounded queue.Queue
+    :param path: checkpoint path
+    """
+    dropped = None
+    while True:
+        try:
+            checkpoint_queue.put_nowait(path)
+            return dropped
+        except queue.Full:
+            try:
+                dropped = checkpoint_queue.get_nowait()
+                log.info(
+                    f"dropping stale checkpoint={dropped}"
+                )
+            except queue.Empty:
+                pass
+
+
+def watch_checkpoints(
+    watch_dir: str,
+    checkpoint_queue: queue.Queue,
+    stop_event: threading.Event,
+    pattern: str = "*.safetensors",
+    poll_interval: float = 2.0,
+    stable_polls: int = 2,
+    include_existing: bool = False,
+):
+    """
+    watch_checkpoints
+
+    poll watch_dir for new or rewritten
+    checkpoints and queue each one after its size
+    and mtime stayed the same for stable_polls
+    polls (so partially written files are not
+    rendered). runs until stop_event is set.
+
+    :param watch_dir: checkpoint directory
+    :param checkpoint_queue: bounded queue.Queue
+        that receives checkpoint paths
+    :param stop_event: threading.Event to stop
+        watching
+    :param pattern: glob pattern for checkpoints
+    :param poll_interval: seconds between polls
+    :param stable_polls: number of polls the size
+        and mtime must stay unchanged
+    :param include_existing: flag to also queue
+        the checkpoints already in watch_dir
+    """
+    # path => (size, mtime) already queued
+    queued = {}
+    if not include_existing:
+        queued = find_checkpoints(watch_dir, pattern)
+    # path => ((size, mtime), number of stable polls)
+    pending = {}
+    log.info(
+        f"watching dir={watch_dir} "
+        f"pattern={pattern} "
+        f"existing={len(queued)}"
+    )
+    while not stop_event.is_set():
+        checkpoints = find_checkpoints(watch_dir, pattern)
+        # oldest first so the newest checkpoints are kept
+        for path, file_stat in sorted(
+            checkpoints.items(), key=lambda item: item[1][1]
+        ):
+            if queued.get(path) == file_stat:
+                continue
+            previous = pending.get(path)
+            if previous is None or previous[0] != file_stat:
+                pending[path] = (file_stat, 1)
+            else:
+                pending[path] = (file_stat, previous[1] + 1)
+            if pending[path][1] >= stable_polls:
+                del pending[path]
+                queued[path] = file_stat
+                log.info(f"queueing checkpoint={path}")
+                put_latest(checkpoint_queue, path)
+        stop_event.wait(poll_interval)
+
+
+def start_checkpoint_watcher(
+    watch_dir: str,
+    max_queue: int = 2,
+    pattern: str = "*.safetensors",
+    poll_interval: float = 2.0,
+    stable_polls: int = 2,
+    include_existing: bool = False,
+):
+    """
+    start_checkpoint_watcher
+
+    start watch_checkpoints in a daemon thread
+    (the thread only polls the filesystem, all
+    bpy work stays on the caller's thread)
+
+    returns a tuple (
+        thread,
+        checkpoint_queue,
+        stop_event,
+    )
+
+    :param watch_dir: checkpoint directory
+    :param max_queue: max checkpoints waiting to
+        be rendered (older ones are dropped)
+    :param pattern: glob pattern for checkpoints
+    :param poll_interval: seconds between polls
+    :param stable_polls: number of polls the size
+        and mtime must stay unchanged
+    :param include_existing: flag to also queue
+        the checkpoints already in watch_dir
+    """
+    checkpoint_queue = queue.Queue(
+        maxsize=max(1, max_queue)
+    )
+    stop_event = threading.Event()
+    thread = threading.Thread(
+        target=watch_checkpoints,
+        kwargs={
+            "watch_dir": watch_dir,
+            "checkpoint_queue": checkpoint_queue,
+            "stop_event": stop_event,
+            "pattern": pattern,
+            "poll_interval": poll_interval,
+            "stable_polls": stable_polls,
+            "include_existing": include_existing,
+        },
+        name="bw_checkpoint_watcher",
+        daemon=True,
+    )
+    thread.start()
+    return (
+        thread,
+        checkpoint_queue,
+        stop_event,
+    )
@@ -0,0 +1,158 @@
+import logging
+import numpy as np
+
+
+log = logging.getLogger(__name__)
+
+supported_scores = [
+    "variance",
+    "entropy",
+    "sign_crossings",
+]
+
+
+def get_layer_score(
+    data: np.ndarray,
+    score: str = "variance",
+    num_bins: int = 64,
+):
+    """
+    get_layer_score
+
+    cheap information score for one layer used to
+    split a scene-level face budget
+
+    supported scores:
+
+    - **variance** - variance of the values
+    - **entropy** - shannon entropy (bits) of a
+        num_bins histogram of the values
+    - **sign_crossings** - fraction of neighboring
+        values in every axis that cross the mean
+        (high for noisy layers with many surfaces)
+
+    :param data: nd array for the layer
+    :param score: variance, entropy or
+        sign_crossings
+    :param num_bins: histogram bins for the
+        entropy score
+    """
+    data = np.asarray(data, dtype=np.float32)
+    if not data.size:
+        return 0.0
+    if score == "variance":
+        return float(np.var(data))
+    elif score == "entropy":
+        counts, _ = np.histogram(data, bins=num_bins)
+        probs = counts[counts > 0] / data.size
+        return float(-np.sum(probs * np.log2(probs)))
+    elif score == "sign_crossings":
+        above = data > np.mean(data)
+        num_crossings = 0
+        num_pairs = 0
+        for axis in range(data.ndim):
+            if data.shape[axis] < 2:
+                continue
+            num_crossings += np.count_nonzero(
+                np.diff(above, axis=axis)
+            )
+            num_pairs += (data.size // data.shape[axis]) * (
+                data.shape[axis] - 1
+            )
+        if not num_pairs:
+            return 0.0
+        return float(num_crossings / num_pairs)
+    raise ValueError(
+        f"unsupported layer score={score} "
+        f"only {supported_scores} are supported"
+    )
+
+
+def allocate_face_budget(
+    all_data: list,
+    total_faces: int = None,
+    total_mb: float = None,
+    score: str = "variance",
+    min_faces: int = 100,
+    bytes_per_face: float = 26.0,
+):
+    """
+    allocate_face_budget
+
+    split a scene-level face budget across layers
+    in proportion to each layer's information
+    score so low-information layers do not waste
+    faces
+
+    returns a list with the face share for each
+    layer that sums to the total budget. the
+    shares are only a bound on the scene size if
+    each layer is capped at its share (for
+    example bw.bl.generate_3d_from_3d max_faces)
+
+    :param all_data: list of nd arrays (one per
+        layer)
+    :param total_faces: optional - total number of
+        faces for the scene
+    :param total_mb: optional - total mesh size in
+        megabytes for the scene converted to
+        faces with bytes_per_face (ignored if
+        total_faces is set)
+    :param score: variance, entropy or
+        sign_crossings (see get_layer_score)
+    :param min_faces: minimum faces for each layer
+    :param bytes_per_face: estimated mesh bytes per
+        face for total_mb. marching cubes surfaces
+        have about half as many vertices as faces
+        so the default is 12 bytes of int32 face
+        indices plus half of a 28 byte float32
+        vertex, normal and value
+    """
+    num_layers = len(all_data)
+    if not num_layers:
+        return []
+    if not total_faces:
+        if not total_mb:
+            raise ValueError(
+                "allocate_face_budget requires "
+                "total_faces or total_mb"
+            )
+        total_faces = int(
+            total_mb * 1024.0 * 1024.0 / bytes_per_face
+        )
+    total_faces = int(total_faces)
+    scores = np.array(
+        [
+            get_layer_score(data, score=score)
+            for data in all_data
+        ],
+        dtype=np.float64,
+    )
+    scores[~np.isfinite(scores)] = 0.0
+    min_faces = int(min_faces or 0)
+    if min_faces * num_layers > total_faces:
+        min_faces = total_faces // num_layers
+    remaining = total_faces - min_faces * num_layers
+    score_total = float(np.sum(scores))
+    if score_total > 0.0:
+        shares = scores / score_total
+    else:
+        shares = np.full(num_layers, 1.0 / num_layers)
+    # largest remainder so the budgets sum to the total
+    exact = shares * remaining
+    budgets = np.floor(exact).astype(np.int64)
+    leftover = remaining - int(np.sum(budgets))
+    if leftover > 0:
+        order = np.argsort(
+            -(exact - budgets), kind="stable"
+        )
+        budgets[order[:leftover]] += 1
+    budgets += min_faces
+    log.debug(
+        f"allocated total_faces={total_faces} "
+        f"layers={num_layers} "
+        f"score={score} "
+        f"min={int(np.min(budgets))} "
+        f"max={int(np.max(budgets))}"
+    )
+    return [int(budget) for budget in budgets]
@@ -0,0 +1,112 @@
+import logging
+import numpy as np
+import bw.bl.colors as bwcl
+
+
+log = logging.getLogger(__name__)
+
+
+supported_colormaps = [
+    "diverging",
+    "palette",
+]
+
+
+def build_colormap_lut(
+    colormap: str = "diverging",
+    num: int = 256,
+    opacity: float = 1.0,
+):
+    """
+    build_colormap_lut
+
+    build a (num, 4) float32 rgba lookup table for
+    mapping normalized values to colors
+
+    :param colormap: diverging for a continuous
+        blue, white and red gradient or palette for
+        the discrete bw.bl.colors.get_color_tuples()
+        colors
+    :param num: number of lut entries
+    :param opacity: alpha for every color
+    """
+    if colormap == "diverging":
+        anchors = np.array(
+            [
+                [0.0, 0.2, 1.0],
+                [1.0, 1.0, 1.0],
+                [1.0, 0.1, 0.0],
+            ],
+            dtype=np.float32,
+        )
+        positions = np.linspace(0.0, 1.0, num)
+        anchor_positions = np.linspace(
+            0.0, 1.0, len(anchors)
+        )
+        lut = np.ones((num, 4), dtype=np.float32)
+        for channel in range(3):
+            lut[:, channel] = np.interp(
+                positions,
+                anchor_positions,
+                anchors[:, channel],
+            )
+    elif colormap == "palette":
+        palette = np.array(
+            list(bwcl.get_color_tuples().values()),
+            dtype=np.float32,
+        )
+        lut = palette[
+            np.linspace(0, len(palette) - 1, num)
+            .round()
+            .astype(np.int64)
+        ]
+    else:
+        raise ValueError(
+            f"unsupported colormap={colormap} "
+            f"only {supported_colormaps} are supported"
+        )
+    lut[:, 3] = opacity
+    return lut
+
+
+def apply_colormap(
+    values: np.ndarray,
+    lut: np.ndarray,
+    min_value: float = None,
+    max_value: float = None,
+):
+    """
+    apply_colormap
+
+    map every value to a lut color in one
+    vectorized lookup
+
+    returns a (num_values, 4) float32 rgba array
+
+    :param values: array of values
+    :param lut: (num, 4) lookup table from
+        build_colormap_lut
+    :param min_value: optional - value for the
+        first lut color with default values.min()
+    :param max_value: optional - value for the
+        last lut color with default values.max()
+    """
+    values = np.asarray(values, dtype=np.float32).reshape(
+        -1
+    )
+    if not len(values):
+        return np.zeros((0, 4), dtype=np.float32)
+    if min_value is None:
+        min_value = float(np.min(values))
+    if max_value is None:
+        max_value = float(np.max(values))
+    value_range = max_value - min_value
+    if value_range <= 0.0:
+        value_range = 1.0
+    lut_idx = (
+        (values - min_value) / value_range * (len(lut) - 1)
+    ).round()
+    lut_idx = np.clip(lut_idx, 0, len(lut) - 1).astype(
+        np.int64
+    )
+    return lut[lut_idx]
@@ -0,0 +1,219 @@
+import logging
+import numpy as np
+
+
+log = logging.getLogger(__name__)
+
+
+def get_salience_stats(
+    data: np.ndarray,
+    quantiles: list = None,
+):
+    """
+    get_salience_stats
+
+    compute the statistics for building salience
+    masks once so they can be cached with the
+    layer and reused for every mask method
+
+    returns a dictionary
+
+        ```
+        stats = {
+            "shape": data.shape,
+            "quantiles": quantiles,
+            "abs_quantiles": abs_quantiles,
+            "abs_max": abs_max,
+            "abs_mean": abs_mean,
+            "row_abs_mean": row_abs_mean,
+            "col_abs_mean": col_abs_mean,
+        }
+        ```
+
+    :param data: 2d or 3d array (rows, cols, ...)
+    :param quantiles: optional - list of |w|
+        quantiles to calculate with default
+        [0.5, 0.9, 0.95, 0.99]
+    """
+    if not quantiles:
+        quantiles = [0.5, 0.9, 0.95, 0.99]
+    abs_data = np.abs(data)
+    reduce_rows = tuple(
+        axis for axis in range(abs_data.ndim) if axis != 0
+    )
+    reduce_cols = tuple(
+        axis for axis in range(abs_data.ndim) if axis != 1
+    )
+    return {
+        "shape": data.shape,
+        "quantiles": list(quantiles),
+        "abs_quantiles": np.quantile(abs_data, quantiles),
+        "abs_max": float(np.max(abs_data)),
+        "abs_mean": float(np.mean(abs_data)),
+        "row_abs_mean": np.mean(abs_data, axis=reduce_rows),
+        "col_abs_mean": np.mean(abs_data, axis=reduce_cols),
+    }
+
+
+def dilate_mask(
+    mask: np.ndarray,
+    num_voxels: int = 1,
+):
+    """
+    dilate_mask
+
+    grow a boolean mask by num_voxels in every
+    axis so marching cubes also runs the cells
+    on the edge of each salient region
+
+    :param mask: boolean nd array
+    :param num_voxels: number of voxels to grow
+    """
+    for _ in range(num_voxels):
+        grown = mask.copy()
+        for axis in range(mask.ndim):
+            lower = [slice(None)] * mask.ndim
+            upper = [slice(None)] * mask.ndim
+            lower[axis] = slice(0, -1)
+            upper[axis] = slice(1, None)
+            grown[tuple(lower)] |= mask[tuple(upper)]
+            grown[tuple(upper)] |= mask[tuple(lower)]
+        mask = grown
+    return mask
+
+
+def build_salience_mask(
+    data: np.ndarray,
+    method: str = "quantile",
+    quantile: float = 0.95,
+    top_k: int = 16,
+    block_size: int = 16,
+    outlier_std: float = 3.0,
+    dilate: int = 1,
+    stats: dict = None,
+):
+    """
+    build_salience_mask
+
+    build a boolean mask of the salient regions
+    in a fitted layer for the masks argument in
+    bw.sk.profile_data_with_cubes so marching
+    cubes only triangulates interesting regions
+
+    supported methods:
+
+    - **quantile** - |w| at or above the quantile
+    - **top_k_blocks** - the top_k
+        (block_size x block_size) blocks with the
+        largest mean |w|
+    - **outliers** - rows and columns whose
+        mean |w| is more than outlier_std standard
+        deviations above the mean
+
+    :param data: 2d or 3d array (rows, cols, ...)
+    :param method: quantile, top_k_blocks or
+        outliers
+    :param quantile: |w| quantile for the quantile
+        method (uses the cached stats if the
+        quantile was precomputed)
+    :param top_k: number of blocks for the
+        top_k_blocks method
+    :param block_size: rows and columns per block
+        for the top_k_blocks method
+    :param outlier_std: number of standard
+        deviations for the outliers method
+    :param dilate: number of voxels to grow
+        the mask
+    :param stats: optional - cached statistics
+        from get_salience_stats (computed here if
+        not set)
+    """
+    if (stats is None) and (method != "top_k_blocks"):
+        stats = get_salience_stats(data)
+    abs_data = np.abs(data)
+    num_rows = data.shape[0]
+    num_cols = data.shape[1]
+    if method == "quantile":
+        if quantile in stats["quantiles"]:
+            threshold = stats["abs_quantiles"][
+                stats["quantiles"].index(quantile)
+            ]
+        else:
+            threshold = np.quantile(abs_data, quantile)
+        mask = abs_data >= threshold
+    elif method == "top_k_blocks":
+        block_rows = -(-num_rows // block_size)
+        block_cols = -(-num_cols // block_size)
+        plane = np.mean(
+            abs_data.reshape(num_rows, num_cols, -1), axis=2
+        )
+        padded = np.zeros(
+            (
+                block_rows * block_size,
+                block_cols * block_size,
+            ),
+            dtype=plane.dtype,
+        )
+        padded[:num_rows, :num_cols] = plane
+        block_means = padded.reshape(
+            block_rows, block_size, block_cols, block_size
+        ).mean(axis=(1, 3))
+        num_blocks = block_means.size
+        top_k = min(int(top_k), num_blocks)
+        top_ids = np.argpartition(
+            block_means.reshape(-1), num_blocks - top_k
+        )[num_blocks - top_k :]
+        block_mask = np.zeros(num_blocks, dtype=bool)
+        block_mask[top_ids] = True
+        plane_mask = np.repeat(
+            np.repeat(
+                block_mask.reshape(block_rows, block_cols),
+                block_size,
+                axis=0,
+            ),
+            block_size,
+            axis=1,
+        )[:num_rows, :num_cols]
+        mask = np.broadcast_to(
+            plane_mask.reshape(
+                (num_rows, num_cols)
+                + (1,) * (data.ndim - 2)
+            ),
+            data.shape,
+        ).copy()
+    elif method == "outliers":
+        row_abs_mean = stats["row_abs_mean"]
+        col_abs_mean = stats["col_abs_mean"]
+        row_outliers = row_abs_mean > (
+            np.mean(row_abs_mean)
+            + outlier_std * np.std(row_abs_mean)
+        )
+        col_outliers = col_abs_mean > (
+            np.mean(col_abs_mean)
+            + outlier_std * np.std(col_abs_mean)
+        )
+        plane_mask = (
+            row_outliers[:, None] | col_outliers[None, :]
+        )
+        mask = np.broadcast_to(
+            plane_mask.reshape(
+                (num_rows, num_cols)
+                + (1,) * (data.ndim - 2)
+            ),
+            data.shape,
+        ).copy()
+    else:
+        raise ValueError(
+            f"unsupported salience mask method={method} "
+            "only quantile, top_k_blocks and outliers "
+            "are supported"
+        )
+    if dilate:
+        mask = dilate_mask(mask, dilate)
+    log.debug(
+        f"built salience mask method={method} "
+        f"data={data.shape} "
+        f"selected={int(np.count_nonzero(mask))}"
+        f"/{mask.size}"
+    )
+    return mask
@@ -1,7 +1,9 @@
 import logging
 import numpy as np
 import bw.st.get_model_tensors as get_model_tensors
+import bw.st.get_tensor_slices as bwts
 import bw.np.fit_2d_arrays_to_target_shape as fit
+import bw.np.select_top_k_weights as bwtk
 
 
 log = logging.getLogger(__name__)
@@ -140,6 +142,7 @@ def extract_3d_shapes_from_model_file(
                     "layer_name": label_layer_name,
                     "desc": desc,
                     "data": fitted_3d_array,
+                    "src_shape": tensor_data.shape,
                     "target_faces": target_faces,
                     "target_rows": target_rows,
                     "target_cols": target_cols,
@@ -170,3 +173,118 @@ def extract_3d_shapes_from_model_file(
             f"shape({target_rows}, {target_cols})"
         )
     return all_data_3d
+
+
+def extract_top_k_points_from_model_file(
+    input_file: str,
+    layer_names: list,
+    max_layers: int = None,
+    device: str = "cpu",
+    top_k: int = 100000,
+    target_rows: int = 512,
+    target_cols: int = 512,
+    start_x: int = 0,
+    start_y: int = 0,
+    start_z: int = 1,
+    pad_per: int = 20,
+):
+    """
+    extract_top_k_points_from_model_file
+
+    extract the top_k largest |w| weights for each
+    tensor in a model file as points without
+    fitting or meshing anything. each tensor is
+    read in row blocks from the safetensors mmap
+    with bw.st.get_tensor_slices so only one
+    block is in memory at a time
+
+    points use the same (row, depth, col)
+    orientation as the layer meshes with the rows
+    and cols scaled into target_rows and
+    target_cols
+
+    :param input_file: path to model.safetensors
+        file
+    :param layer_names: only stream the tensors
+        whose key contains one of these names
+        (every tensor if empty)
+    :param max_layers: limit the number of
+        layers to extract
+    :param device: unused - row blocks are always
+        read on the cpu
+    :param top_k: number of weights per layer
+    :param target_rows: number of rows to
+        scale the points into
+    :param target_cols: number of cols to
+        scale the points into
+    :param pad_per: number to pad
+        per object
+        on the y-axis
+    """
+    log.info(
+        f"selecting top_k={top_k} points from "
+        f"model={input_file}"
+    )
+    all_points = []
+    num_tensors = 0
+    for (
+        key,
+        tensor_slice,
+        shape,
+    ) in bwts.get_tensor_slices(
+        input_file, layer_names=layer_names
+    ):
+        idx = num_tensors
+        num_tensors += 1
+        if not shape:
+            log.debug(f"ignored scalar tensor={idx} {key}")
+            continue
+        try:
+            top = bwtk.select_top_k_weights(
+                tensor_slice, top_k=top_k, shape=shape
+            )
+        except Exception as e:
+            # BFloat16 has no numpy dtype
+            log.debug(
+                f"ignored tensor={idx} {key} with ex={e}"
+            )
+            continue
+        (num_rows, num_cols) = top["shape"]
+        points = np.zeros(
+            (len(top["values"]), 3), dtype=np.float32
+        )
+        points[:, 0] = top["rows"] * (
+            float(target_rows) / num_rows
+        )
+        points[:, 2] = top["cols"] * (
+            float(target_cols) / num_cols
+        )
+        layer_name = f"{key[0:128]}"
+        all_points.append(
+            {
+                "name": layer_name,
+                "layer_name": f"Layer: {layer_name}",
+                "desc": (
+                    f"src dimensions=({num_rows}, "
+                    f"{num_cols}) "
+                    f"top {len(points)} |w| points"
+                ),
+                "data": None,
+                "src_shape": (num_rows, num_cols),
+                "points": points,
+                "values": top["values"],
+                "target_faces": None,
+                "target_rows": target_rows,
+                "target_cols": target_cols,
+                "x": start_x,
+                "y": start_y + (len(all_points) * pad_per),
+                "z": start_z,
+            }
+        )
+        if max_layers and len(all_points) >= max_layers:
+            break
+    log.info(
+        f"done selecting points for {len(all_points)}"
+        f"/{num_tensors} tensors"
+    )
+    return all_points
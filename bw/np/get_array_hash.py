@@ -0,0 +1,41 @@
+import hashlib
+import logging
+import numpy as np
+
+
+log = logging.getLogger(__name__)
+
+
+def get_array_hash(
+    data: np.ndarray,
+    decimals: int = None,
+    digest_size: int = 16,
+):
+    """
+    get_array_hash
+
+    hash the shape, dtype and contents of an array
+    with blake2b so identical fitted volumes (tied
+    embeddings, zero biases, constant norms) can
+    share one mesh
+
+    returns a hex digest string
+
+    :param data: numpy array
+    :param decimals: optional - round the values
+        to this many decimals before hashing so
+        trivially different arrays match
+    :param digest_size: blake2b digest size in
+        bytes
+    """
+    data = np.asarray(data)
+    if decimals is not None:
+        data = np.round(data, decimals)
+        # -0.0 and 0.0 hash the same after rounding
+        data = data + 0.0
+    data = np.ascontiguousarray(data)
+    hasher = hashlib.blake2b(digest_size=digest_size)
+    hasher.update(str(data.shape).encode("utf-8"))
+    hasher.update(str(data.dtype).encode("utf-8"))
+    hasher.update(data.data)
+    return hasher.hexdigest()
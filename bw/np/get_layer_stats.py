@@ -0,0 +1,76 @@
+import logging
+import numpy as np
+
+
+log = logging.getLogger(__name__)
+
+
+def get_layer_stats(
+    data: np.ndarray,
+):
+    """
+    get_layer_stats
+
+    summarize a fitted layer for comparing it
+    against the same layer in a later generation
+
+    returns a dictionary
+
+        ```
+        stats = {
+            "mean": mean,
+            "std": std,
+            "min": min,
+            "max": max,
+            "abs_max": abs_max,
+        }
+        ```
+
+    :param data: numpy array
+    """
+    data = np.asarray(data, dtype=np.float32)
+    if not data.size:
+        return {
+            "mean": 0.0,
+            "std": 0.0,
+            "min": 0.0,
+            "max": 0.0,
+            "abs_max": 0.0,
+        }
+    min_value = float(np.min(data))
+    max_value = float(np.max(data))
+    return {
+        "mean": float(np.mean(data)),
+        "std": float(np.std(data)),
+        "min": min_value,
+        "max": max_value,
+        "abs_max": max(abs(min_value), abs(max_value)),
+    }
+
+
+def get_layer_change(
+    stats: dict,
+    previous_stats: dict,
+):
+    """
+    get_layer_change
+
+    relative change between two get_layer_stats
+    results as the largest shift in the mean, std,
+    min or max divided by the previous max |value|
+
+    returns a float (0.0 means unchanged)
+
+    :param stats: current get_layer_stats
+    :param previous_stats: previous get_layer_stats
+    """
+    scale = max(previous_stats["abs_max"], 1e-12)
+    return (
+        max(
+            abs(
+                stats[stat_name] - previous_stats[stat_name]
+            )
+            for stat_name in ["mean", "std", "min", "max"]
+        )
+        / scale
+    )
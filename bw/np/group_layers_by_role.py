@@ -0,0 +1,80 @@
+import logging
+import re
+
+
+log = logging.getLogger(__name__)
+
+
+def get_layer_role(
+    name: str,
+):
+    """
+    get_layer_role
+
+    return the role for a tensor name by replacing
+    the block index with a wildcard so every block
+    shares one role
+
+    ```
+    h.0.mlp.c_fc.weight -> h.*.mlp.c_fc.weight
+    ```
+
+    :param name: tensor name
+    """
+    return re.sub(r"\.\d+\.", ".*.", name)
+
+
+def group_layers_by_role(
+    all_data_3d: list,
+    max_group_size: int = None,
+):
+    """
+    group_layers_by_role
+
+    group the layers from bw.np.extract_weights
+    that share a role (for example
+    h.{0..11}.mlp.c_fc.weight), the same source
+    tensor shape and the same fitted shape across
+    the whole key list so they can be stacked into
+    one volume. safetensors interleaves the roles
+    (h.0.attn, h.0.mlp, h.1.attn, ...) so matching
+    layers are rarely next to each other.
+
+    returns a list of lists with the indices
+    into all_data_3d in the order of each group's
+    first layer (layers keep their order within a
+    group and layers without a match are in a
+    group of one)
+
+    :param all_data_3d: list of layer dictionaries
+        with name and data keys
+    :param max_group_size: optional - limit the
+        number of layers in a group
+    """
+    groups = []
+    # role key => index into groups for the open group
+    open_groups = {}
+    for idx, data_3d in enumerate(all_data_3d):
+        data = data_3d.get("data")
+        if data is None:
+            groups.append([idx])
+            continue
+        key = (
+            get_layer_role(data_3d["name"]),
+            data_3d.get("src_shape"),
+            data.shape,
+        )
+        group_idx = open_groups.get(key)
+        if (group_idx is not None) and (
+            not max_group_size
+            or len(groups[group_idx]) < max_group_size
+        ):
+            groups[group_idx].append(idx)
+        else:
+            open_groups[key] = len(groups)
+            groups.append([idx])
+    log.debug(
+        f"grouped layers={len(all_data_3d)} "
+        f"into groups={len(groups)}"
+    )
+    return groups
@@ -0,0 +1,97 @@
+import logging
+import numpy as np
+
+
+log = logging.getLogger(__name__)
+
+
+def select_top_k_weights(
+    data,
+    top_k: int = 100000,
+    chunk_size: int = 1048576,
+    shape: tuple = None,
+):
+    """
+    select_top_k_weights
+
+    select the top_k largest |w| entries in a 2d
+    weight array with np.argpartition. rows are
+    read chunk_size values at a time and merged
+    into a running top_k so memory mapped arrays
+    and safetensors slices (for more refer to
+    bw.st.get_tensor_slices) are streamed instead
+    of loaded at once.
+
+    returns a dictionary sorted by largest |w|
+
+        ```
+        top = {
+            "shape": (num_rows, num_cols),
+            "rows": rows,
+            "cols": cols,
+            "values": values,
+        }
+        ```
+
+    :param data: 2d array-like (numpy array,
+        memmap or safetensors slice) supporting
+        row slicing
+    :param top_k: number of entries to keep
+    :param chunk_size: approximate number of
+        values to read per chunk
+    :param shape: optional - shape of the data
+        if it has no shape attribute (for example
+        safetensors get_slice().get_shape())
+    """
+    if shape is None:
+        shape = data.shape
+    shape = tuple(shape)
+    if len(shape) == 1:
+        # vectors are small so read them at once
+        data = np.asarray(data[:]).reshape(1, -1)
+        shape = data.shape
+    num_rows = shape[0]
+    num_cols = int(np.prod(shape[1:]))
+    top_k = max(1, min(int(top_k), num_rows * num_cols))
+    chunk_rows = max(1, int(chunk_size) // max(num_cols, 1))
+
+    best_ids = np.zeros(0, dtype=np.int64)
+    best_values = np.zeros(0, dtype=np.float32)
+    for start_row in range(0, num_rows, chunk_rows):
+        chunk = np.asarray(
+            data[start_row : start_row + chunk_rows],
+            dtype=np.float32,
+        ).reshape(-1)
+        chunk_ids = np.arange(
+            start_row * num_cols,
+            start_row * num_cols + len(chunk),
+            dtype=np.int64,
+        )
+        if len(chunk) > top_k:
+            keep = np.argpartition(
+                -np.abs(chunk), top_k - 1
+            )[:top_k]
+            chunk = chunk[keep]
+            chunk_ids = chunk_ids[keep]
+        best_ids = np.concatenate([best_ids, chunk_ids])
+        best_values = np.concatenate([best_values, chunk])
+        if len(best_values) > top_k:
+            keep = np.argpartition(
+                -np.abs(best_values), top_k - 1
+            )[:top_k]
+            best_ids = best_ids[keep]
+            best_values = best_values[keep]
+    order = np.argsort(-np.abs(best_values), kind="stable")
+    best_ids = best_ids[order]
+    best_values = best_values[order]
+    log.debug(
+        f"selected top_k={len(best_values)} "
+        f"from shape=({num_rows}, {num_cols}) "
+        f"chunk_rows={chunk_rows}"
+    )
+    return {
+        "shape": (num_rows, num_cols),
+        "rows": best_ids // num_cols,
+        "cols": best_ids % num_cols,
+        "values": best_values,
+    }
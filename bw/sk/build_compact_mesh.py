@@ -0,0 +1,246 @@
+import logging
+import numpy as np
+
+
+log = logging.getLogger(__name__)
+
+
+def get_index_dtype(num_vertices: int):
+    """
+    get_index_dtype
+
+    return the smallest numpy dtype that can hold
+    a face index for this many vertices
+    (np.uint16 or np.int32)
+
+    :param num_vertices: number of vertices
+        in the mesh
+    """
+    if num_vertices <= np.iinfo(np.uint16).max + 1:
+        return np.uint16
+    return np.int32
+
+
+def get_mesh_nbytes(*arrays):
+    """
+    get_mesh_nbytes
+
+    return the true number of bytes used by
+    the mesh arrays (None values are ignored)
+
+    :param arrays: numpy arrays for the vertices,
+        faces, normals, values
+    """
+    return int(
+        sum(
+            array.nbytes
+            for array in arrays
+            if array is not None
+        )
+    )
+
+
+def get_compact_vertices(mesh: dict):
+    """
+    get_compact_vertices
+
+    return the float32 vertices from a compact
+    mesh dictionary and dequantize them if
+    the mesh was built with quantize_bits
+
+    :param mesh: dictionary from
+        bw.sk.build_compact_mesh.build_compact_mesh
+    """
+    vertices = mesh["vertices"]
+    if not mesh["quantize_bits"]:
+        return vertices
+    return (
+        vertices.astype(np.float32) * mesh["scale"]
+        + mesh["offset"]
+    ).astype(np.float32)
+
+
+def build_compact_mesh(
+    vertices: np.ndarray,
+    faces: np.ndarray,
+    normals: np.ndarray = None,
+    values: np.ndarray = None,
+    weld_decimals: int = 4,
+    quantize_bits: int = None,
+    drop_degenerate: bool = True,
+):
+    """
+    build_compact_mesh
+
+    shrink a marching cubes mesh for storing,
+    exporting and loading into blender by:
+
+    - welding vertices that share the same
+        position after rounding to weld_decimals
+    - dropping degenerate and duplicate faces
+        and any vertices no face uses
+    - storing the faces with the smallest index
+        dtype (np.uint16 or np.int32)
+    - storing float32 coordinates or optionally
+        quantizing them to 8 or 16 bits per axis
+
+    the per-vertex normals and values keep the
+    first welded vertex's entry
+
+    returns a dictionary
+
+        ```
+        mesh = {
+            "vertices": vertices,
+            "faces": faces,
+            "normals": normals,
+            "values": values,
+            "quantize_bits": quantize_bits,
+            "scale": scale,
+            "offset": offset,
+            "num_vertices": num_vertices,
+            "num_faces": num_faces,
+            "src_nbytes": src_nbytes,
+            "nbytes": nbytes,
+            "size_mb": size_mb,
+            "size": f"{size_mb}mb",
+        }
+        ```
+
+    :param vertices: (num_vertices, 3) array
+    :param faces: (num_faces, N) array of vertex
+        indices (triangles or quads)
+    :param normals: optional - (num_vertices, 3)
+        array
+    :param values: optional - (num_vertices,) array
+    :param weld_decimals: number of decimals to
+        round the positions before welding
+        (None disables welding)
+    :param quantize_bits: optional - 8 or 16 to
+        store the vertices as unsigned integers
+        with a per-axis scale and offset
+    :param drop_degenerate: flag to remove faces
+        that reuse the same vertex
+    """
+    vertices = np.asarray(vertices)
+    faces = np.asarray(faces).astype(np.int64)
+    src_nbytes = get_mesh_nbytes(
+        vertices,
+        faces,
+        None if normals is None else np.asarray(normals),
+        None if values is None else np.asarray(values),
+    )
+    num_src_vertices = len(vertices)
+    num_src_faces = len(faces)
+
+    # weld vertices by rounded position keeping
+    # the first-seen order for cache locality
+    keep = np.arange(num_src_vertices)
+    if weld_decimals is not None and num_src_vertices:
+        rounded = np.round(
+            vertices.astype(np.float64), weld_decimals
+        )
+        (
+            _,
+            first_idx,
+            inverse,
+        ) = np.unique(
+            rounded,
+            axis=0,
+            return_index=True,
+            return_inverse=True,
+        )
+        order = np.argsort(first_idx)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        keep = first_idx[order]
+        faces = rank[inverse.reshape(-1)][faces]
+
+    if drop_degenerate and len(faces):
+        sorted_faces = np.sort(faces, axis=1)
+        is_valid = np.all(
+            np.diff(sorted_faces, axis=1) != 0, axis=1
+        )
+        _, unique_idx = np.unique(
+            sorted_faces[is_valid],
+            axis=0,
+            return_index=True,
+        )
+        faces = faces[is_valid][np.sort(unique_idx)]
+
+    # remove unused vertices
+    used = np.zeros(len(keep), dtype=bool)
+    used[faces.reshape(-1)] = True
+    remap = np.cumsum(used) - 1
+    keep = keep[used]
+    faces = remap[faces]
+
+    num_vertices = len(keep)
+    index_dtype = get_index_dtype(num_vertices)
+    faces = faces.astype(index_dtype)
+    mesh_vertices = vertices[keep].astype(np.float32)
+    mesh_normals = None
+    if normals is not None:
+        mesh_normals = np.asarray(normals)[keep].astype(
+            np.float32
+        )
+    mesh_values = None
+    if values is not None:
+        mesh_values = np.asarray(values)[keep].astype(
+            np.float32
+        )
+
+    scale = None
+    offset = None
+    if quantize_bits:
+        if quantize_bits not in [8, 16]:
+            raise ValueError(
+                f"unsupported quantize_bits={quantize_bits} "
+                "only 8 or 16 are supported"
+            )
+        quantize_dtype = np.uint8
+        if quantize_bits == 16:
+            quantize_dtype = np.uint16
+        max_int = float(np.iinfo(quantize_dtype).max)
+        offset = np.zeros(3, dtype=np.float32)
+        scale = np.ones(3, dtype=np.float32)
+        if num_vertices:
+            offset = np.min(mesh_vertices, axis=0)
+            extent = np.max(mesh_vertices, axis=0) - offset
+            scale = np.where(
+                extent > 0.0, extent / max_int, 1.0
+            ).astype(np.float32)
+        mesh_vertices = np.round(
+            (mesh_vertices - offset) / scale
+        ).astype(quantize_dtype)
+
+    nbytes = get_mesh_nbytes(
+        mesh_vertices,
+        faces,
+        mesh_normals,
+        mesh_values,
+    )
+    size_mb = float(f"{nbytes / 1024.0 / 1024.0:.2f}")
+    log.debug(
+        f"compacted vertices={num_src_vertices} "
+        f"to {num_vertices} "
+        f"faces={num_src_faces} to {len(faces)} "
+        f"index_dtype={np.dtype(index_dtype).name} "
+        f"quantize_bits={quantize_bits} "
+        f"bytes={src_nbytes} to {nbytes}"
+    )
+    return {
+        "vertices": mesh_vertices,
+        "faces": faces,
+        "normals": mesh_normals,
+        "values": mesh_values,
+        "quantize_bits": quantize_bits,
+        "scale": scale,
+        "offset": offset,
+        "num_vertices": num_vertices,
+        "num_faces": len(faces),
+        "src_nbytes": src_nbytes,
+        "nbytes": nbytes,
+        "size_mb": size_mb,
+        "size": f"{size_mb}mb",
+    }
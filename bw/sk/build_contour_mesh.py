@@ -0,0 +1,266 @@
+import logging
+import numpy as np
+from skimage.measure import find_contours
+
+
+log = logging.getLogger(__name__)
+
+
+def get_vertex_normals(
+    vertices: np.ndarray,
+    faces: np.ndarray,
+):
+    """
+    get_vertex_normals
+
+    area weighted vertex normals from the summed
+    normals of the faces around each vertex
+
+    :param vertices: (num_vertices, 3) array
+    :param faces: (num_faces, 4) quad array
+    """
+    face_normals = np.cross(
+        vertices[faces[:, 2]] - vertices[faces[:, 0]],
+        vertices[faces[:, 3]] - vertices[faces[:, 1]],
+    )
+    normals = np.zeros_like(vertices)
+    for corner in range(faces.shape[1]):
+        np.add.at(normals, faces[:, corner], face_normals)
+    length = np.linalg.norm(normals, axis=1, keepdims=True)
+    return (normals / np.maximum(length, 1e-12)).astype(
+        np.float32
+    )
+
+
+def extrude_contours(
+    contours: list,
+    depth: float = 0.0,
+    thickness: float = 1.0,
+    width: float = 0.5,
+):
+    """
+    extrude_contours
+
+    extrude 2d (row, col) contour polylines into
+    closed thin prisms (vectorized over every
+    contour at once). each contour is offset by
+    width / 2 on both sides in the (row, col)
+    plane and extruded thickness along the depth
+    axis. every segment gets 4 quads (inner,
+    outer, bottom and top) and open contours get
+    an end cap on both ends so the mesh is
+    watertight with outward facing quads.
+
+    returns a tuple (
+        vertices,
+        faces,
+    ) with vertices in (row, depth, col) order and
+    faces as a (num_faces, 4) quad array
+
+    :param contours: list of (N, 2) arrays
+    :param depth: depth for the bottom of the walls
+    :param thickness: wall height along the depth
+    :param width: wall width in the (row, col)
+        plane
+    """
+    closed = []
+    open_contours = []
+    for contour in contours:
+        # find_contours repeats the first point to
+        # close a contour
+        if (len(contour) > 3) and np.allclose(
+            contour[0], contour[-1]
+        ):
+            closed.append(contour[:-1])
+        elif len(contour) > 1:
+            open_contours.append(contour)
+    contours = closed + open_contours
+    if not contours:
+        return (
+            np.zeros((0, 3), dtype=np.float32),
+            np.zeros((0, 4), dtype=np.int64),
+        )
+    points = np.concatenate(contours).astype(np.float32)
+    num_points = len(points)
+    lengths = np.array(
+        [len(contour) for contour in contours]
+    )
+    firsts = np.cumsum(lengths) - lengths
+    lasts = firsts + lengths - 1
+    is_closed = np.zeros(len(contours), dtype=bool)
+    is_closed[: len(closed)] = True
+    point_ids = np.arange(num_points)
+    # neighbors wrap around closed contours and
+    # clamp at the ends of open ones
+    next_ids = point_ids + 1
+    prev_ids = point_ids - 1
+    next_ids[lasts] = np.where(is_closed, firsts, lasts)
+    prev_ids[firsts] = np.where(is_closed, lasts, firsts)
+
+    tangents = points[next_ids] - points[prev_ids]
+    tangents /= np.maximum(
+        np.linalg.norm(tangents, axis=1, keepdims=True),
+        1e-12,
+    )
+    offsets = np.stack(
+        [-tangents[:, 1], tangents[:, 0]], axis=1
+    ) * (0.5 * width)
+    # 4 vertices per point around the cross section
+    # inner bottom, outer bottom, outer top, inner top
+    sections = []
+    for side, height in (
+        (-1.0, depth),
+        (1.0, depth),
+        (1.0, depth + thickness),
+        (-1.0, depth + thickness),
+    ):
+        shifted = points + side * offsets
+        sections.append(
+            np.stack(
+                [
+                    shifted[:, 0],
+                    np.full(
+                        num_points, height, dtype=np.float32
+                    ),
+                    shifted[:, 1],
+                ],
+                axis=1,
+            )
+        )
+    vertices = np.stack(sections, axis=1).reshape(-1, 3)
+
+    # every point starts a segment except the last
+    # point of an open contour
+    is_start = np.ones(num_points, dtype=bool)
+    is_start[lasts[~is_closed]] = False
+    starts = np.nonzero(is_start)[0]
+    ends = next_ids[starts]
+    sides = []
+    for corner in range(4):
+        next_corner = (corner + 1) % 4
+        sides.append(
+            np.stack(
+                [
+                    starts * 4 + corner,
+                    ends * 4 + corner,
+                    ends * 4 + next_corner,
+                    starts * 4 + next_corner,
+                ],
+                axis=1,
+            )
+        )
+    open_firsts = firsts[~is_closed]
+    open_lasts = lasts[~is_closed]
+    caps = [
+        open_firsts[:, None] * 4 + np.array([0, 1, 2, 3]),
+        open_lasts[:, None] * 4 + np.array([3, 2, 1, 0]),
+    ]
+    faces = np.concatenate(sides + caps).astype(np.int64)
+    log.debug(
+        f"extruded contours={len(contours)} "
+        f"closed={len(closed)} "
+        f"points={num_points} "
+        f"quads={len(faces)}"
+    )
+    return (
+        vertices,
+        faces,
+    )
+
+
+def build_contour_mesh(
+    data: np.ndarray,
+    levels: list = None,
+    quantiles: list = None,
+    step_size: int = 1,
+    thickness: float = 1.0,
+    band_offset: float = 1.0,
+    width: float = 0.5,
+):
+    """
+    build_contour_mesh
+
+    run 2d marching squares
+    (skimage.measure.find_contours) on a fitted
+    layer at a few levels and extrude the contours
+    into closed thin prisms. each level is offset along the
+    depth axis to keep the banded look of the
+    isosurface renders without a 3d volume.
+
+    returns a tuple matching
+    skimage.measure.marching_cubes (
+        vertices,
+        faces,
+        normals,
+        values,
+    ) where faces is a (num_faces, 4) quad array,
+    normals holds the outward vertex normals and
+    values holds the level for each vertex
+
+    :param data: 2d array (or a fitted 3d array
+        where the first depth slice is used)
+    :param levels: optional - contour levels
+    :param quantiles: optional - data quantiles to
+        use as the levels with default
+        [0.1, 0.5, 0.9] (ignored if levels is set)
+    :param step_size: sample every step_size
+        value in each axis
+    :param thickness: wall height along the depth
+    :param band_offset: depth offset between
+        the levels
+    :param width: wall width in the (row, col)
+        plane
+    """
+    if data.ndim == 3:
+        data = data[:, :, 0]
+    step_size = max(1, int(step_size))
+    grid = np.asarray(
+        data[::step_size, ::step_size], dtype=np.float32
+    )
+    if levels is None:
+        if not quantiles:
+            quantiles = [0.1, 0.5, 0.9]
+        levels = np.quantile(grid, quantiles)
+    blocks_vertices = []
+    blocks_faces = []
+    blocks_values = []
+    num_vertices = 0
+    for level_idx, level in enumerate(levels):
+        (
+            vertices,
+            faces,
+        ) = extrude_contours(
+            find_contours(grid, float(level)),
+            depth=level_idx * band_offset,
+            thickness=thickness,
+            width=width,
+        )
+        if not len(faces):
+            continue
+        vertices[:, 0] *= step_size
+        vertices[:, 2] *= step_size
+        blocks_vertices.append(vertices)
+        blocks_faces.append(faces + num_vertices)
+        blocks_values.append(
+            np.full(len(vertices), level, dtype=np.float32)
+        )
+        num_vertices += len(vertices)
+    if not blocks_faces:
+        raise ValueError(
+            "No contours found at the given levels."
+        )
+    vertices = np.concatenate(blocks_vertices)
+    faces = np.concatenate(blocks_faces)
+    log.debug(
+        f"contours data={data.shape} "
+        f"levels={len(levels)} "
+        f"step_size={step_size} "
+        f"verts={num_vertices} "
+        f"quads={len(faces)}"
+    )
+    return (
+        vertices,
+        faces,
+        get_vertex_normals(vertices, faces),
+        np.concatenate(blocks_values),
+    )
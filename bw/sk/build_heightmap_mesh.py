@@ -0,0 +1,103 @@
+import logging
+import numpy as np
+import bw.sk.build_compact_mesh as bwcm
+
+
+log = logging.getLogger(__name__)
+
+
+def build_heightmap_mesh(
+    data: np.ndarray,
+    step_size: int = 1,
+    height: float = 10.0,
+    z_scale: float = None,
+):
+    """
+    build_heightmap_mesh
+
+    build a displaced grid mesh directly from a
+    fitted 2d layer with vectorized vertex and
+    face index generation (no isosurface search).
+    vertices use the same (row, depth, col)
+    orientation as the marching cubes meshes with
+    the weight value as the depth.
+
+    returns a tuple matching
+    skimage.measure.marching_cubes (
+        vertices,
+        faces,
+        normals,
+        values,
+    ) where faces is a (num_faces, 4) quad array
+
+    :param data: 2d array (or a fitted 3d array
+        where the first depth slice is used)
+    :param step_size: sample every step_size
+        value in each axis
+    :param height: displacement for the largest
+        absolute value
+    :param z_scale: optional - multiply the values
+        by this instead of scaling to height
+    """
+    if data.ndim == 3:
+        data = data[:, :, 0]
+    step_size = max(1, int(step_size))
+    grid = np.asarray(
+        data[::step_size, ::step_size], dtype=np.float32
+    )
+    num_rows, num_cols = grid.shape
+    if (num_rows < 2) or (num_cols < 2):
+        raise ValueError(
+            "heightmap requires at least 2 rows and 2 "
+            f"columns after step_size={step_size} "
+            f"for data={data.shape}"
+        )
+    if z_scale is None:
+        abs_max = float(np.max(np.abs(grid)))
+        z_scale = height / abs_max if abs_max > 0.0 else 0.0
+    rows, cols = np.meshgrid(
+        np.arange(num_rows, dtype=np.float32) * step_size,
+        np.arange(num_cols, dtype=np.float32) * step_size,
+        indexing="ij",
+    )
+    vertices = np.stack(
+        [rows, grid * z_scale, cols], axis=-1
+    ).reshape(-1, 3)
+
+    index_dtype = bwcm.get_index_dtype(num_rows * num_cols)
+    ids = np.arange(
+        num_rows * num_cols, dtype=index_dtype
+    ).reshape(num_rows, num_cols)
+    faces = np.stack(
+        [
+            ids[:-1, :-1],
+            ids[:-1, 1:],
+            ids[1:, 1:],
+            ids[1:, :-1],
+        ],
+        axis=-1,
+    ).reshape(-1, 4)
+
+    # normals from the central difference gradient
+    d_row, d_col = np.gradient(
+        grid * z_scale, float(step_size)
+    )
+    normals = np.stack(
+        [-d_row, np.ones_like(grid), -d_col], axis=-1
+    ).reshape(-1, 3)
+    normals /= np.linalg.norm(
+        normals, axis=1, keepdims=True
+    )
+    log.debug(
+        f"heightmap data={data.shape} "
+        f"step_size={step_size} "
+        f"z_scale={z_scale} "
+        f"verts={len(vertices)} "
+        f"quads={len(faces)}"
+    )
+    return (
+        vertices,
+        faces,
+        normals.astype(np.float32),
+        grid.reshape(-1),
+    )
@@ -0,0 +1,313 @@
+import logging
+import numpy as np
+import bw.sk.profile_data_with_cubes as bwmc
+import bw.sk.extract_multi_isosurfaces as bwmi
+import bw.sk.build_mesh_report as bwmr
+import bw.sk.build_heightmap_mesh as bwhm
+import bw.sk.build_contour_mesh as bwcn
+
+
+log = logging.getLogger(__name__)
+
+supported_modes = [
+    "isosurface",
+    "heightmap",
+    "contours",
+]
+
+
+def build_layer_mesh(
+    data: np.ndarray,
+    name: str = None,
+    target_faces: int = None,
+    target_mb: float = None,
+    mc_report_file: str = None,
+    brick_size: int = None,
+    min_island_faces: int = None,
+    min_island_size: float = None,
+    max_islands: int = None,
+    mask: np.ndarray = None,
+    shell_quantiles: list = None,
+    engine: str = None,
+    mode: str = None,
+):
+    """
+    build_layer_mesh
+
+    find the marching cubes mesh for one fitted
+    model layer without needing blender. the data
+    is flipped to the (x, z, y) orientation used
+    for drawing and profiled with
+    bw.sk.profile_data_with_cubes. if nothing is
+    found near the target_faces the profile is
+    retried with target_faces=1000.
+
+    returns the closest report dictionary
+    (with vertices, faces, normals, z_values,
+    level, step_size and desc keys) or None if
+    no marching cubes configuration was found
+
+    :param data: fitted 3d array for the layer
+    :param name: optional - label for tracking
+        issues ingesting data
+    :param target_faces: optional - find the nearest
+        marching cubes configuration by resulting
+        number of faces in the volume
+    :param target_mb: optional - find the nearest
+        marching cubes configuration by resulting
+        megabyte size
+    :param mc_report_file: optional - path to save
+        the mc_report slim dictionary as a json
+        file
+    :param brick_size: optional - run marching cubes
+        in overlapping bricks of this many cells
+    :param min_island_faces: optional - drop
+        disconnected surface components with fewer
+        faces than this
+    :param min_island_size: optional - drop
+        disconnected surface components with a
+        smaller bounding box extent (in voxels)
+    :param max_islands: optional - keep only this
+        many of the largest surface components
+    :param mask: optional - boolean array with the
+        same shape as the data to limit marching
+        cubes to salient regions
+        (see bw.np.build_salience_mask)
+    :param shell_quantiles: optional - skip profiling
+        and draw one nested isosurface for each
+        data quantile (for example
+        [0.05, 0.5, 0.95]) with
+        bw.sk.extract_multi_isosurfaces (also the
+        contour levels for mode contours)
+    :param engine: optional - isosurface engine
+        marching_cubes (default) or surface_nets
+        for quad meshes with roughly half the faces
+    :param mode: optional - isosurface (default) or
+        heightmap to skip the isosurface search and
+        build a displaced grid from the first depth
+        slice with bw.sk.build_heightmap_mesh
+        (sampled to get close to target_faces) or
+        contours to extrude 2d contours at the
+        shell_quantiles levels with
+        bw.sk.build_contour_mesh
+    """
+    if not mode:
+        mode = "isosurface"
+    if mode == "heightmap":
+        step_size = 1
+        if target_faces:
+            step_size = max(
+                1,
+                int(
+                    np.sqrt(
+                        data.shape[0]
+                        * data.shape[1]
+                        / float(target_faces)
+                    )
+                ),
+            )
+        try:
+            (
+                vertices,
+                faces,
+                normals,
+                values,
+            ) = bwhm.build_heightmap_mesh(
+                data, step_size=step_size
+            )
+        except ValueError as e:
+            log.debug(
+                f"failed to build heightmap for name={name} "
+                f"with ex={e}"
+            )
+            return None
+        return bwmr.build_mesh_report(
+            vertices=vertices,
+            faces=faces,
+            normals=normals,
+            values=values,
+            step_size=step_size,
+            desc=f"heightmap {len(faces)} faces",
+        )
+    elif mode == "contours":
+        step_size = 1
+        try:
+            contour_mesh = bwcn.build_contour_mesh(
+                data, quantiles=shell_quantiles
+            )
+            # contour faces scale with 1 / step_size^2 so
+            # estimate the step from the faces and correct
+            # it with the real faces
+            num_tries = 0
+            while (
+                target_faces
+                and (num_tries < 4)
+                and (
+                    len(contour_mesh[1])
+                    > 1.5 * target_faces
+                )
+            ):
+                num_tries += 1
+                next_step_size = max(
+                    step_size + 1,
+                    int(
+                        np.ceil(
+                            step_size
+                            * np.sqrt(
+                                len(contour_mesh[1])
+                                / float(target_faces)
+                            )
+                        )
+                    ),
+                )
+                try:
+                    next_mesh = bwcn.build_contour_mesh(
+                        data,
+                        quantiles=shell_quantiles,
+                        step_size=next_step_size,
+                    )
+                except ValueError:
+                    # sampled past every contour
+                    break
+                # keep the step closer to the target once
+                # the faces drop below it
+                if len(next_mesh[1]) < target_faces and (
+                    len(contour_mesh[1]) - target_faces
+                    < target_faces - len(next_mesh[1])
+                ):
+                    break
+                step_size = next_step_size
+                contour_mesh = next_mesh
+        except ValueError as e:
+            log.debug(
+                f"failed to build contours for name={name} "
+                f"with ex={e}"
+            )
+            return None
+        (
+            vertices,
+            faces,
+            normals,
+            values,
+        ) = contour_mesh
+        return bwmr.build_mesh_report(
+            vertices=vertices,
+            faces=faces,
+            normals=normals,
+            values=values,
+            level=[
+                float(level) for level in np.unique(values)
+            ],
+            step_size=step_size,
+            desc=f"contours {len(faces)} faces",
+        )
+    elif mode != "isosurface":
+        raise ValueError(
+            f"unsupported layer mesh mode={mode} "
+            f"only {supported_modes} are supported"
+        )
+    # Flip the array to have the desired orientation (x, z, y)
+    data = np.transpose(data, (0, 2, 1))
+    if shell_quantiles:
+        try:
+            shells = bwmi.extract_multi_isosurfaces(
+                data=data,
+                quantiles=shell_quantiles,
+                mask=(
+                    None
+                    if mask is None
+                    else np.transpose(mask, (0, 2, 1))
+                ),
+            )
+        except (ValueError, RuntimeError) as e:
+            log.debug(
+                "failed to find isosurface shells for "
+                f"name={name} with ex={e}"
+            )
+            return None
+        levels = [
+            shell["level"] for shell in shells["levels"]
+        ]
+        return bwmr.build_mesh_report(
+            vertices=shells["vertices"],
+            faces=shells["faces"],
+            normals=shells["normals"],
+            values=shells["values"],
+            level=levels,
+            step_size=shells["step_size"],
+            desc=f"shells q={list(shell_quantiles)}",
+            shells=shells["levels"],
+        )
+    mask_options = [None]
+    if mask is not None:
+        # fall back to the full volume if the mask
+        # hides every surface
+        mask_options = [
+            [np.transpose(mask, (0, 2, 1))],
+            None,
+        ]
+
+    mc_report = None
+    for masks in mask_options:
+        # Apply marching cubes algorithm and build a report
+        mc_report = bwmc.profile_data_with_cubes(
+            data=data,
+            data_name=name,
+            target_mb=target_mb,
+            target_faces=target_faces,
+            masks=masks,
+            save_to_file=mc_report_file,
+            include_vertices=True,
+            include_normals=True,
+            include_faces=True,
+            include_masks=True,
+            brick_size=brick_size,
+            min_island_faces=min_island_faces,
+            min_island_size=min_island_size,
+            max_islands=max_islands,
+            engine=engine,
+        )
+        if mc_report is None:
+            mc_report = bwmc.profile_data_with_cubes(
+                data=data,
+                data_name=name,
+                target_mb=target_mb,
+                target_faces=1000,
+                masks=masks,
+                save_to_file=mc_report_file,
+                include_vertices=True,
+                include_normals=True,
+                include_faces=True,
+                include_masks=True,
+                brick_size=brick_size,
+                min_island_faces=min_island_faces,
+                min_island_size=min_island_size,
+                max_islands=max_islands,
+                engine=engine,
+            )
+        if mc_report is not None:
+            break
+        if masks:
+            log.debug(
+                "no marching cube profile inside the mask for "
+                f"name={name} - retrying without the mask"
+            )
+    if mc_report is None:
+        log.debug(
+            "failed to find a marching cube profile for "
+            f"name={name}"
+        )
+        return None
+
+    # Find the closest report based off the target
+    closest_report = mc_report["closest"]
+    if len(closest_report) == 0:
+        log.error(
+            "failed to find a marching cube configuration "
+            f"name={name} "
+            f"that targets faces={target_faces} "
+            f"size_mb={target_mb} "
+            "stopping"
+        )
+        return None
+    return closest_report
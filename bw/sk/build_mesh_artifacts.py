@@ -0,0 +1,190 @@
+import os
+import logging
+import bw.np.extract_weights as extract_weights
+import bw.sk.build_layer_mesh as bwlm
+import bw.sk.mesh_artifact as bwma
+
+
+log = logging.getLogger(__name__)
+
+
+def build_mesh_artifacts(
+    input_file: str,
+    output_dir: str,
+    layer_names: list = [],
+    max_layers: int = None,
+    device: str = "cpu",
+    target_faces: int = None,
+    target_rows: int = 256,
+    target_cols: int = 256,
+    x: int = 0,
+    y: int = 0,
+    z: int = 1,
+    max_depth: int = 2,
+    pad_per: int = 20,
+    brick_size: int = None,
+    quantize_bits: int = None,
+    index_file: str = None,
+    min_island_faces: int = None,
+    min_island_size: float = None,
+    max_islands: int = None,
+    engine: str = None,
+    mode: str = None,
+    shell_quantiles: list = None,
+):
+    """
+    build_mesh_artifacts
+
+    headless compute run that extracts a
+    model.safetensors file, finds the marching
+    cubes mesh for every layer and saves one
+    binary npz artifact per layer plus a
+    model-level json index. blender can then
+    draw the model with
+    bw.bl.draw_model_layers(mesh_index_file=...)
+    without recomputing any meshes.
+
+    returns the index dictionary
+
+    :param input_file: path to model.safetensors
+        file
+    :param output_dir: directory for the layer
+        npz files and the index
+    :param layer_names: filter by layer
+        layer colomn names
+    :param max_layers: limit the number of
+        layers to build
+    :param device: cpu vs gpu
+    :param target_faces: min faces to
+        hopefully build if there is
+        enough data
+    :param target_rows: number of
+        resample target rows before
+        meshing
+    :param target_cols: number of
+        resample target cols before
+        meshing
+    :param x: starting x axis location
+        for all shapes
+    :param y: starting y axis location
+        for all shapes
+    :param z: starting z axis location
+        for all shapes
+    :param max_depth: stack each layer
+        on itself this many times
+        to convert it to a 3d ndarray
+    :param pad_per: number to pad
+        per object
+    :param brick_size: optional - run marching cubes
+        in overlapping bricks of this many cells
+    :param quantize_bits: optional - 8 or 16 to
+        quantize the stored vertices
+    :param index_file: optional - path for the
+        index with default
+        {output_dir}/index.json
+    :param min_island_faces: optional - drop
+        disconnected surface components with fewer
+        faces than this
+    :param min_island_size: optional - drop
+        disconnected surface components with a
+        smaller bounding box extent (in voxels)
+    :param max_islands: optional - keep only this
+        many of the largest surface components
+    :param engine: optional - isosurface engine
+        marching_cubes (default) or surface_nets
+    :param mode: optional - isosurface (default),
+        heightmap to build a displaced grid mesh
+        directly from each fitted layer or contours
+        to extrude 2d contours at the
+        shell_quantiles levels
+    :param shell_quantiles: optional - draw nested
+        isosurfaces at these data quantiles (for
+        example [0.05, 0.5, 0.95]) for each layer
+    """
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    if not index_file:
+        index_file = f"{output_dir}/index.json"
+    all_data_3d = (
+        extract_weights.extract_3d_shapes_from_model_file(
+            input_file=input_file,
+            layer_names=layer_names,
+            max_layers=max_layers,
+            device=device,
+            target_faces=target_faces,
+            target_rows=target_rows,
+            target_cols=target_cols,
+            start_x=x,
+            start_y=y,
+            start_z=z,
+            max_depth=max_depth,
+            pad_per=pad_per,
+        )
+    )
+    num_datas = len(all_data_3d)
+    log.info(
+        f"building {num_datas} mesh artifacts "
+        f"model={input_file} "
+        f"output_dir={output_dir}"
+    )
+    layers = []
+    for idx, data_3d in enumerate(all_data_3d):
+        name = data_3d["name"]
+        closest_report = bwlm.build_layer_mesh(
+            data=data_3d["data"],
+            name=name,
+            target_faces=data_3d["target_faces"],
+            brick_size=brick_size,
+            min_island_faces=min_island_faces,
+            min_island_size=min_island_size,
+            max_islands=max_islands,
+            engine=engine,
+            mode=mode,
+            shell_quantiles=shell_quantiles,
+        )
+        layer = {
+            "idx": idx,
+            "name": name,
+            "desc": data_3d["desc"],
+            "target_faces": data_3d["target_faces"],
+            "target_rows": target_rows,
+            "target_cols": target_cols,
+            "x": data_3d["x"],
+            "y": data_3d["y"],
+            "z": data_3d["z"],
+            "file": None,
+        }
+        if closest_report is None:
+            log.info(
+                f"ignoring {idx + 1}/{num_datas} {name}"
+            )
+        else:
+            layer.update(
+                bwma.save_mesh_artifact(
+                    path=f"{output_dir}/layer_{idx}.npz",
+                    closest_report=closest_report,
+                    name=name,
+                    desc=data_3d["desc"],
+                    data=data_3d["data"],
+                    quantize_bits=quantize_bits,
+                )
+            )
+            log.info(
+                f"built {idx + 1}/{num_datas} {name} "
+                f"faces={layer['num_faces']} "
+                f"size={layer['size']}"
+            )
+        layers.append(layer)
+    return bwma.save_mesh_artifact_index(
+        path=index_file,
+        layers=layers,
+        model_file=input_file,
+        target_faces=target_faces,
+        target_rows=target_rows,
+        target_cols=target_cols,
+        x=x,
+        y=y,
+        z=z,
+        max_depth=max_depth,
+        pad_per=pad_per,
+    )
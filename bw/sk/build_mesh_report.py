@@ -0,0 +1,70 @@
+import logging
+import numpy as np
+import bw.sk.build_compact_mesh as bwcm
+
+
+log = logging.getLogger(__name__)
+
+
+def build_mesh_report(
+    vertices: np.ndarray,
+    faces: np.ndarray,
+    normals: np.ndarray = None,
+    values: np.ndarray = None,
+    level: float = None,
+    step_size: int = None,
+    desc: str = None,
+    **kwargs,
+):
+    """
+    build_mesh_report
+
+    build a closest report dictionary (the same
+    keys bw.sk.profile_data_with_cubes returns
+    in report["closest"]) for a mesh that was
+    not found by profiling so
+    bw.bl.generate_3d_from_3d can draw it
+
+    :param vertices: (num_vertices, 3) array
+    :param faces: (num_faces, N) array
+    :param normals: optional - (num_vertices, 3)
+        array
+    :param values: optional - (num_vertices,) array
+        with default all zeros
+    :param level: optional - level used to
+        build the mesh
+    :param step_size: optional - step size used
+        to build the mesh
+    :param desc: optional - description with
+        default showing the mesh size
+    :param kwargs: optional - extra keys to add
+        to the report
+    """
+    if normals is None:
+        normals = np.zeros((0, 3), dtype=np.float32)
+    if values is None:
+        values = np.zeros(len(vertices), dtype=np.float32)
+    nbytes = bwcm.get_mesh_nbytes(
+        vertices, faces, normals, values
+    )
+    size_mb = float(f"{nbytes / 1024.0 / 1024.0:.2f}")
+    if desc is None:
+        desc = f"calc {size_mb}mb"
+    report = {
+        "desc": desc,
+        "size_mb": size_mb,
+        "size": f"{size_mb}mb",
+        "level": level,
+        "step_size": step_size,
+        "mask": None,
+        "num_vertices": len(vertices),
+        "vertices": vertices,
+        "num_faces": len(faces),
+        "faces": faces,
+        "num_normals": len(normals),
+        "normals": normals,
+        "z_values": values,
+        "num_z_values": len(values),
+    }
+    report.update(kwargs)
+    return report
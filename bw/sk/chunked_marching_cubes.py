@@ -0,0 +1,374 @@
+import os
+import logging
+import collections
+import concurrent.futures
+import numpy as np
+from skimage.measure import marching_cubes
+
+
+log = logging.getLogger(__name__)
+
+
+def get_brick_origins(
+    shape: tuple,
+    brick_size: int,
+    step_size: int = 1,
+):
+    """
+    get_brick_origins
+
+    split a 3d shape into bricks that share one
+    plane of samples with their neighbors and
+    return the (x, y, z) origin of each brick
+
+    bricks that cannot hold a full step in every
+    dimension are skipped because marching cubes
+    would not emit any cells for them
+
+    :param shape: (rows, cols, depth) of the volume
+    :param brick_size: number of cells per brick
+        in each dimension
+    :param step_size: marching cubes step size
+    """
+    origins = []
+    ranges = []
+    for dim in shape:
+        ranges.append(
+            [
+                start
+                for start in range(
+                    0, max(dim - 1, 1), brick_size
+                )
+                if min(dim - start, brick_size + 1)
+                >= step_size + 1
+            ]
+        )
+    for x0 in ranges[0]:
+        for y0 in ranges[1]:
+            for z0 in ranges[2]:
+                origins.append((x0, y0, z0))
+    return origins
+
+
+def extract_brick(
+    data: np.ndarray,
+    origin: tuple,
+    brick_size: int,
+    level: float,
+    step_size: int = 1,
+    mask: np.ndarray = None,
+):
+    """
+    extract_brick
+
+    run marching cubes on one brick of the volume
+    and return the vertices in the volume's
+    coordinate space
+
+    returns None if the brick does not cross the
+    level or a tuple (
+        vertices,
+        faces,
+        normals,
+        values,
+        seam,
+    ) where seam is a boolean array flagging the
+    vertices that sit on a plane shared with a
+    neighboring brick
+
+    :param data: full 3d volume
+    :param origin: (x, y, z) start of the brick
+    :param brick_size: number of cells per brick
+    :param level: marching cubes level
+    :param step_size: marching cubes step size
+    :param mask: optional - full 3d boolean mask
+    """
+    brick_slice = tuple(
+        slice(start, start + brick_size + 1)
+        for start in origin
+    )
+    brick = data[brick_slice]
+    if (np.min(brick) > level) or (np.max(brick) < level):
+        return None
+    brick_mask = None
+    if mask is not None:
+        brick_mask = mask[brick_slice]
+        if not np.any(brick_mask):
+            return None
+    try:
+        (
+            vertices,
+            faces,
+            normals,
+            values,
+        ) = marching_cubes(
+            brick,
+            level=level,
+            step_size=step_size,
+            mask=brick_mask,
+        )
+    except (ValueError, RuntimeError) as e:
+        if "No surface found" in str(e):
+            return None
+        raise e
+    if not len(faces):
+        return None
+    seam = np.any(
+        (vertices == 0.0) | (vertices == float(brick_size)),
+        axis=1,
+    )
+    vertices += np.array(origin, dtype=vertices.dtype)
+    return (
+        vertices,
+        faces,
+        normals,
+        values,
+        seam,
+    )
+
+
+def chunked_marching_cubes(
+    data: np.ndarray,
+    level: float = None,
+    step_size: int = 1,
+    mask: np.ndarray = None,
+    brick_size: int = 128,
+    num_workers: int = None,
+    output_dir: str = None,
+    weld_decimals: int = 4,
+):
+    """
+    chunked_marching_cubes
+
+    run marching cubes over a large 3d volume
+    by splitting it into bricks that overlap by
+    one plane of samples. bricks are processed in
+    parallel and the vertices on the shared planes
+    are welded so the output matches a single
+    marching cubes call without needing the
+    temporaries for the whole volume at once.
+
+    at most 2 * num_workers bricks are in flight
+    so peak memory is per-brick. the welded
+    vertex/face blocks are appended to a growing
+    list or streamed to raw files in the
+    output_dir when set.
+
+    returns a tuple matching
+    skimage.measure.marching_cubes (
+        vertices,
+        faces,
+        normals,
+        values,
+    )
+
+    :param data: numpy 3d ndarray of data
+    :param level: optional - marching cubes level
+        with default set to the middle of the
+        data range
+    :param step_size: marching cubes step size
+    :param mask: optional - 3d boolean mask with
+        the same shape as the data
+    :param brick_size: number of cells per brick
+        in each dimension (rounded down to a
+        multiple of the step_size)
+    :param num_workers: optional - number of
+        threads with default os.cpu_count()
+    :param output_dir: optional - stream the
+        vertices.bin, faces.bin, normals.bin and
+        values.bin blocks to this directory and
+        return read-only np.memmap arrays
+    :param weld_decimals: number of decimals
+        to round seam vertices before welding
+    :raises ValueError: with the same messages
+        as skimage.measure.marching_cubes if the
+        level is outside the data range or no
+        surface was found
+    """
+    data_min = float(np.min(data))
+    data_max = float(np.max(data))
+    if level is None:
+        level = 0.5 * (data_min + data_max)
+    if not (data_min <= level <= data_max):
+        raise ValueError(
+            "Surface level must be within volume data range."
+        )
+    if mask is not None and mask.shape != data.shape:
+        raise ValueError(
+            "mask.shape and volume.shape must match"
+        )
+    step_size = max(1, int(step_size))
+    brick_size = max(
+        step_size,
+        int(brick_size) - int(brick_size) % step_size,
+    )
+    if not num_workers:
+        num_workers = os.cpu_count() or 1
+
+    origins = get_brick_origins(
+        shape=data.shape,
+        brick_size=brick_size,
+        step_size=step_size,
+    )
+    num_bricks = len(origins)
+    log.debug(
+        f"chunking data={data.shape} "
+        f"bricks={num_bricks} "
+        f"brick_size={brick_size} "
+        f"level={level} "
+        f"step_size={step_size} "
+        f"workers={num_workers} "
+        f"output_dir={output_dir}"
+    )
+
+    out_files = None
+    blocks = {
+        "vertices": [],
+        "faces": [],
+        "normals": [],
+        "values": [],
+    }
+    if output_dir:
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        out_files = {
+            key: open(f"{output_dir}/{key}.bin", "wb")
+            for key in blocks
+        }
+
+    seam_index = {}
+    num_vertices = 0
+    num_faces = 0
+    try:
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=num_workers
+        ) as executor:
+            pending = collections.deque()
+            next_idx = 0
+            while next_idx < num_bricks or pending:
+                while (next_idx < num_bricks) and (
+                    len(pending) < 2 * num_workers
+                ):
+                    pending.append(
+                        executor.submit(
+                            extract_brick,
+                            data,
+                            origins[next_idx],
+                            brick_size,
+                            level,
+                            step_size,
+                            mask,
+                        )
+                    )
+                    next_idx += 1
+                result = pending.popleft().result()
+                if result is None:
+                    continue
+                (
+                    vertices,
+                    faces,
+                    normals,
+                    values,
+                    seam,
+                ) = result
+
+                # weld the vertices on the shared planes
+                remap = np.full(
+                    len(vertices), -1, dtype=np.int64
+                )
+                seam_ids = np.flatnonzero(seam)
+                seam_keys = [
+                    row.tobytes()
+                    for row in np.round(
+                        vertices[seam_ids].astype(
+                            np.float64
+                        ),
+                        weld_decimals,
+                    )
+                ]
+                new_keys = {}
+                for vidx, key in zip(seam_ids, seam_keys):
+                    found_idx = seam_index.get(key)
+                    if found_idx is not None:
+                        remap[vidx] = found_idx
+                    else:
+                        new_keys[vidx] = key
+                is_new = remap < 0
+                num_new = int(np.count_nonzero(is_new))
+                remap[is_new] = num_vertices + np.arange(
+                    num_new, dtype=np.int64
+                )
+                for vidx, key in new_keys.items():
+                    seam_index[key] = int(remap[vidx])
+                new_block = {
+                    "vertices": vertices[is_new].astype(
+                        np.float32
+                    ),
+                    "faces": remap[faces],
+                    "normals": normals[is_new].astype(
+                        np.float32
+                    ),
+                    "values": values[is_new].astype(
+                        np.float32
+                    ),
+                }
+                num_vertices += num_new
+                num_faces += len(faces)
+                for key, block in new_block.items():
+                    if out_files:
+                        out_files[key].write(
+                            block.tobytes()
+                        )
+                    else:
+                        blocks[key].append(block)
+            # end of processing bricks
+    finally:
+        if out_files:
+            for out_file in out_files.values():
+                out_file.close()
+
+    log.debug(
+        f"chunked data={data.shape} "
+        f"bricks={num_bricks} "
+        f"vertices={num_vertices} "
+        f"faces={num_faces} "
+        f"welded={len(seam_index)}"
+    )
+    if not num_faces:
+        raise ValueError(
+            "No surface found at the given iso value."
+        )
+
+    if out_files:
+        return (
+            np.memmap(
+                f"{output_dir}/vertices.bin",
+                dtype=np.float32,
+                mode="r",
+                shape=(num_vertices, 3),
+            ),
+            np.memmap(
+                f"{output_dir}/faces.bin",
+                dtype=np.int64,
+                mode="r",
+                shape=(num_faces, 3),
+            ),
+            np.memmap(
+                f"{output_dir}/normals.bin",
+                dtype=np.float32,
+                mode="r",
+                shape=(num_vertices, 3),
+            ),
+            np.memmap(
+                f"{output_dir}/values.bin",
+                dtype=np.float32,
+                mode="r",
+                shape=(num_vertices,),
+            ),
+        )
+    return (
+        np.concatenate(blocks["vertices"]),
+        np.concatenate(blocks["faces"]),
+        np.concatenate(blocks["normals"]),
+        np.concatenate(blocks["values"]),
+    )
@@ -0,0 +1,339 @@
+import logging
+import numpy as np
+import bw.sk.build_compact_mesh as bwcm
+
+
+log = logging.getLogger(__name__)
+
+
+def triangulate_faces(faces: np.ndarray):
+    """
+    triangulate_faces
+
+    split (num_faces, N) polygon faces into
+    (num_faces * (N - 2), 3) triangles with a fan
+    around each face's first vertex
+
+    :param faces: (num_faces, N) array of
+        vertex indices
+    """
+    faces = np.asarray(faces)
+    num_sides = faces.shape[1]
+    if num_sides == 3:
+        return faces
+    fans = [
+        faces[:, [0, i, i + 1]]
+        for i in range(1, num_sides - 1)
+    ]
+    return np.stack(fans, axis=1).reshape(-1, 3)
+
+
+def get_face_planes(
+    vertices: np.ndarray,
+    faces: np.ndarray,
+):
+    """
+    get_face_planes
+
+    return the unit normals (num_faces, 3) and
+    areas (num_faces,) for triangle faces
+
+    :param vertices: (num_vertices, 3) array
+    :param faces: (num_faces, 3) array
+    """
+    v0 = vertices[faces[:, 0]]
+    cross = np.cross(
+        vertices[faces[:, 1]] - v0,
+        vertices[faces[:, 2]] - v0,
+    )
+    length = np.linalg.norm(cross, axis=1)
+    normals = cross / np.maximum(length, 1e-12)[:, None]
+    return (
+        normals,
+        0.5 * length,
+    )
+
+
+def get_plane_quadrics(
+    normals: np.ndarray,
+    points: np.ndarray,
+    weights: np.ndarray,
+):
+    """
+    get_plane_quadrics
+
+    build the (N, 4, 4) error quadrics
+    weight * p * p^T for the planes through
+    the points with the unit normals
+
+    :param normals: (N, 3) unit plane normals
+    :param points: (N, 3) points on the planes
+    :param weights: (N,) weight per plane
+    """
+    planes = np.concatenate(
+        [
+            normals,
+            -np.sum(normals * points, axis=1)[:, None],
+        ],
+        axis=1,
+    )
+    return (
+        weights[:, None, None]
+        * planes[:, :, None]
+        * planes[:, None, :]
+    )
+
+
+def get_vertex_quadrics(
+    vertices: np.ndarray,
+    faces: np.ndarray,
+    boundary_weight: float = 1000.0,
+):
+    """
+    get_vertex_quadrics
+
+    sum the area-weighted face plane quadrics on
+    each vertex. open boundary edges get a heavily
+    weighted perpendicular plane so the marching
+    cubes border stays in place.
+
+    :param vertices: (num_vertices, 3) array
+    :param faces: (num_faces, 3) triangle array
+    :param boundary_weight: weight for the
+        boundary edge planes
+    """
+    normals, areas = get_face_planes(vertices, faces)
+    face_quadrics = get_plane_quadrics(
+        normals, vertices[faces[:, 0]], areas
+    )
+    quadrics = np.zeros((len(vertices), 4, 4))
+    for corner in range(3):
+        np.add.at(quadrics, faces[:, corner], face_quadrics)
+
+    if boundary_weight:
+        half_edges = np.concatenate(
+            [
+                faces[:, [0, 1]],
+                faces[:, [1, 2]],
+                faces[:, [2, 0]],
+            ]
+        )
+        edge_faces = np.tile(np.arange(len(faces)), 3)
+        (
+            _,
+            edge_idx,
+            edge_counts,
+        ) = np.unique(
+            np.sort(half_edges, axis=1),
+            axis=0,
+            return_index=True,
+            return_counts=True,
+        )
+        boundary = edge_idx[edge_counts == 1]
+        if len(boundary):
+            b0 = vertices[half_edges[boundary, 0]]
+            direction = (
+                vertices[half_edges[boundary, 1]] - b0
+            )
+            side = np.cross(
+                direction, normals[edge_faces[boundary]]
+            )
+            side_length = np.linalg.norm(side, axis=1)
+            side = (
+                side
+                / np.maximum(side_length, 1e-12)[:, None]
+            )
+            boundary_quadrics = get_plane_quadrics(
+                side,
+                b0,
+                np.full(len(boundary), boundary_weight),
+            )
+            for corner in range(2):
+                np.add.at(
+                    quadrics,
+                    half_edges[boundary, corner],
+                    boundary_quadrics,
+                )
+    return quadrics
+
+
+def decimate_mesh(
+    vertices: np.ndarray,
+    faces: np.ndarray,
+    target_faces: int = None,
+    decimation_ratio: float = None,
+    values: np.ndarray = None,
+    max_iterations: int = 100,
+    boundary_weight: float = 1000.0,
+):
+    """
+    decimate_mesh
+
+    reduce a marching cubes mesh to a target
+    number of faces with vectorized quadric error
+    edge collapses before it reaches blender
+    (no bpy.ops or ui context needed)
+
+    each iteration finds every edge's cheapest
+    collapse position (either end or the middle)
+    from the summed vertex quadrics, picks the
+    edges that are the cheapest edge on both of
+    their vertices (so no two collapses touch the
+    same vertex) and collapses the cheapest of them
+    up to the number of faces still over the
+    target. quads and other polygons are
+    triangulated first.
+
+    returns a tuple (
+        vertices,
+        faces,
+        values,
+    ) with float32 vertices, triangle faces in the
+    smallest index dtype and the per-vertex values
+    (None if values was not set)
+
+    :param vertices: (num_vertices, 3) array
+    :param faces: (num_faces, N) array
+    :param target_faces: optional - number of
+        faces to reduce the mesh to
+    :param decimation_ratio: optional - fraction
+        of the faces to keep between 0.0 and 1.0
+        (same as the blender Decimate modifier ratio)
+        if target_faces is not set
+    :param values: optional - (num_vertices,)
+        per-vertex values to carry over
+    :param max_iterations: limit the number of
+        collapse passes
+    :param boundary_weight: weight for keeping
+        open boundary edges in place
+    """
+    positions = np.asarray(vertices, dtype=np.float64)
+    faces = triangulate_faces(faces).astype(np.int64)
+    num_src_faces = len(faces)
+    if target_faces is None:
+        if decimation_ratio is None:
+            raise ValueError(
+                "decimate_mesh requires target_faces "
+                "or decimation_ratio"
+            )
+        target_faces = int(num_src_faces * decimation_ratio)
+    target_faces = max(int(target_faces), 1)
+
+    quadrics = get_vertex_quadrics(
+        positions, faces, boundary_weight=boundary_weight
+    )
+    num_iterations = 0
+    while (len(faces) > target_faces) and (
+        num_iterations < max_iterations
+    ):
+        num_iterations += 1
+        edges = np.unique(
+            np.sort(
+                np.concatenate(
+                    [
+                        faces[:, [0, 1]],
+                        faces[:, [1, 2]],
+                        faces[:, [2, 0]],
+                    ]
+                ),
+                axis=1,
+            ),
+            axis=0,
+        )
+        e0 = edges[:, 0]
+        e1 = edges[:, 1]
+        edge_quadrics = quadrics[e0] + quadrics[e1]
+
+        # cost of collapsing onto either end or the middle
+        candidates = np.stack(
+            [
+                positions[e0],
+                positions[e1],
+                0.5 * (positions[e0] + positions[e1]),
+            ],
+            axis=1,
+        )
+        homogeneous = np.concatenate(
+            [
+                candidates,
+                np.ones(candidates.shape[:2] + (1,)),
+            ],
+            axis=2,
+        )
+        costs = np.einsum(
+            "eci,eij,ecj->ec",
+            homogeneous,
+            edge_quadrics,
+            homogeneous,
+        )
+        best = np.argmin(costs, axis=1)
+        edge_costs = costs[np.arange(len(edges)), best]
+        new_positions = candidates[
+            np.arange(len(edges)), best
+        ]
+
+        # keep edges that are the cheapest on both vertices
+        order = np.argsort(edge_costs, kind="stable")
+        rank = np.empty(len(edges), dtype=np.int64)
+        rank[order] = np.arange(len(edges))
+        vertex_best = np.full(
+            len(positions), len(edges), dtype=np.int64
+        )
+        np.minimum.at(vertex_best, e0, rank)
+        np.minimum.at(vertex_best, e1, rank)
+        selected = (vertex_best[e0] == rank) & (
+            vertex_best[e1] == rank
+        )
+        selected_ids = np.flatnonzero(selected)
+        if not len(selected_ids):
+            break
+        selected_ids = selected_ids[
+            np.argsort(rank[selected_ids])
+        ]
+        num_needed = int(
+            np.ceil((len(faces) - target_faces) / 2.0)
+        )
+        selected_ids = selected_ids[:num_needed]
+
+        keep_ids = e0[selected_ids]
+        drop_ids = e1[selected_ids]
+        positions[keep_ids] = new_positions[selected_ids]
+        quadrics[keep_ids] += quadrics[drop_ids]
+        remap = np.arange(len(positions))
+        remap[drop_ids] = keep_ids
+        faces = remap[faces]
+        is_valid = (
+            (faces[:, 0] != faces[:, 1])
+            & (faces[:, 1] != faces[:, 2])
+            & (faces[:, 2] != faces[:, 0])
+        )
+        faces = faces[is_valid]
+        log.debug(
+            f"decimate pass={num_iterations} "
+            f"collapsed={len(selected_ids)} "
+            f"faces={len(faces)} "
+            f"target_faces={target_faces}"
+        )
+    # end of collapsing edges
+
+    # remove unused vertices
+    used = np.zeros(len(positions), dtype=bool)
+    used[faces.reshape(-1)] = True
+    remap = np.cumsum(used) - 1
+    faces = remap[faces].astype(
+        bwcm.get_index_dtype(int(np.count_nonzero(used)))
+    )
+    positions = positions[used].astype(np.float32)
+    if values is not None:
+        values = np.asarray(values)[used]
+    log.debug(
+        f"decimated faces={num_src_faces} "
+        f"to {len(faces)} "
+        f"target_faces={target_faces} "
+        f"passes={num_iterations}"
+    )
+    return (
+        positions,
+        faces,
+        values,
+    )
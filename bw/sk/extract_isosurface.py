@@ -0,0 +1,85 @@
+import logging
+import numpy as np
+from skimage.measure import marching_cubes
+import bw.sk.chunked_marching_cubes as bwcmc
+import bw.sk.surface_nets as bwsn
+
+
+log = logging.getLogger(__name__)
+
+supported_engines = [
+    "marching_cubes",
+    "surface_nets",
+]
+
+
+def extract_isosurface(
+    data: np.ndarray,
+    level: float = None,
+    step_size: int = 1,
+    mask: np.ndarray = None,
+    engine: str = None,
+    brick_size: int = None,
+):
+    """
+    extract_isosurface
+
+    run the isosurface engine for one level and
+    step size
+
+    supported engines:
+
+    - **marching_cubes** - skimage triangles
+        (default) using bw.sk.chunked_marching_cubes
+        if the volume is larger than brick_size
+    - **surface_nets** - bw.sk.surface_nets quads
+        with roughly half the primitives
+
+    returns a tuple matching
+    skimage.measure.marching_cubes (
+        vertices,
+        faces,
+        normals,
+        values,
+    )
+
+    :param data: 3d array
+    :param level: optional - contour value
+    :param step_size: sample every step_size
+        voxel in each axis
+    :param mask: optional - boolean array with the
+        same shape as the data
+    :param engine: optional - marching_cubes or
+        surface_nets
+    :param brick_size: optional - split marching cubes
+        on volumes larger than this many cells in
+        any dimension into overlapping bricks
+    """
+    if not engine:
+        engine = "marching_cubes"
+    if engine == "surface_nets":
+        return bwsn.surface_nets(
+            data,
+            level=level,
+            step_size=step_size,
+            mask=mask,
+        )
+    elif engine == "marching_cubes":
+        if brick_size and (max(data.shape) > brick_size):
+            return bwcmc.chunked_marching_cubes(
+                data,
+                level=level,
+                step_size=step_size,
+                mask=mask,
+                brick_size=brick_size,
+            )
+        return marching_cubes(
+            data,
+            level=level,
+            step_size=step_size,
+            mask=mask,
+        )
+    raise ValueError(
+        f"unsupported isosurface engine={engine} "
+        f"only {supported_engines} are supported"
+    )
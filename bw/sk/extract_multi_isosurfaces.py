@@ -0,0 +1,182 @@
+import logging
+import numpy as np
+from skimage.measure import marching_cubes
+
+
+log = logging.getLogger(__name__)
+
+
+def get_cell_ranges(
+    data: np.ndarray,
+    step_size: int = 1,
+):
+    """
+    get_cell_ranges
+
+    one pass over the volume that returns the
+    min and max of the 8 corners of every
+    marching cubes cell so any number of levels
+    can find their active cells without scanning
+    the volume again
+
+    returns a tuple (
+        cell_min,
+        cell_max,
+    ) with shape (rows - 1, cols - 1, depth - 1)
+    of the step_size sampled volume
+
+    :param data: 3d array
+    :param step_size: marching cubes step size
+    """
+    sampled = data[::step_size, ::step_size, ::step_size]
+    cell_shape = tuple(dim - 1 for dim in sampled.shape)
+    cell_min = None
+    cell_max = None
+    for dx in (0, 1):
+        for dy in (0, 1):
+            for dz in (0, 1):
+                corner = sampled[
+                    dx : dx + cell_shape[0],
+                    dy : dy + cell_shape[1],
+                    dz : dz + cell_shape[2],
+                ]
+                if cell_min is None:
+                    cell_min = corner.copy()
+                    cell_max = corner.copy()
+                else:
+                    np.minimum(
+                        cell_min, corner, out=cell_min
+                    )
+                    np.maximum(
+                        cell_max, corner, out=cell_max
+                    )
+    return (
+        cell_min,
+        cell_max,
+    )
+
+
+def extract_multi_isosurfaces(
+    data: np.ndarray,
+    levels: list = None,
+    quantiles: list = None,
+    step_size: int = 1,
+    mask: np.ndarray = None,
+):
+    """
+    extract_multi_isosurfaces
+
+    extract several nested isosurfaces (for example
+    the 5/50/95th percentile shells) into one mesh
+    buffer with one marching cubes call per level.
+    the face and vertex range of every level is
+    kept so each shell can be selected or colored
+    on its own.
+
+    returns a dictionary
+
+        ```
+        shells = {
+            "vertices": vertices,
+            "faces": faces,
+            "normals": normals,
+            "values": values,
+            "step_size": step_size,
+            "levels": [
+                {
+                    "level": level,
+                    "quantile": quantile,
+                    "num_faces": num_faces,
+                    "face_start": face_start,
+                    "face_end": face_end,
+                    "vertex_start": vertex_start,
+                    "vertex_end": vertex_end,
+                },
+            ],
+        }
+        ```
+
+    :param data: 3d array
+    :param levels: optional - list of levels
+    :param quantiles: optional - list of data
+        quantiles to use as the levels with
+        default [0.05, 0.5, 0.95]
+        (ignored if levels is set)
+    :param step_size: marching cubes step size
+    :param mask: optional - 3d boolean mask with
+        the same shape as the data
+    """
+    if levels is None:
+        if not quantiles:
+            quantiles = [0.05, 0.5, 0.95]
+        levels = [
+            float(level)
+            for level in np.quantile(data, quantiles)
+        ]
+    else:
+        quantiles = [None] * len(levels)
+    step_size = max(1, int(step_size))
+
+    blocks = {
+        "vertices": [],
+        "faces": [],
+        "normals": [],
+        "values": [],
+    }
+    level_ranges = []
+    num_vertices = 0
+    num_faces = 0
+    for level, quantile in zip(levels, quantiles):
+        level_range = {
+            "level": level,
+            "quantile": quantile,
+            "num_faces": 0,
+            "face_start": num_faces,
+            "face_end": num_faces,
+            "vertex_start": num_vertices,
+            "vertex_end": num_vertices,
+        }
+        try:
+            (
+                vertices,
+                faces,
+                normals,
+                values,
+            ) = marching_cubes(
+                data,
+                level=level,
+                step_size=step_size,
+                mask=mask,
+            )
+        except (ValueError, RuntimeError) as e:
+            if "No surface found" not in str(e):
+                raise e
+            level_ranges.append(level_range)
+            continue
+        blocks["vertices"].append(vertices)
+        blocks["faces"].append(faces + num_vertices)
+        blocks["normals"].append(normals)
+        blocks["values"].append(values)
+        num_vertices += len(vertices)
+        num_faces += len(faces)
+        level_range["num_faces"] = len(faces)
+        level_range["face_end"] = num_faces
+        level_range["vertex_end"] = num_vertices
+        level_ranges.append(level_range)
+        log.debug(
+            f"shell level={level} "
+            f"quantile={quantile} "
+            f"faces={len(faces)}"
+        )
+    if not num_faces:
+        raise ValueError(
+            "No surface found at the given iso value."
+        )
+    return {
+        "vertices": np.concatenate(blocks["vertices"]),
+        "faces": np.concatenate(blocks["faces"]),
+        "normals": np.concatenate(blocks["normals"]),
+        "values": np.concatenate(blocks["values"]),
+        "step_size": step_size,
+        "levels": level_ranges,
+    }
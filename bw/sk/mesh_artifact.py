@@ -0,0 +1,218 @@
+import os
+import json
+import logging
+import numpy as np
+import bw.sk.build_compact_mesh as bwcm
+
+
+log = logging.getLogger(__name__)
+
+
+def save_mesh_artifact(
+    path: str,
+    closest_report: dict,
+    name: str = None,
+    desc: str = None,
+    data: np.ndarray = None,
+    quantize_bits: int = None,
+    include_normals: bool = False,
+):
+    """
+    save_mesh_artifact
+
+    save one layer's marching cubes mesh as a
+    binary npz artifact so blender can load it
+    later without recomputing the marching cubes
+
+    the npz holds the compact vertices, faces,
+    z_values (and optionally normals) with a
+    json stats string for the chosen level,
+    step_size, sizes and the source data
+    statistics
+
+    returns a dictionary for the model-level
+    index with the stats and file path
+
+    :param path: path to the npz file
+    :param closest_report: closest report
+        dictionary from
+        bw.sk.build_layer_mesh.build_layer_mesh
+    :param name: optional - layer name
+    :param desc: optional - layer description
+    :param data: optional - source data for
+        recording min/max/mean/std statistics
+    :param quantize_bits: optional - 8 or 16 to
+        quantize the vertices
+    :param include_normals: flag to store the
+        normals
+    """
+    compact_mesh = bwcm.build_compact_mesh(
+        vertices=closest_report["vertices"],
+        faces=closest_report["faces"],
+        normals=(
+            closest_report["normals"]
+            if include_normals
+            else None
+        ),
+        values=closest_report["z_values"],
+        quantize_bits=quantize_bits,
+    )
+    stats = {
+        "name": name,
+        "desc": desc,
+        "level": closest_report["level"],
+        "step_size": closest_report["step_size"],
+        "mc_desc": closest_report.get("desc"),
+        "num_vertices": compact_mesh["num_vertices"],
+        "num_faces": compact_mesh["num_faces"],
+        "quantize_bits": quantize_bits,
+        "size_mb": compact_mesh["size_mb"],
+        "size": compact_mesh["size"],
+    }
+    if data is not None:
+        stats["data_shape"] = list(data.shape)
+        stats["data_min"] = float(np.min(data))
+        stats["data_max"] = float(np.max(data))
+        stats["data_mean"] = float(np.mean(data))
+        stats["data_std"] = float(np.std(data))
+    arrays = {
+        "vertices": compact_mesh["vertices"],
+        "faces": compact_mesh["faces"],
+        "z_values": compact_mesh["values"],
+        "stats": np.array(json.dumps(stats)),
+    }
+    if include_normals:
+        arrays["normals"] = compact_mesh["normals"]
+    if quantize_bits:
+        arrays["scale"] = compact_mesh["scale"]
+        arrays["offset"] = compact_mesh["offset"]
+    parent_dir = os.path.dirname(path)
+    if parent_dir and not os.path.exists(parent_dir):
+        os.makedirs(parent_dir)
+    with open(path, "wb") as fp:
+        np.savez(fp, **arrays)
+    log.debug(
+        f"saved mesh={name} "
+        f"faces={stats['num_faces']} "
+        f"size={stats['size']} "
+        f"to {path}"
+    )
+    stats["file"] = path
+    return stats
+
+
+def load_mesh_artifact(path: str):
+    """
+    load_mesh_artifact
+
+    load a layer mesh saved with
+    save_mesh_artifact and return a closest
+    report dictionary that
+    bw.bl.generate_3d_from_3d can draw
+    without recomputing the marching cubes
+
+    :param path: path to the npz file
+    """
+    with np.load(path, allow_pickle=False) as npz:
+        stats = json.loads(str(npz["stats"]))
+        mesh = {
+            "vertices": npz["vertices"],
+            "quantize_bits": stats["quantize_bits"],
+            "scale": None,
+            "offset": None,
+        }
+        if stats["quantize_bits"]:
+            mesh["scale"] = npz["scale"]
+            mesh["offset"] = npz["offset"]
+        vertices = bwcm.get_compact_vertices(mesh)
+        faces = npz["faces"]
+        z_values = npz["z_values"]
+        normals = []
+        if "normals" in npz.files:
+            normals = npz["normals"]
+    return {
+        "desc": stats["mc_desc"],
+        "size_mb": stats["size_mb"],
+        "size": stats["size"],
+        "level": stats["level"],
+        "step_size": stats["step_size"],
+        "mask": None,
+        "num_vertices": len(vertices),
+        "vertices": vertices,
+        "num_faces": len(faces),
+        "faces": faces,
+        "num_normals": len(normals),
+        "normals": normals,
+        "z_values": z_values,
+        "num_z_values": len(z_values),
+        "stats": stats,
+    }
+
+
+def save_mesh_artifact_index(
+    path: str,
+    layers: list,
+    model_file: str = None,
+    **kwargs,
+):
+    """
+    save_mesh_artifact_index
+
+    save the model-level json index for a
+    directory of layer mesh artifacts. layer
+    file paths are stored relative to the
+    index file
+
+    :param path: path to the index json file
+    :param layers: list of layer dictionaries
+        from save_mesh_artifact with the draw
+        position (x, y, z) keys
+    :param model_file: optional - source
+        model.safetensors path
+    :param kwargs: optional - extra settings
+        to record in the index
+    """
+    index_dir = os.path.dirname(os.path.abspath(path))
+    index_layers = []
+    for layer in layers:
+        index_layer = dict(layer)
+        if index_layer.get("file"):
+            index_layer["file"] = os.path.relpath(
+                os.path.abspath(index_layer["file"]),
+                index_dir,
+            )
+        index_layers.append(index_layer)
+    index = {
+        "model_file": model_file,
+        "num_layers": len(index_layers),
+        "layers": index_layers,
+    }
+    index.update(kwargs)
+    with open(path, "w") as fp:
+        fp.write(json.dumps(index))
+    log.info(
+        f"saved {len(index_layers)} mesh artifacts "
+        f"index={path}"
+    )
+    return index
+
+
+def load_mesh_artifact_index(path: str):
+    """
+    load_mesh_artifact_index
+
+    load a model-level json index saved with
+    save_mesh_artifact_index and resolve each
+    layer's file path relative to the index
+
+    :param path: path to the index json file
+    """
+    index_dir = os.path.dirname(os.path.abspath(path))
+    with open(path, "r") as fp:
+        index = json.load(fp)
+    for layer in index["layers"]:
+        if layer.get("file"):
+            layer["file"] = os.path.join(
+                index_dir, layer["file"]
+            )
+    return index
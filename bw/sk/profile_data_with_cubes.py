@@ -2,8 +2,10 @@ import os
 import logging
 import json
 import numpy as np
-from skimage.measure import marching_cubes
 import bw.pp as pp
+import bw.sk.extract_isosurface as bwei
+import bw.sk.build_compact_mesh as bwcm
+import bw.sk.prune_mesh_islands as bwpi
 
 
 log = logging.getLogger(__name__)
@@ -22,6 +24,11 @@ def profile_data_with_cubes(
     include_masks: bool = True,
     data_name: str = None,
     save_to_file: str = None,
+    brick_size: int = None,
+    min_island_faces: int = None,
+    min_island_size: float = None,
+    max_islands: int = None,
+    engine: str = None,
 ):
     """
     uses marching cubes to profile the 3d data
@@ -52,6 +59,8 @@ def profile_data_with_cubes(
         over
     :param levels: optional - levels to profile
     :param steps: optional - steps to profile
+        (steps that sample fewer than 2 voxels in
+        an axis are skipped)
     :param masks: optional - masks to filter the data
     :param include_vertices: optional - flag to include
         vertices in the report node
@@ -65,6 +74,23 @@ def profile_data_with_cubes(
         issues ingesting data
     :param save_to_file: optional - path to save the
         report for reviewing later
+    :param brick_size: optional - split volumes larger
+        than this many cells in any dimension into
+        overlapping bricks with
+        bw.sk.chunked_marching_cubes so peak memory
+        is per-brick
+    :param min_island_faces: optional - drop
+        disconnected surface components with fewer
+        faces than this before counting faces
+    :param min_island_size: optional - drop
+        disconnected surface components with a
+        smaller bounding box extent (in voxels)
+    :param max_islands: optional - keep only this
+        many of the largest surface components
+    :param engine: optional - isosurface engine
+        marching_cubes (default) or surface_nets
+        for quad meshes with roughly half the
+        faces (see bw.sk.extract_isosurface)
     :return: a report dictionary from the analysis
 
         ```
@@ -89,8 +115,19 @@ def profile_data_with_cubes(
         levels = [0] + [i / 10.0 for i in range(0, 21)]
     if not steps:
         steps = [1, 2, 3, 4, 5, 6, 7, 10, 20]
+    # skip step sizes that sample fewer than 2 voxels
+    # in an axis (the depth of the fitted layers)
+    steps = [
+        step_size
+        for step_size in steps
+        if min(-(-dim // step_size) for dim in data.shape)
+        >= 2
+    ]
     if not masks:
         masks = [None]
+    use_pruning = bool(
+        min_island_faces or min_island_size or max_islands
+    )
 
     num_levels = len(levels)
     num_steps = len(steps)
@@ -150,12 +187,29 @@ def profile_data_with_cubes(
                         faces,
                         normals,
                         mc_z_values,
-                    ) = marching_cubes(
+                    ) = bwei.extract_isosurface(
                         data,
                         level=level,
                         step_size=step_size,
                         mask=mask,
+                        engine=engine,
+                        brick_size=brick_size,
                     )
+                    if use_pruning:
+                        (
+                            vertices,
+                            faces,
+                            normals,
+                            mc_z_values,
+                        ) = bwpi.prune_mesh_islands(
+                            vertices,
+                            faces,
+                            normals,
+                            mc_z_values,
+                            min_faces=min_island_faces,
+                            min_size=min_island_size,
+                            max_islands=max_islands,
+                        )
                     report_node = {
                         "size_mb": None,
                         "size": None,
@@ -199,8 +253,16 @@ def profile_data_with_cubes(
                         report_node[
                             "num_normals"
                         ] = num_normals
+                    # true size of the returned arrays
                     mc_mb_size_org = (
-                        (float(4.0 * num_faces))
+                        float(
+                            bwcm.get_mesh_nbytes(
+                                vertices,
+                                faces,
+                                normals,
+                                mc_z_values,
+                            )
+                        )
                         / 1024.0
                         / 1024.0
                     )
@@ -419,11 +481,35 @@ def profile_data_with_cubes(
                     faces,
                     normals,
                     mc_z_values,
-                ) = marching_cubes(
+                ) = bwei.extract_isosurface(
                     data,
+                    engine=engine,
+                    brick_size=brick_size,
                 )
+                if use_pruning:
+                    (
+                        vertices,
+                        faces,
+                        normals,
+                        mc_z_values,
+                    ) = bwpi.prune_mesh_islands(
+                        vertices,
+                        faces,
+                        normals,
+                        mc_z_values,
+                        min_faces=min_island_faces,
+                        min_size=min_island_size,
+                        max_islands=max_islands,
+                    )
                 mc_mb_size_org = (
-                    (float(4.0 * len(faces)))
+                    float(
+                        bwcm.get_mesh_nbytes(
+                            vertices,
+                            faces,
+                            normals,
+                            mc_z_values,
+                        )
+                    )
                     / 1024.0
                     / 1024.0
                 )
@@ -0,0 +1,452 @@
+import logging
+import numpy as np
+import bw.sk.build_mesh_report as bwmr
+import bw.sk.extract_isosurface as bwei
+import bw.sk.extract_multi_isosurfaces as bwmi
+import bw.sk.prune_mesh_islands as bwpi
+
+
+log = logging.getLogger(__name__)
+
+# starting estimate for faces per active cell
+faces_per_active_cell = {
+    "marching_cubes": 2.0,
+    "surface_nets": 1.0,
+}
+
+
+def split_stacked_mesh(
+    vertices: np.ndarray,
+    faces: np.ndarray,
+    normals: np.ndarray,
+    values: np.ndarray,
+    num_layers: int,
+    layer_depth: int,
+    depth_axis: int = 1,
+):
+    """
+    split_stacked_mesh
+
+    split a mesh extracted from layers stacked
+    along the depth axis back into one mesh per
+    layer. each face goes to the layer that holds
+    its centroid and the vertices are re-based so
+    every layer starts at depth 0.
+
+    returns a list with a tuple (
+        vertices,
+        faces,
+        normals,
+        values,
+    ) for each layer
+
+    :param vertices: (num_vertices, 3) array
+    :param faces: (num_faces, N) array
+    :param normals: (num_vertices, 3) array
+    :param values: (num_vertices,) array
+    :param num_layers: number of stacked layers
+    :param layer_depth: depth of each layer in
+        the stacked volume
+    :param depth_axis: vertex axis for the depth
+    """
+    vertices = np.asarray(vertices)
+    faces = np.asarray(faces)
+    centroid_depth = np.mean(
+        vertices[faces, depth_axis], axis=1
+    )
+    face_layers = np.clip(
+        np.floor(centroid_depth / layer_depth).astype(
+            np.int64
+        ),
+        0,
+        num_layers - 1,
+    )
+    order = np.argsort(face_layers, kind="stable")
+    bounds = np.searchsorted(
+        face_layers[order], np.arange(num_layers + 1)
+    )
+    layer_meshes = []
+    for layer_idx in range(num_layers):
+        layer_faces = faces[
+            order[bounds[layer_idx] : bounds[layer_idx + 1]]
+        ]
+        used = np.zeros(len(vertices), dtype=bool)
+        used[layer_faces.reshape(-1)] = True
+        remap = np.cumsum(used) - 1
+        layer_vertices = vertices[used].copy()
+        layer_vertices[:, depth_axis] -= (
+            layer_idx * layer_depth
+        )
+        layer_meshes.append(
+            (
+                layer_vertices,
+                remap[layer_faces].astype(faces.dtype),
+                normals[used] if len(normals) else normals,
+                values[used],
+            )
+        )
+    return layer_meshes
+
+
+def get_active_cell_counts(
+    data: np.ndarray,
+    levels: list,
+    mask: np.ndarray = None,
+):
+    """
+    get_active_cell_counts
+
+    count the cells that cross every level with one
+    per-cell min/max pass and a sorted search so
+    the face count for each level can be estimated
+    without running the isosurface engine
+
+    :param data: 3d array
+    :param levels: list of levels
+    :param mask: optional - boolean array with the
+        same shape as the data where False skips
+        the cell ending at that voxel (the same as
+        skimage.measure.marching_cubes)
+    """
+    (
+        cell_min,
+        cell_max,
+    ) = bwmi.get_cell_ranges(data)
+    if mask is not None:
+        # marching cubes gates each cell by the mask
+        # at its far corner
+        cell_mask = mask[1:, 1:, 1:]
+        cell_min = cell_min[cell_mask]
+        cell_max = cell_max[cell_mask]
+    sorted_min = np.sort(cell_min, axis=None)
+    sorted_max = np.sort(cell_max, axis=None)
+    return np.searchsorted(
+        sorted_min, levels, side="right"
+    ) - np.searchsorted(sorted_max, levels, side="left")
+
+
+def extract_stacked_isosurface(
+    stacked: np.ndarray,
+    level: float,
+    layer_depth: int,
+    mask: np.ndarray = None,
+    cell_mask: np.ndarray = None,
+    engine: str = "marching_cubes",
+    brick_size: int = None,
+):
+    """
+    extract_stacked_isosurface
+
+    extract the isosurface for layers stacked along
+    depth axis 1 without the faces that bridge two
+    layers. marching cubes runs once on the whole
+    volume with the bridging cells masked out.
+    surface nets meshes each layer on its own
+    (its border handling is per volume) and the
+    meshes are offset back into the stacked depth.
+
+    returns a tuple matching
+    skimage.measure.marching_cubes (
+        vertices,
+        faces,
+        normals,
+        values,
+    )
+
+    :param stacked: stacked 3d array
+    :param level: contour value
+    :param layer_depth: depth of each layer in
+        the stacked volume
+    :param mask: optional - stacked salience mask
+    :param cell_mask: optional - stacked mask with
+        the bridging cells removed (used by
+        marching cubes)
+    :param engine: marching_cubes or surface_nets
+    :param brick_size: optional - run marching cubes
+        in overlapping bricks of this many cells
+    """
+    if engine != "surface_nets":
+        return bwei.extract_isosurface(
+            stacked,
+            level=level,
+            mask=cell_mask,
+            engine=engine,
+            brick_size=brick_size,
+        )
+    blocks = []
+    num_vertices = 0
+    for start in range(0, stacked.shape[1], layer_depth):
+        layer_slice = (
+            slice(None),
+            slice(start, start + layer_depth),
+            slice(None),
+        )
+        try:
+            (
+                vertices,
+                faces,
+                normals,
+                values,
+            ) = bwei.extract_isosurface(
+                stacked[layer_slice],
+                level=level,
+                mask=(
+                    None
+                    if mask is None
+                    else mask[layer_slice]
+                ),
+                engine=engine,
+            )
+        except ValueError:
+            # no surface in this layer
+            continue
+        vertices[:, 1] += start
+        blocks.append(
+            (
+                vertices,
+                faces + num_vertices,
+                normals,
+                values,
+            )
+        )
+        num_vertices += len(vertices)
+    if not blocks:
+        raise ValueError(
+            "No surface found at the given iso value."
+        )
+    return tuple(
+        np.concatenate([block[idx] for block in blocks])
+        for idx in range(4)
+    )
+
+
+def profile_stacked_layers(
+    all_data: list,
+    names: list = None,
+    target_faces: int = None,
+    levels: list = None,
+    brick_size: int = None,
+    min_island_faces: int = None,
+    min_island_size: float = None,
+    max_islands: int = None,
+    masks: list = None,
+    engine: str = None,
+):
+    """
+    profile_stacked_layers
+
+    stack same-shaped fitted layers along the depth
+    axis into one volume, run one isosurface
+    extraction on it (for more refer to
+    extract_stacked_isosurface) and split the mesh
+    back into one closest report per layer by depth
+    range. the cells that bridge two layers are
+    skipped so each layer gets the same faces as
+    extracting it on its own.
+
+    instead of the level/step grid search in
+    bw.sk.profile_data_with_cubes the level is
+    picked from the active cell counts for every
+    candidate level (one min/max pass over the
+    stacked volume). the extraction is repeated at
+    most once if the faces per active cell are far
+    from the estimate. every layer shares the level
+    with step_size 1 and max_islands is applied to
+    each layer after the split.
+
+    returns a list with one closest report
+    dictionary (or None if the layer has no faces)
+    for each layer or None if no surface was found
+    (so the caller can profile each layer on its
+    own)
+
+    :param all_data: list of fitted 3d arrays with
+        the same shape (rows, cols, depth)
+    :param names: optional - layer names for
+        tracking issues
+    :param target_faces: optional - face target for
+        the whole stacked volume with default using
+        the level with the most active cells
+    :param levels: optional - candidate levels
+        with the same default as
+        bw.sk.profile_data_with_cubes
+    :param brick_size: optional - run marching cubes
+        in overlapping bricks of this many cells
+    :param min_island_faces: optional - drop
+        disconnected surface components with fewer
+        faces than this
+    :param min_island_size: optional - drop
+        disconnected surface components with a
+        smaller bounding box extent (in voxels)
+    :param max_islands: optional - keep only this
+        many of the largest surface components in
+        each layer
+    :param masks: optional - list of boolean arrays
+        (one per layer) to limit marching cubes to
+        salient regions
+    :param engine: optional - isosurface engine
+        marching_cubes (default) or surface_nets
+    """
+    num_layers = len(all_data)
+    if not names:
+        names = [f"{idx}" for idx in range(num_layers)]
+    if not levels:
+        levels = [0] + [i / 10.0 for i in range(0, 21)]
+    if not engine:
+        engine = "marching_cubes"
+    group_name = f"{names[0]} +{num_layers - 1} stacked"
+    layer_depth = all_data[0].shape[2]
+    # Flip the array to have the desired orientation (x, z, y)
+    stacked = np.transpose(
+        np.concatenate(all_data, axis=2), (0, 2, 1)
+    )
+    stacked_mask = None
+    if masks:
+        stacked_mask = np.transpose(
+            np.concatenate(masks, axis=2), (0, 2, 1)
+        )
+    # skip the cells joining the last slice of each
+    # layer to the first slice of the next one (the
+    # mask gates each cell at its far corner)
+    if stacked_mask is None:
+        cell_mask = np.ones(stacked.shape, dtype=bool)
+    else:
+        cell_mask = stacked_mask.copy()
+    cell_mask[:, layer_depth::layer_depth, :] = False
+    levels = np.unique(np.asarray(levels, dtype=np.float64))
+    active_counts = get_active_cell_counts(
+        stacked, levels, mask=cell_mask
+    )
+    levels = levels[active_counts > 0]
+    active_counts = active_counts[active_counts > 0]
+    if not len(levels):
+        log.debug(
+            "no level crosses the stacked volume "
+            f"name={group_name}"
+        )
+        return None
+
+    faces_per_cell = faces_per_active_cell[engine]
+    level = None
+    mesh = None
+    for _ in range(2):
+        if target_faces:
+            estimated = active_counts * faces_per_cell
+            best_level = float(
+                levels[
+                    np.argmin(
+                        np.abs(estimated - target_faces)
+                    )
+                ]
+            )
+        else:
+            best_level = float(
+                levels[np.argmax(active_counts)]
+            )
+        if best_level == level:
+            break
+        try:
+            level_mesh = extract_stacked_isosurface(
+                stacked,
+                level=best_level,
+                layer_depth=layer_depth,
+                mask=stacked_mask,
+                cell_mask=cell_mask,
+                engine=engine,
+                brick_size=brick_size,
+            )
+        except (ValueError, RuntimeError) as e:
+            log.debug(
+                "failed to find a stacked isosurface for "
+                f"name={group_name} level={best_level} "
+                f"with ex={e}"
+            )
+            if mesh is None:
+                # profile each layer on its own
+                return None
+            break
+        level = best_level
+        mesh = level_mesh
+        # calibrate the estimate with the real faces
+        faces_per_cell = len(mesh[1]) / float(
+            active_counts[levels == level][0]
+        )
+        if not target_faces:
+            break
+    (
+        vertices,
+        faces,
+        normals,
+        values,
+    ) = mesh
+    if min_island_faces or min_island_size:
+        (
+            vertices,
+            faces,
+            normals,
+            values,
+        ) = bwpi.prune_mesh_islands(
+            vertices,
+            faces,
+            normals,
+            values,
+            min_faces=min_island_faces,
+            min_size=min_island_size,
+        )
+    log.debug(
+        f"stacked {group_name} "
+        f"volume={stacked.shape} "
+        f"level={level} "
+        f"faces={len(faces)} "
+        f"target_faces={target_faces}"
+    )
+    if not len(faces):
+        return None
+
+    # the depth is on axis 1 after the flip
+    layer_meshes = split_stacked_mesh(
+        vertices=vertices,
+        faces=faces,
+        normals=normals,
+        values=values,
+        num_layers=num_layers,
+        layer_depth=layer_depth,
+        depth_axis=1,
+    )
+    layer_reports = []
+    for name, layer_mesh in zip(names, layer_meshes):
+        (
+            vertices,
+            faces,
+            normals,
+            values,
+        ) = layer_mesh
+        if max_islands and len(faces):
+            (
+                vertices,
+                faces,
+                normals,
+                values,
+            ) = bwpi.prune_mesh_islands(
+                vertices,
+                faces,
+                normals,
+                values,
+                max_islands=max_islands,
+            )
+        if not len(faces):
+            log.debug(f"no stacked faces for name={name}")
+            layer_reports.append(None)
+            continue
+        layer_reports.append(
+            bwmr.build_mesh_report(
+                vertices=vertices,
+                faces=faces,
+                normals=normals,
+                values=values,
+                level=level,
+                step_size=1,
+                stack_size=num_layers,
+            )
+        )
+    return layer_reports
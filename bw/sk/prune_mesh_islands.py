@@ -0,0 +1,168 @@
+import logging
+import numpy as np
+
+
+log = logging.getLogger(__name__)
+
+
+def label_mesh_islands(
+    faces: np.ndarray,
+    num_vertices: int,
+):
+    """
+    label_mesh_islands
+
+    find the connected surface components in a
+    mesh with a vectorized union-find over the
+    face adjacency (each face hooks the roots of
+    its vertices to the smallest root followed by
+    pointer jumping until every face has one root)
+
+    returns a tuple (
+        vertex_labels,
+        num_islands,
+    ) where vertex_labels holds the island index
+    (0 to num_islands - 1) for each vertex and
+    vertices no face uses get their own island
+
+    :param faces: (num_faces, N) array of
+        vertex indices
+    :param num_vertices: number of vertices
+        in the mesh
+    """
+    faces = np.asarray(faces).astype(np.int64)
+    roots = np.arange(num_vertices, dtype=np.int64)
+    if len(faces):
+        while True:
+            face_roots = roots[faces]
+            face_min = np.min(face_roots, axis=1)
+            if np.all(face_roots == face_min[:, None]):
+                break
+            for corner in range(faces.shape[1]):
+                np.minimum.at(
+                    roots, face_roots[:, corner], face_min
+                )
+            # pointer jumping to the root
+            while True:
+                jumped = roots[roots]
+                if np.array_equal(jumped, roots):
+                    break
+                roots = jumped
+    _, vertex_labels = np.unique(roots, return_inverse=True)
+    vertex_labels = vertex_labels.reshape(-1)
+    return (
+        vertex_labels,
+        (
+            int(np.max(vertex_labels)) + 1
+            if num_vertices
+            else 0
+        ),
+    )
+
+
+def prune_mesh_islands(
+    vertices: np.ndarray,
+    faces: np.ndarray,
+    normals: np.ndarray = None,
+    values: np.ndarray = None,
+    min_faces: int = None,
+    min_size: float = None,
+    max_islands: int = None,
+):
+    """
+    prune_mesh_islands
+
+    drop the tiny disconnected surface components
+    (blobs) marching cubes finds in noisy weight
+    volumes before they reach blender
+
+    - removes islands with fewer than min_faces
+    - removes islands whose bounding box is
+        smaller than min_size on every axis
+    - keeps only the max_islands islands with
+        the most faces
+
+    returns a tuple matching
+    skimage.measure.marching_cubes (
+        vertices,
+        faces,
+        normals,
+        values,
+    ) with the unused vertices removed
+
+    :param vertices: (num_vertices, 3) array
+    :param faces: (num_faces, N) array
+    :param normals: optional - (num_vertices, 3)
+        array
+    :param values: optional - (num_vertices,) array
+    :param min_faces: optional - minimum number of
+        faces to keep an island
+    :param min_size: optional - minimum bounding box
+        extent (in voxels) to keep an island
+    :param max_islands: optional - keep only this
+        many of the largest islands
+    """
+    vertices = np.asarray(vertices)
+    faces = np.asarray(faces)
+    num_src_faces = len(faces)
+    if not num_src_faces:
+        return (
+            vertices,
+            faces,
+            normals,
+            values,
+        )
+    (
+        vertex_labels,
+        num_islands,
+    ) = label_mesh_islands(faces, len(vertices))
+    face_labels = vertex_labels[faces[:, 0]]
+    island_faces = np.bincount(
+        face_labels, minlength=num_islands
+    )
+    keep_island = island_faces > 0
+    if min_faces:
+        keep_island &= island_faces >= min_faces
+    if min_size:
+        island_min = np.full((num_islands, 3), np.inf)
+        island_max = np.full((num_islands, 3), -np.inf)
+        np.minimum.at(island_min, vertex_labels, vertices)
+        np.maximum.at(island_max, vertex_labels, vertices)
+        island_extent = np.max(
+            island_max - island_min, axis=1
+        )
+        keep_island &= island_extent >= min_size
+    if max_islands and (
+        np.count_nonzero(keep_island) > max_islands
+    ):
+        ranked = np.argsort(
+            np.where(keep_island, island_faces, -1),
+            kind="stable",
+        )[::-1]
+        keep_island[:] = False
+        keep_island[ranked[:max_islands]] = True
+
+    faces = faces[keep_island[face_labels]]
+    used = np.zeros(len(vertices), dtype=bool)
+    used[faces.reshape(-1)] = True
+    remap = np.cumsum(used) - 1
+    faces = remap[faces].astype(faces.dtype)
+    vertices = vertices[used]
+    if normals is not None and len(normals):
+        normals = np.asarray(normals)[used]
+    if values is not None and len(values):
+        values = np.asarray(values)[used]
+    log.debug(
+        f"pruned islands={num_islands} "
+        f"to {int(np.count_nonzero(keep_island))} "
+        f"faces={num_src_faces} to {len(faces)} "
+        f"min_faces={min_faces} "
+        f"min_size={min_size} "
+        f"max_islands={max_islands}"
+    )
+    return (
+        vertices,
+        faces,
+        normals,
+        values,
+    )
@@ -0,0 +1,52 @@
+import logging
+import safetensors
+
+
+log = logging.getLogger(__name__)
+
+
+def get_tensor_slices(
+    model_path: str,
+    layer_names: list = None,
+):
+    """
+    get_tensor_slices
+
+    yield a lazy safetensors slice for every
+    tensor in the model file without loading the
+    tensor data. rows are only read from the mmap
+    when the slice is indexed (for example
+    tensor_slice[start_row:end_row])
+
+    yields a tuple (
+        key,
+        tensor_slice,
+        shape,
+    ) with numpy row slices
+
+    :param model_path: path to the model.safetensors
+        file
+    :param layer_names: optional - only yield the
+        tensors whose key contains one of these
+        names (every tensor if not set)
+    """
+    with safetensors.safe_open(
+        model_path,
+        framework="numpy",
+        device="cpu",
+    ) as f:
+        for key in f.keys():
+            if layer_names and not any(
+                layer_name in key
+                for layer_name in layer_names
+            ):
+                log.debug(f"skipping tensor={key}")
+                continue
+            tensor_slice = f.get_slice(key)
+            shape = tuple(tensor_slice.get_shape())
+            log.debug(f"slicing tensor={key} shape={shape}")
+            yield (
+                key,
+                tensor_slice,
+                shape,
+            )